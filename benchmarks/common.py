@@ -0,0 +1,42 @@
+import os
+import json
+import time
+import yaml
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+TIPPING = os.path.join(HERE, '..', 'examples', 'tipping.yaml')
+
+
+def read_yaml_file(pathname=TIPPING):
+    """Reads yaml file into dict.
+    :param pathname: (string) file pathname to yaml file
+    :returns: (dict) parsed yaml into dictionary
+    """
+    with open(pathname, 'r') as fd:
+        return yaml.safe_load(fd)
+
+
+def write_json_file(pathname, data):
+    """Stores dict as json to file, or prints it if no pathname is given.
+    :param pathname: (string) pathname to file, or None
+    :param data: (dict) json data
+    """
+    if pathname is None:
+        print(json.dumps(data, indent=2))
+        return
+    with open(pathname, 'w') as fd:
+        json.dump(data, fd, indent=2)
+
+
+def best_time(fn, repeat=5):
+    """Runs a function several times and returns the fastest wall time.
+    :param fn: (function) function without arguments
+    :param repeat: (int) number of runs
+    :returns: (float) seconds
+    """
+    ret = float('inf')
+    for i in range(repeat):
+        start = time.perf_counter()
+        fn()
+        ret = min(ret, time.perf_counter() - start)
+    return ret
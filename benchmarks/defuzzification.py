@@ -0,0 +1,76 @@
+#! /usr/bin/env python
+"""Sampled versus exact centroid defuzzification on The Tipping Problem.
+
+For each resolution of the output variable range, times batch inference with
+the sampled 'centroid' and the grid-free 'exact_centroid' methods, and
+reports the error of the sampled centroid against the exact one.
+
+    python benchmarks/defuzzification.py --rows 100000 --json out.json
+"""
+import argparse
+import numpy as np
+from common import read_yaml_file, write_json_file, best_time
+
+from blfuzzy import CompiledEngine
+from blfuzzy.constants import VARIABLES, DEFUZZIFICATION, CENTROID
+from blfuzzy.constants import EXACT_CENTROID, NAME, MIN, MAX, X
+from blfuzzy.helper import get_var_range
+
+RESOLUTIONS = [10, 100, 10000]
+
+
+def get_command_line_args():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--rows', type=int, default=10000,
+                        help='number of input rows')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='runs per measurement (the best is reported)')
+    parser.add_argument('--json', default=None,
+                        help='pathname to json results file')
+    return parser.parse_args()
+
+
+def make_engine(data, output, intervals, method):
+    """Compiles the spec with the output range sampled at a resolution.
+    :param data: (dict) specification of system
+    :param output: (str) output variable name
+    :param intervals: (int) number of intervals of the output range
+    :param method: (str) name of defuzzification method
+    :returns: (CompiledEngine) engine
+    """
+    for variable in data[VARIABLES]:
+        if variable[NAME] == output:
+            x = get_var_range(variable[MIN], variable[MAX], intervals)
+            variable[X] = x.tolist()
+    data[DEFUZZIFICATION] = method
+    return CompiledEngine(data)
+
+
+def main():
+    args = get_command_line_args()
+    data = read_yaml_file()
+    rng = np.random.RandomState(0)
+    engine = CompiledEngine(data)
+    output = engine.outputs[0]
+    inputs = {}
+    for varname in engine.inputs:
+        x = engine.x[varname]
+        inputs[varname] = rng.uniform(x[0], x[-1], args.rows)
+    results = []
+    for intervals in RESOLUTIONS:
+        row = {'intervals': intervals, 'rows': args.rows}
+        for method in [CENTROID, EXACT_CENTROID]:
+            engine = make_engine(data, output, intervals, method)
+            row[method] = engine.infer_batch(inputs)[output]
+            row[method + '_seconds'] = best_time(
+                    lambda: engine.infer_batch(inputs), args.repeat)
+        error = np.abs(row.pop(CENTROID) - row.pop(EXACT_CENTROID))
+        row['max_abs_error'] = float(error.max())
+        row['mean_abs_error'] = float(error.mean())
+        results.append(row)
+    write_json_file(args.json, {'benchmark': 'defuzzification',
+                                'results': results})
+
+
+if __name__ == '__main__':
+    main()
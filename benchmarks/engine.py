@@ -0,0 +1,149 @@
+#! /usr/bin/env python
+"""Engine construction, single inference and batch throughput.
+
+Generates synthetic rule bases for every combination of the given sizes and
+measures, for FuzzyInferenceEngine, construction time, run() latency and the
+cost of each inference phase (fuzzification, rule evaluation, aggregation,
+defuzzification), and, for CompiledEngine, construction time, infer()
+latency and infer_batch() throughput, with the peak memory allocated by each.
+
+    python benchmarks/engine.py --variables 2,4 --levels 3,5 --json out.json
+"""
+import sys
+import platform
+import argparse
+import tracemalloc
+import subprocess
+import numpy as np
+from common import write_json_file, best_time
+from synthetic import make_spec, make_inputs, set_values
+
+from blfuzzy import FuzzyInferenceEngine, CompiledEngine, Stats
+from blfuzzy.stats import PHASES
+
+
+def int_list(text):
+    return [int(item) for item in text.split(',')]
+
+
+def get_command_line_args():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--variables', type=int_list, default=[2, 4],
+                        help='comma-separated numbers of input variables')
+    parser.add_argument('--levels', type=int_list, default=[3],
+                        help='comma-separated numbers of levels')
+    parser.add_argument('--rules', type=int_list, default=None,
+                        help='comma-separated numbers of rules (default: '
+                             'all combinations of input levels)')
+    parser.add_argument('--intervals', type=int_list, default=[10, 100],
+                        help='comma-separated numbers of range intervals')
+    parser.add_argument('--rows', type=int, default=10000,
+                        help='number of input rows for batch inference')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='runs per measurement (the best is reported)')
+    parser.add_argument('--json', default=None,
+                        help='pathname to json results file')
+    return parser.parse_args()
+
+
+def get_commit():
+    try:
+        return subprocess.check_output(
+                ['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL,
+                universal_newlines=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def peak_memory(fn):
+    """Runs a function and returns the peak memory it allocated.
+    :param fn: (function) function without arguments
+    :returns: (int) bytes
+    """
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def time_phases(spec, repeat):
+    """Times the phases of FuzzyInferenceEngine.run() separately, with the
+    engine's own Stats timers: only the levels the rules reference are
+    fuzzified, as in run().
+    :param spec: (dict) specification of system, with input values
+    :param repeat: (int) runs per measurement
+    :returns: (dict) phase name (str) -> seconds (float)
+    """
+    ret = {phase: [] for phase in PHASES}
+    for i in range(repeat):
+        stats = Stats()
+        FuzzyInferenceEngine(spec, stats=stats).run()
+        for phase in PHASES:
+            ret[phase].append(stats.seconds[phase])
+    return {phase: min(seconds) for phase, seconds in ret.items()}
+
+
+def measure(spec, rows, repeat):
+    """
+    :param spec: (dict) specification of system, without input values
+    :param rows: (int) number of input rows for batch inference
+    :param repeat: (int) runs per measurement
+    :returns: (dict) measurements
+    """
+    inputs = make_inputs(spec, rows)
+    set_values(spec, inputs, 0)
+    row = {name: values[0] for name, values in inputs.items()}
+
+    def run():
+        FuzzyInferenceEngine(spec).run()
+    ret = {}
+    ret['engine_construction_seconds'] = best_time(
+            lambda: FuzzyInferenceEngine(spec), repeat)
+    ret['engine_construction_peak_bytes'] = peak_memory(
+            lambda: FuzzyInferenceEngine(spec))
+    ret['engine_run_seconds'] = best_time(run, repeat) - \
+        ret['engine_construction_seconds']
+    ret['engine_run_peak_bytes'] = peak_memory(run)
+    ret['engine_phase_seconds'] = time_phases(spec, repeat)
+    ret['compiled_construction_seconds'] = best_time(
+            lambda: CompiledEngine(spec), repeat)
+    ret['compiled_construction_peak_bytes'] = peak_memory(
+            lambda: CompiledEngine(spec))
+    engine = CompiledEngine(spec)
+    ret['compiled_infer_seconds'] = best_time(lambda: engine.infer(row),
+                                              repeat)
+    ret['compiled_infer_peak_bytes'] = peak_memory(lambda: engine.infer(row))
+    seconds = best_time(lambda: engine.infer_batch(inputs), repeat)
+    ret['compiled_batch_seconds'] = seconds
+    ret['compiled_batch_rows_per_second'] = rows / seconds
+    ret['compiled_batch_peak_bytes'] = peak_memory(
+            lambda: engine.infer_batch(inputs))
+    return ret
+
+
+def main():
+    args = get_command_line_args()
+    results = []
+    for variables in args.variables:
+        for levels in args.levels:
+            for rules in args.rules or [None]:
+                for intervals in args.intervals:
+                    spec = make_spec(variables, levels, rules, intervals)
+                    row = {'variables': variables, 'levels': levels,
+                           'rules': len(spec['rules']),
+                           'intervals': intervals, 'rows': args.rows}
+                    row.update(measure(spec, args.rows, args.repeat))
+                    results.append(row)
+    write_json_file(args.json, {
+        'benchmark': 'engine',
+        'commit': get_commit(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'argv': sys.argv[1:],
+        'results': results})
+
+
+if __name__ == '__main__':
+    main()
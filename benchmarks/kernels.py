@@ -0,0 +1,100 @@
+#! /usr/bin/env python
+"""Native membership function and defuzzification kernels versus skfuzzy.
+
+Times the calls the engines make per variable level and per output: mf
+construction over the range, fuzzification of a crisp value, and
+defuzzification of one aggregated mf, and of a batch of them.
+
+    python benchmarks/kernels.py --intervals 100 --json out.json
+"""
+import argparse
+import numpy as np
+import skfuzzy as fuzz
+from common import write_json_file, best_time
+
+from blfuzzy import kernels
+from blfuzzy.constants import TRIANGLE, TRAPEZOID, GAUSSIAN, SIGMOID
+from blfuzzy.constants import CENTROID, BISECTOR, MOM
+
+CALLS = 1000  # calls per measurement of single-mf functions
+
+
+def get_command_line_args():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--intervals', type=int, default=100,
+                        help='number of intervals of the range')
+    parser.add_argument('--rows', type=int, default=10000,
+                        help='membership functions per batch')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='runs per measurement (the best is reported)')
+    parser.add_argument('--json', default=None,
+                        help='pathname to json results file')
+    return parser.parse_args()
+
+
+def per_call(fn, repeat):
+    """
+    :param fn: (function) function without arguments
+    :param repeat: (int) number of runs of CALLS calls
+    :returns: (float) seconds per call
+    """
+    def run():
+        for i in range(CALLS):
+            fn()
+    return best_time(run, repeat) / CALLS
+
+
+def compare(name, native, reference, repeat, calls=True):
+    """
+    :param name: (str) measurement name
+    :param native: (function) blfuzzy call, without arguments
+    :param reference: (function) skfuzzy call, without arguments
+    :param repeat: (int) number of runs
+    :param calls: (boolean) time single calls rather than one run
+    :returns: (dict) seconds of both and speedup
+    """
+    measure = per_call if calls else best_time
+    native = measure(native, repeat)
+    reference = measure(reference, repeat)
+    return {'name': name, 'blfuzzy_seconds': native,
+            'skfuzzy_seconds': reference, 'speedup': reference / native}
+
+
+def main():
+    args = get_command_line_args()
+    rng = np.random.RandomState(0)
+    x = np.linspace(0, 10, args.intervals + 1)
+    mfs = {TRIANGLE: ([2, 5, 8], lambda: fuzz.trimf(x, [2, 5, 8])),
+           TRAPEZOID: ([1, 4, 6, 9], lambda: fuzz.trapmf(x, [1, 4, 6, 9])),
+           GAUSSIAN: ([5, 1.5], lambda: fuzz.gaussmf(x, 5, 1.5)),
+           SIGMOID: ([5, 2], lambda: fuzz.sigmf(x, 5, 2))}
+    results = []
+    for typename, (params, reference) in mfs.items():
+        results.append(compare(
+                typename, lambda: kernels.membership(typename, x, params),
+                reference, args.repeat))
+    mf = fuzz.trimf(x, [2, 5, 8])
+    results.append(compare(
+            'fuzzify', lambda: np.interp(3.3, x, mf),
+            lambda: fuzz.interp_membership(x, mf, 3.3), args.repeat))
+    aggrmf = np.fmin(mf, 0.7)
+    for method in [CENTROID, BISECTOR, MOM]:
+        results.append(compare(
+                'defuzz_' + method,
+                lambda: kernels.defuzz_mf(x, aggrmf, method),
+                lambda: fuzz.defuzz(x, aggrmf, method), args.repeat))
+    batch = np.fmin(mf, rng.rand(args.rows, 1))
+    for method in [CENTROID, BISECTOR, MOM]:
+        results.append(compare(
+                'batch_defuzz_' + method,
+                lambda: kernels.defuzz(x, batch, method),
+                lambda: [fuzz.defuzz(x, row, method) for row in batch],
+                args.repeat, calls=False))
+    write_json_file(args.json, {'benchmark': 'kernels',
+                                'intervals': args.intervals,
+                                'rows': args.rows,
+                                'results': results})
+
+
+if __name__ == '__main__':
+    main()
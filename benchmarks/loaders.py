@@ -0,0 +1,106 @@
+#! /usr/bin/env python
+"""Rule sheet loading, cell by cell versus column-wise.
+
+Generates synthetic rule sheets of level codes and times building the rules
+from a DataFrame a cell at a time (get_antecedent_from_row() and
+get_consequent_from_row(), as get_rules_from_excel() used to) and a column
+at a time (get_rules_from_frame()), and loading the same sheet from a CSV
+file.
+
+    python benchmarks/loaders.py --rows 1000,10000,100000 --json out.json
+"""
+import os
+import time
+import argparse
+import tempfile
+import warnings
+import numpy as np
+import pandas as pd
+from common import write_json_file
+
+from blfuzzy.helper import get_rules_from_frame, get_rules_from_csv
+from blfuzzy.helper import get_antecedent_from_row, get_consequent_from_row
+from blfuzzy.constants import WEIGHT, ANTECEDENT, CONSEQUENT
+
+CODES = np.array(['L', 'M', 'H', None], dtype=object)
+
+
+def get_command_line_args():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--rows', default='1000,10000,100000',
+                        help='comma-separated numbers of rules')
+    parser.add_argument('--variables', type=int, default=4,
+                        help='number of antecedent variables')
+    parser.add_argument('--cell-rows', type=int, default=10000,
+                        help='largest sheet loaded cell by cell')
+    parser.add_argument('--json', default=None,
+                        help='pathname to json results file')
+    return parser.parse_args()
+
+
+def make_sheet(rows, variables, seed=0):
+    """
+    :param rows: (int) number of rules
+    :param variables: (int) number of antecedent variables
+    :param seed: (int) random seed
+    :returns: (DataFrame) level codes, some antecedent cells empty
+    """
+    rng = np.random.RandomState(seed)
+    columns = {'input{}'.format(i): CODES[rng.randint(4, size=rows)]
+               for i in range(variables)}
+    columns['output'] = CODES[rng.randint(3, size=rows)]
+    return pd.DataFrame(columns)
+
+
+def load_cells(df, ante_nvars, cons_nvars):
+    """Builds the rules one cell at a time.
+    :returns: (list) of rules
+    """
+    ante_vars = set(df.columns[:ante_nvars])
+    cons_vars = set(df.columns[ante_nvars:ante_nvars + cons_nvars])
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', DeprecationWarning)
+        return [{WEIGHT: 1,
+                 ANTECEDENT: get_antecedent_from_row(df, i, ante_vars),
+                 CONSEQUENT: get_consequent_from_row(df, i, cons_vars)}
+                for i in range(len(df.index))]
+
+
+def seconds(fn):
+    """
+    :param fn: (function) function without arguments
+    :returns: (float) wall time of one call
+    """
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main():
+    args = get_command_line_args()
+    results = []
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for rows in [int(n) for n in args.rows.split(',')]:
+            df = make_sheet(rows, args.variables)
+            pathname = os.path.join(tmpdir, 'rules.csv')
+            df.to_csv(pathname, index=False)
+            result = {
+                'rows': rows,
+                'columns_seconds': seconds(
+                    lambda: get_rules_from_frame(df, args.variables, 1)),
+                'csv_seconds': seconds(
+                    lambda: get_rules_from_csv(pathname, args.variables, 1)),
+                'cells_seconds': None}
+            if rows <= args.cell_rows:
+                result['cells_seconds'] = seconds(
+                    lambda: load_cells(df, args.variables, 1))
+                result['speedup'] = (result['cells_seconds'] /
+                                     result['columns_seconds'])
+            results.append(result)
+    write_json_file(args.json, {'benchmark': 'loaders',
+                                'variables': args.variables,
+                                'results': results})
+
+
+if __name__ == '__main__':
+    main()
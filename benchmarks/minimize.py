@@ -0,0 +1,87 @@
+#! /usr/bin/env python
+"""Rule-base minimization: rule counts and batch throughput before and after.
+
+Draws rule sheets of random rows, with repeats, from the cartesian product
+of the input levels, as filled-in rule sheets often are, and compiles them
+as given and minimized (CompiledEngine(data, minimize=True)), with default
+triangular levels and with trapezoidal levels whose cores cover the range,
+for which rules that differ in one variable merge.
+
+    python benchmarks/minimize.py --rules 2000 --rows 20000 --json out.json
+"""
+import argparse
+import numpy as np
+from common import write_json_file, best_time
+from synthetic import make_spec, make_inputs
+
+from blfuzzy import CompiledEngine
+from blfuzzy.constants import VARIABLES, LEVELS, MF_TYPE, MF_PARAMS
+from blfuzzy.constants import TRAPEZOID, AGGREGATION, OR, SUM
+
+AGGREGATIONS = [OR, SUM]
+
+
+def get_command_line_args():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--variables', type=int, default=4,
+                        help='number of input variables')
+    parser.add_argument('--levels', type=int, default=3,
+                        help='number of levels of every variable')
+    parser.add_argument('--rules', type=int, default=2000,
+                        help='number of rule sheet rows')
+    parser.add_argument('--rows', type=int, default=20000,
+                        help='rows inferred in a batch')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='runs per measurement (the best is reported)')
+    parser.add_argument('--json', default=None,
+                        help='pathname to json results file')
+    return parser.parse_args()
+
+
+def cover(spec):
+    """Replaces the levels of the inputs by trapezoids whose cores overlap.
+    :param spec: (dict) specification of system, on [0, 1] ranges
+    """
+    for variable in spec[VARIABLES][:-1]:
+        n = len(variable[LEVELS])
+        for i, level in enumerate(variable[LEVELS]):
+            level[MF_TYPE] = TRAPEZOID
+            level[MF_PARAMS] = [max(0.0, (i - 1.0) / n), max(0.0, i / n),
+                                min(1.0, (i + 1.0) / n),
+                                min(1.0, (i + 2.0) / n)]
+
+
+def main():
+    args = get_command_line_args()
+    results = []
+    for levels in ['triangle', 'covering']:
+        for aggregation in AGGREGATIONS:
+            spec = make_spec(args.variables, args.levels, args.rules,
+                             aggregation=aggregation)
+            if levels == 'covering':
+                cover(spec)
+            inputs = make_inputs(spec, args.rows)
+            engine = CompiledEngine(spec)
+            minimized = CompiledEngine(spec, minimize=True)
+            assert(np.allclose(engine.infer_batch(inputs)['output'],
+                               minimized.infer_batch(inputs)['output'],
+                               equal_nan=True))
+            seconds = [best_time(lambda: compiled.infer_batch(inputs),
+                                 args.repeat)
+                       for compiled in (engine, minimized)]
+            results.append({
+                    'levels': levels,
+                    AGGREGATION: aggregation,
+                    'counts': minimized.minimized,
+                    'rows_per_second': args.rows / seconds[0],
+                    'minimized_rows_per_second': args.rows / seconds[1]})
+    write_json_file(args.json, {'benchmark': 'minimize',
+                                'variables': args.variables,
+                                'levels': args.levels,
+                                'rules': args.rules,
+                                'rows': args.rows,
+                                'results': results})
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+#! /usr/bin/env python
+"""Scaling of multi-process batch inference on The Tipping Problem.
+
+Times CompiledEngine.infer_batch() in a single process and through a
+persistent WorkerPool of 1, 2, 4 and 8 processes, and checks that the
+results are identical.
+
+    python benchmarks/parallel.py --rows 2000000 --json out.json
+"""
+import os
+import argparse
+import numpy as np
+from common import read_yaml_file, write_json_file, best_time
+
+from blfuzzy import CompiledEngine, WorkerPool
+
+WORKERS = [1, 2, 4, 8]
+
+
+def get_command_line_args():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--rows', type=int, default=1000000,
+                        help='number of input rows')
+    parser.add_argument('--chunksize', type=int, default=65536,
+                        help='rows per task')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='runs per measurement (the best is reported)')
+    parser.add_argument('--json', default=None,
+                        help='pathname to json results file')
+    return parser.parse_args()
+
+
+def main():
+    args = get_command_line_args()
+    engine = CompiledEngine(read_yaml_file())
+    rng = np.random.RandomState(0)
+    inputs = {}
+    for varname in engine.inputs:
+        x = engine.x[varname]
+        inputs[varname] = rng.uniform(x[0], x[-1], args.rows)
+    expect = engine.infer_batch(inputs)
+    single = best_time(lambda: engine.infer_batch(inputs), args.repeat)
+    results = [{'workers': 0, 'seconds': single, 'speedup': 1.0}]
+    for workers in WORKERS:
+        with WorkerPool(engine, workers, args.chunksize) as pool:
+            actual = engine.infer_batch(inputs, parallel=pool)
+            for varname, values in expect.items():
+                assert(np.array_equal(actual[varname], values))
+            seconds = best_time(
+                    lambda: engine.infer_batch(inputs, parallel=pool),
+                    args.repeat)
+        results.append({'workers': workers, 'seconds': seconds,
+                        'speedup': single / seconds})
+    write_json_file(args.json, {'benchmark': 'parallel',
+                                'rows': args.rows,
+                                'cpus': os.cpu_count(),
+                                'results': results})
+
+
+if __name__ == '__main__':
+    main()
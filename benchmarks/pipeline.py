@@ -0,0 +1,123 @@
+#! /usr/bin/env python
+"""Throughput of a hierarchical system run as a Pipeline.
+
+Builds three synthetic stages, left(input0, input1) and right(input2,
+input3) feeding top(left, right), and times: constructing and running a
+FuzzyInferenceEngine per stage for every row, as examples/tippinghelper.py
+does; Pipeline.infer_batch(); and CompiledEngine.infer_batch() of each
+stage alone, on the same rows, whose sum the pipeline should match.
+
+    python benchmarks/pipeline.py --rows 100000 --levels 5 --json out.json
+"""
+import copy
+import argparse
+import numpy as np
+from common import write_json_file, best_time
+from synthetic import make_spec, OUTPUT
+
+from blfuzzy import FuzzyInferenceEngine, CompiledEngine, Pipeline
+from blfuzzy.constants import VARIABLES, RULES, NAME, VALUE
+from blfuzzy.constants import ANTECEDENT, CONSEQUENT
+
+STAGES = [('left', ['input0', 'input1']), ('right', ['input2', 'input3']),
+          ('top', ['left', 'right'])]
+
+
+def get_command_line_args():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--rows', type=int, default=100000,
+                        help='rows inferred in a batch')
+    parser.add_argument('--construct-rows', type=int, default=200,
+                        help='rows inferred by engine construction')
+    parser.add_argument('--levels', type=int, default=5,
+                        help='number of levels of every variable')
+    parser.add_argument('--intervals', type=int, default=100,
+                        help='number of intervals of the variable ranges')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='runs per measurement (the best is reported)')
+    parser.add_argument('--json', default=None,
+                        help='pathname to json results file')
+    return parser.parse_args()
+
+
+def rename(spec, names):
+    """Renames the variables of a spec.
+    :param spec: (dict) specification of system
+    :param names: (dict) old variable name (str) -> new name (str)
+    :returns: (dict) renamed copy
+    """
+    ret = copy.deepcopy(spec)
+    for variable in ret[VARIABLES]:
+        variable[NAME] = names.get(variable[NAME], variable[NAME])
+    for rule in ret[RULES]:
+        for part in (ANTECEDENT, CONSEQUENT):
+            for variable in rule[part][VARIABLES]:
+                variable[NAME] = names.get(variable[NAME], variable[NAME])
+    return ret
+
+
+def make_stages(levels, intervals):
+    """
+    :returns: (dict) stage name (str) -> specification of system (dict)
+    """
+    spec = make_spec(2, levels, intervals=intervals)
+    return {name: rename(spec, {'input0': inputs[0], 'input1': inputs[1],
+                                OUTPUT: name})
+            for name, inputs in STAGES}
+
+
+def construct(specs, row):
+    """Infers a row with an engine per stage, as tippinghelper does.
+    :param specs: (dict) stage name (str) -> specification of system
+    :param row: (dict) variable name (str) -> value (float); outputs are
+                written back into it
+    """
+    for name, inputs in STAGES:
+        spec = specs[name]
+        for variable in spec[VARIABLES]:
+            if variable[NAME] != name:
+                variable[VALUE] = row.get(variable[NAME])
+        engine = FuzzyInferenceEngine(spec)
+        engine.run()
+        row[name] = engine.get_variable_value(name)
+
+
+def main():
+    args = get_command_line_args()
+    specs = make_stages(args.levels, args.intervals)
+    engines = {name: CompiledEngine(spec) for name, spec in specs.items()}
+    pipeline = Pipeline(engines)
+    rng = np.random.RandomState(0)
+    inputs = {varname: rng.uniform(0, 1, args.rows)
+              for varname in pipeline.inputs}
+    outputs = pipeline.infer_batch(inputs)
+    values = dict(inputs, **outputs)
+    stage_inputs = {name: {varname: values[varname] for varname in names}
+                    for name, names in STAGES}
+    rows = [{varname: float(values[i]) for varname, values in inputs.items()}
+            for i in range(args.construct_rows)]
+    seconds = {
+        'construct': best_time(lambda: [construct(specs, row)
+                                        for row in rows], args.repeat),
+        'pipeline': best_time(lambda: pipeline.infer_batch(inputs),
+                              args.repeat)}
+    stages = {name: best_time(lambda: engines[name].infer_batch(
+                                    stage_inputs[name]), args.repeat)
+              for name, names in STAGES}
+    for i, row in enumerate(rows):
+        assert(abs(row['top'] - outputs['top'][i]) < 1e-9)
+    write_json_file(args.json, {
+            'benchmark': 'pipeline',
+            'rows': args.rows,
+            'levels': args.levels,
+            'intervals': args.intervals,
+            'construct_rows_per_second':
+                args.construct_rows / seconds['construct'],
+            'pipeline_rows_per_second': args.rows / seconds['pipeline'],
+            'stage_rows_per_second': {name: args.rows / value
+                                      for name, value in stages.items()},
+            'stages_sum_rows_per_second': args.rows / sum(stages.values())})
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+#! /usr/bin/env python
+"""Throughput of the micro-batching inference server on The Tipping Problem.
+
+Sends requests from many concurrent clients, each on a persistent
+connection, to an InferenceServer on localhost, and compares with handling
+each request by constructing and running a FuzzyInferenceEngine, as a
+service without resident rule bases would.
+
+    python benchmarks/server.py --clients 64 --requests 20000 --json out.json
+"""
+import time
+import asyncio
+import argparse
+import numpy as np
+from common import read_yaml_file, write_json_file
+
+from blfuzzy import FuzzyInferenceEngine, CompiledEngine, InferenceServer
+from blfuzzy.constants import VARIABLES, NAME, VALUE
+
+WINDOWS = [0.0005, 0.001, 0.005]
+
+
+def get_command_line_args():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--clients', type=int, default=64,
+                        help='number of concurrent clients')
+    parser.add_argument('--requests', type=int, default=10000,
+                        help='total number of requests')
+    parser.add_argument('--baseline', type=int, default=200,
+                        help='requests handled by engine construction')
+    parser.add_argument('--json', default=None,
+                        help='pathname to json results file')
+    return parser.parse_args()
+
+
+async def client(port, rows):
+    """Sends requests one after the other on one connection.
+    :param port: (int) server port on localhost
+    :param rows: (list) of input values (dict)
+    """
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    for row in rows:
+        body = '{{"food": {}, "service": {}}}'.format(
+                row['food'], row['service']).encode()
+        writer.write(b'POST /infer/tipping HTTP/1.1\r\nContent-Length: ' +
+                     str(len(body)).encode() + b'\r\n\r\n' + body)
+        length = 0
+        while True:
+            line = await reader.readline()
+            if line == b'\r\n':
+                break
+            if line.lower().startswith(b'content-length'):
+                length = int(line.split(b':')[1])
+        await reader.readexactly(length)
+    writer.close()
+
+
+async def measure(engine, rows, clients, window):
+    """
+    :returns: (dict) requests per second and server stats
+    """
+    server = InferenceServer({'tipping': engine}, window=window)
+    port = await server.start()
+    start = time.perf_counter()
+    await asyncio.gather(*[client(port, rows[i::clients])
+                           for i in range(clients)])
+    seconds = time.perf_counter() - start
+    await server.close()
+    info = server.batchers['tipping'].info()
+    return {'window': window, 'requests_per_second': len(rows) / seconds,
+            'mean_batch_size': info['mean_batch_size'],
+            'latency_p50_seconds': info['latency_p50_seconds'],
+            'latency_p99_seconds': info['latency_p99_seconds']}
+
+
+def per_request(data, rows):
+    """Handles requests by constructing an engine for each one.
+    :returns: (float) requests per second
+    """
+    start = time.perf_counter()
+    for row in rows:
+        for variable in data[VARIABLES]:
+            if variable[NAME] in row:
+                variable[VALUE] = row[variable[NAME]]
+        FuzzyInferenceEngine(data).run()
+    return len(rows) / (time.perf_counter() - start)
+
+
+def main():
+    args = get_command_line_args()
+    data = read_yaml_file()
+    engine = CompiledEngine(data)
+    rng = np.random.RandomState(0)
+    rows = [{'food': food, 'service': service} for food, service
+            in rng.uniform(0, 10, (args.requests, 2)).tolist()]
+    results = [asyncio.run(measure(engine, rows, args.clients, window))
+               for window in WINDOWS]
+    write_json_file(args.json, {
+            'benchmark': 'server',
+            'clients': args.clients,
+            'requests': args.requests,
+            'per_request_engine_requests_per_second': per_request(
+                    data, rows[:args.baseline]),
+            'results': results})
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+import itertools
+import numpy as np
+from blfuzzy.constants import NAME, MIN, MAX, VALUE, LEVELS, LEVEL, WEIGHT
+from blfuzzy.constants import VARIABLES, RULES, AGGREGATION, DEFUZZIFICATION
+from blfuzzy.constants import OPERATOR, IMPLICATION, ANTECEDENT, CONSEQUENT
+from blfuzzy.constants import AND, OR, CENTROID, X
+from blfuzzy.helper import get_var_range
+
+OUTPUT = 'output'
+
+
+def make_spec(variables=2, levels=3, rules=None, intervals=10,
+              aggregation=OR, defuzzification=CENTROID, operator=AND,
+              seed=0):
+    """Generates a rule base with default triangular mfs on [0, 1] ranges.
+    Each rule references every input variable, and its consequent level
+    grows with the sum of its antecedent levels, like a rule sheet filled in
+    by hand.
+    :param variables: (int) number of input variables
+    :param levels: (int) number of levels of every variable (2-5)
+    :param rules: (int) number of rules, drawn at random from the cartesian
+                  product of the input levels, or None for all of them
+    :param intervals: (int) number of intervals of the variable ranges
+    :param aggregation: (str) aggregation method
+    :param defuzzification: (str) defuzzification method
+    :param operator: (str) antecedent operator
+    :param seed: (int) seed of the random rule selection
+    :returns: (dict) specification of system, without input values
+    """
+    names = ['level{}'.format(i) for i in range(levels)]
+    x = get_var_range(0.0, 1.0, intervals).tolist()
+    spec_variables = []
+    for i in range(variables):
+        spec_variables.append(make_variable('input{}'.format(i), names, x))
+    spec_variables.append(make_variable(OUTPUT, names, x))
+    combos = itertools.product(range(levels), repeat=variables)
+    if rules is not None:
+        rng = np.random.RandomState(seed)
+        total = levels ** variables
+        picks = rng.randint(total, size=rules)
+        combos = [np.unravel_index(pick, (levels,) * variables)
+                  for pick in picks]
+    spec_rules = []
+    for combo in combos:
+        level = int(sum(combo)) * levels // ((levels - 1) * variables + 1)
+        spec_rules.append({
+            WEIGHT: 1.0,
+            ANTECEDENT: {
+                OPERATOR: operator,
+                VARIABLES: [{NAME: 'input{}'.format(i), LEVEL: names[j]}
+                            for i, j in enumerate(combo)]},
+            CONSEQUENT: {
+                IMPLICATION: MIN,
+                VARIABLES: [{NAME: OUTPUT, LEVEL: names[level]}]}})
+    return {VARIABLES: spec_variables,
+            RULES: spec_rules,
+            AGGREGATION: aggregation,
+            DEFUZZIFICATION: defuzzification}
+
+
+def make_variable(name, levels, x):
+    """
+    :param name: (str) variable name
+    :param levels: (list) level names
+    :param x: (list) variable range
+    :returns: (dict) variable specification, without value
+    """
+    return {NAME: name, MIN: x[0], MAX: x[-1], X: x, VALUE: None,
+            LEVELS: [{NAME: level} for level in levels]}
+
+
+def make_inputs(spec, rows, seed=0):
+    """Draws random input values.
+    :param spec: (dict) specification of system
+    :param rows: (int) number of sets of input values
+    :param seed: (int) seed of the random values
+    :returns: (dict) input variable name (str) -> values (ndarray)
+    """
+    rng = np.random.RandomState(seed)
+    ret = {}
+    for variable in spec[VARIABLES]:
+        if variable[NAME] != OUTPUT:
+            ret[variable[NAME]] = rng.uniform(variable[MIN], variable[MAX],
+                                              rows)
+    return ret
+
+
+def set_values(spec, inputs, row):
+    """Sets the input values of a spec, for FuzzyInferenceEngine.
+    :param spec: (dict) specification of system
+    :param inputs: (dict) input variable name (str) -> values (ndarray)
+    :param row: (int) row of input values
+    """
+    for variable in spec[VARIABLES]:
+        values = inputs.get(variable[NAME])
+        variable[VALUE] = None if values is None else float(values[row])
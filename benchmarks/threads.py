@@ -0,0 +1,92 @@
+#! /usr/bin/env python
+"""Scaling of inference from threads sharing one engine, on The Tipping
+Problem.
+
+Times three ways of serving rows from 1, 2, 4 and 8 threads: constructing
+a FuzzyInferenceEngine per row, as a thread-unsafe engine requires;
+FuzzyInferenceEngine.infer() on one shared engine with pooled contexts;
+and CompiledEngine.infer_batch() on one shared engine, each thread taking
+chunks of rows, where the NumPy kernels release the GIL.
+
+    python benchmarks/threads.py --rows 2000 --batch-rows 1000000
+"""
+import os
+import argparse
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from common import read_yaml_file, write_json_file, best_time
+
+from blfuzzy import FuzzyInferenceEngine, CompiledEngine, ContextPool
+from blfuzzy.constants import VARIABLES, NAME, VALUE
+
+THREADS = [1, 2, 4, 8]
+
+
+def get_command_line_args():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--rows', type=int, default=2000,
+                        help='rows inferred one at a time')
+    parser.add_argument('--batch-rows', type=int, default=1000000,
+                        help='rows inferred in batches')
+    parser.add_argument('--chunksize', type=int, default=16384,
+                        help='rows per batch')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='runs per measurement (the best is reported)')
+    parser.add_argument('--json', default=None,
+                        help='pathname to json results file')
+    return parser.parse_args()
+
+
+def construct(data, row):
+    """Infers a row with an engine of its own.
+    :param data: (dict) specification of system
+    :param row: (dict) input variable name (str) -> value (float)
+    :returns: (float) tip
+    """
+    data = dict(data)
+    data[VARIABLES] = [dict(variable, **{VALUE: row[variable[NAME]]})
+                       if variable[NAME] in row else variable
+                       for variable in data[VARIABLES]]
+    engine = FuzzyInferenceEngine(data)
+    engine.run()
+    return engine.get_variable_value('tip')
+
+
+def main():
+    args = get_command_line_args()
+    data = read_yaml_file()
+    engine = FuzzyInferenceEngine(data)
+    pool = ContextPool(engine)
+    compiled = CompiledEngine(data)
+    rng = np.random.RandomState(0)
+    rows = [{'service': service, 'food': food} for service, food
+            in rng.uniform(0, 10, (args.rows, 2)).tolist()]
+    inputs = {varname: rng.uniform(0, 10, args.batch_rows)
+              for varname in compiled.inputs}
+    chunks = [{varname: values[start:start + args.chunksize]
+               for varname, values in inputs.items()}
+              for start in range(0, args.batch_rows, args.chunksize)]
+    results = []
+    for threads in THREADS:
+        with ThreadPoolExecutor(threads) as executor:
+            seconds = {
+                'construct': best_time(lambda: list(executor.map(
+                    lambda row: construct(data, row), rows)), args.repeat),
+                'shared': best_time(lambda: list(executor.map(
+                    pool.infer, rows)), args.repeat),
+                'batch': best_time(lambda: list(executor.map(
+                    compiled.infer_batch, chunks)), args.repeat)}
+        results.append({
+            'threads': threads,
+            'construct_rows_per_second': args.rows / seconds['construct'],
+            'shared_rows_per_second': args.rows / seconds['shared'],
+            'batch_rows_per_second': args.batch_rows / seconds['batch']})
+    write_json_file(args.json, {'benchmark': 'threads',
+                                'rows': args.rows,
+                                'batch_rows': args.batch_rows,
+                                'cpus': os.cpu_count(),
+                                'results': results})
+
+
+if __name__ == '__main__':
+    main()
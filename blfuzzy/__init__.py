@@ -1,13 +1,48 @@
 # Expose
+import importlib
 from blfuzzy.engine import FuzzyInferenceEngine
 from blfuzzy.engine import Variable
+from blfuzzy.engine import InferenceContext
+from blfuzzy.engine import ContextPool
+from blfuzzy.compiled import CompiledEngine
+from blfuzzy.registry import EngineRegistry
+from blfuzzy.pipeline import Pipeline
+from blfuzzy.minimize import minimize_rules
+from blfuzzy.stats import Stats
 from blfuzzy.helper import get_default_mf_params
 from blfuzzy.helper import get_var_range
 from blfuzzy.helper import get_rules_from_excel
 from blfuzzy.helper import get_variables_from_excel
+from blfuzzy.helper import get_rules_from_csv
+from blfuzzy.helper import get_variables_from_csv
 from blfuzzy.constants import VARIABLES, MIN, MAX, LEVELS
 from blfuzzy.constants import RULES, VARIABLES, AGGREGATION, DEFUZZIFICATION
 from blfuzzy.constants import TRIANGLE, CENTROID, AVERAGE
 from blfuzzy.constants import OR, AND, SUM, NAME, MIN, MAX, LEVELS
 from blfuzzy.constants import LEVEL, MF_TYPE, MF_PARAMS, WEIGHT
 from blfuzzy.constants import OPERATOR, IMPLICATION, ANTECEDENT, CONSEQUENT
+
+# Exposed on first use, so that importing blfuzzy does not import
+# multiprocessing, nor modules a program may not need
+LAZY = {
+        'IncrementalEngine': 'blfuzzy.incremental',
+        'infer_stream': 'blfuzzy.streaming',
+        'run_stream': 'blfuzzy.streaming',
+        'WorkerPool': 'blfuzzy.parallel',
+        'Surface': 'blfuzzy.surface',
+        'MicroBatcher': 'blfuzzy.server',
+        'InferenceServer': 'blfuzzy.server',
+}
+
+
+def __getattr__(name):
+    if name not in LAZY:
+        raise AttributeError('module "{}" has no attribute "{}"'.format(
+            __name__, name))
+    value = getattr(importlib.import_module(LAZY[name]), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + list(LAZY))
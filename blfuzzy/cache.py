@@ -0,0 +1,79 @@
+import threading
+from collections import OrderedDict
+
+_missing = object()
+
+
+class LRUCache(object):
+    """Bounded mapping that evicts the least recently used entry when full,
+    with hit and miss counts. Access is locked, so one cache can be shared by
+    threads.
+    :attr maxsize: (int) maximum number of entries
+    :attr hits: (int) lookups that found an entry
+    :attr misses: (int) lookups that did not
+    """
+
+    def __init__(self, maxsize):
+        """
+        :param maxsize: (int) maximum number of entries
+        """
+        if maxsize < 1:
+            raise ValueError('maxsize must be positive')
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __getstate__(self):
+        return {'maxsize': self.maxsize, 'entries': self.entries,
+                'hits': self.hits, 'misses': self.misses}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key, default=None):
+        """
+        :param key: hashable key
+        :param default: returned if key is not cached
+        :returns: cached value, or default
+        """
+        with self.lock:
+            value = self.entries.get(key, _missing)
+            if value is _missing:
+                self.misses += 1
+                return default
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """
+        :param key: hashable key
+        :param value: value to cache
+        """
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            if len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        """Removes all entries and resets the hit and miss counts.
+        """
+        with self.lock:
+            self.entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def info(self):
+        """
+        :returns: (dict) hits, misses, size and maxsize (int)
+        """
+        with self.lock:
+            return {'hits': self.hits, 'misses': self.misses,
+                    'size': len(self.entries), 'maxsize': self.maxsize}
@@ -0,0 +1,932 @@
+import os
+import json
+import numpy as np
+from collections import namedtuple
+from contextlib import contextmanager
+from blfuzzy.constants import NAME, LEVEL, WEIGHT, X, LEVELS
+from blfuzzy.constants import VARIABLES, RULES, AGGREGATION, DEFUZZIFICATION
+from blfuzzy.constants import OPERATOR, IMPLICATION, ANTECEDENT, CONSEQUENT
+from blfuzzy.constants import AND, OR, MIN, TRIANGLE, EXACT_CENTROID
+from blfuzzy.constants import AGGREGATE_ELEMENTS, STRENGTH_ELEMENTS
+from blfuzzy import helper, kernels
+from blfuzzy.engine import FuzzyInferenceEngine
+from blfuzzy.helper import check_value, check_values
+from blfuzzy.stats import FUZZIFY, EVALUATE, AGGREGATE, DEFUZZIFY, timer
+from blfuzzy.cache import LRUCache
+from blfuzzy.minimize import minimize_rules
+
+NO_LEVEL = -1  # level index of variables a rule does not reference
+OPERATORS = [AND, OR]  # operator codes are indices into this list
+FORMAT = 2  # version of the files written by CompiledEngine.save()
+HEADER = 'engine.json'  # header file of a saved CompiledEngine
+ARRAYS = ['antecedent_levels', 'consequent_levels', 'operators',
+          'weights']  # rule arrays stored by CompiledEngine.save()
+
+CompiledRule = namedtuple(
+        'CompiledRule',
+        ['operator', 'antecedent', 'weight', 'implication', 'consequent'])
+CompiledRule.__doc__ = """Rule definition, with variables resolved.
+    :attr operator: (str) antecedent operator type
+    :attr antecedent: (tuple) of (variable name, level name) pairs
+    :attr weight: (float) rule importance (0-1)
+    :attr implication: (str) consequent implication method
+    :attr consequent: (tuple) of (variable name, level name) pairs
+    """
+
+
+@contextmanager
+def replacing(pathname, mode):
+    """Opens a temporary file that replaces pathname once it is written.
+    :param pathname: (str) pathname to file
+    :param mode: (str) open() mode
+    :returns: (file) temporary file, open for writing
+    """
+    pathname_tmp = pathname + '.tmp'
+    try:
+        with open(pathname_tmp, mode) as fd:
+            yield fd
+        os.replace(pathname_tmp, pathname)
+    finally:
+        if os.path.exists(pathname_tmp):
+            os.remove(pathname_tmp)
+
+
+class CompiledEngine(object):
+    """Rule base compiled once from a specification, evaluated many times.
+    Variables, membership functions and rules are built at construction;
+    infer() keeps every intermediate result local to the call, so the same
+    object can be used repeatedly, and re-entrantly, for different inputs.
+    Results are the same as those of FuzzyInferenceEngine.run().
+    Rules are stored as flat arrays, one row per rule, rather than as
+    objects; the rules attribute rebuilds a readable view of them. save()
+    and load() store and map those arrays, so that workers start without
+    parsing the specification.
+    :attr aggregation: (str) name membership function aggregation method
+    :attr defuzzification: (str) name of defuzzification method
+    :attr missing_values: (boolean) compute with missing values
+    :attr inputs: (list) input variable names
+    :attr outputs: (list) output variable names
+    :attr levels: (dict) variable name (str) -> level names (list)
+    :attr x: (dict) variable name (str) -> variable range (ndarray)
+    :attr mfs: (dict) output variable name (str) -> level name (str) -> mf
+               (ndarray); inputs are fuzzified from their mf params, so
+               their mfs are not sampled over the range
+    :attr level_mfs: (dict) output variable name (str) -> 2d array of the
+                     level mfs, one row per level
+    :attr params: (dict) variable name (str) -> level name (str) -> mf type
+                  (str), mf params (ndarray)
+    :attr mf_groups: (dict) input variable name (str) -> (mf type (str),
+                     level indices (ndarray), 2d array of their params, one
+                     row per level) for each mf type of the variable (list)
+    :attr input_mf_groups: (list) the same, for all input variables at
+                           once, with the variable indices of the levels
+    :attr antecedent_levels: (ndarray) 2d array of level indices: rules x
+                             inputs, NO_LEVEL where a rule does not
+                             reference an input
+    :attr consequent_levels: (ndarray) 2d array of level indices: rules x
+                             outputs, NO_LEVEL where a rule does not
+                             reference an output
+    :attr operators: (ndarray) operator code of each rule (see OPERATORS)
+    :attr weights: (ndarray) weight of each rule
+    :attr rule_levels: (dict) output variable name (str) -> (indices of the
+                       rules that reference it (ndarray), their level
+                       indices (ndarray))
+    :attr rule_index: (dict) (variable name, level name) -> indices of the
+                      rules whose antecedent references the level (ndarray)
+    :attr var_rules: (dict) input variable name (str) -> indices of the rules
+                     whose antecedent references the variable (ndarray)
+    :attr rule_sizes: (ndarray) number of antecedent operands of each rule
+    :attr rule_or: (ndarray) whether each rule's antecedent operator is OR
+    :attr stats: (Stats) instrumentation, or None if disabled
+    :attr fuzzy_cache: (LRUCache) (variable name, value) -> fuzzy values of
+                       the variable's levels (tuple), or None if disabled
+    :attr result_cache: (LRUCache) input values (tuple) -> infer() result
+                        (dict), or None if disabled
+    :attr minimized: (dict) rule counts of the minimization (see
+                     minimize_rules()), or None if the rules were compiled
+                     as given
+    """
+
+    def __init__(self, data, missing_values=False, stats=None,
+                 fuzzy_cache_size=None, result_cache_size=None,
+                 minimize=False):
+        """
+        :param data: (dict) specification of system; values are ignored
+        :param missing_values: (boolean) compute with missing values
+        :param stats: (Stats) instrumentation to record inference into
+        :param fuzzy_cache_size: (int) number of fuzzified input values to
+                                 keep for infer(), or None for no cache
+        :param result_cache_size: (int) number of infer() results to keep,
+                                  or None for no cache
+        :param minimize: (boolean) compile the rules rewritten into fewer
+                         rules of the same outputs (see minimize_rules());
+                         inputs and outputs are those of the rules given
+        """
+        self.aggregation = data[AGGREGATION]
+        self.defuzzification = data[DEFUZZIFICATION]
+        self.set_options(missing_values, stats, fuzzy_cache_size,
+                         result_cache_size)
+        variables = FuzzyInferenceEngine.input_variables(data[VARIABLES])
+        self.inputs = self.get_variable_names(data[RULES], ANTECEDENT)
+        self.outputs = self.get_variable_names(data[RULES], CONSEQUENT)
+        self.levels = {}
+        self.x = {}
+        self.mfs = {}
+        self.params = {}
+        for varname in self.inputs + self.outputs:
+            self.levels[varname] = list(variables[varname].params)
+            self.x[varname] = variables[varname].x
+            self.params[varname] = variables[varname].params
+        for varname in self.outputs:
+            self.mfs[varname] = variables[varname].mfs
+        self.level_mfs = {varname: np.array(list(self.mfs[varname].values()))
+                          for varname in self.outputs}
+        self.minimized = None
+        if minimize:
+            data, self.minimized = minimize_rules(data, missing_values)
+        self.input_rules(data[RULES])
+        self.index_rules()
+        if self.defuzzification == EXACT_CENTROID:
+            self.check_exact()
+
+    def set_options(self, missing_values, stats, fuzzy_cache_size,
+                    result_cache_size):
+        """
+        :param missing_values: (boolean) compute with missing values
+        :param stats: (Stats) instrumentation to record inference into
+        :param fuzzy_cache_size: (int) size of the fuzzification cache, or
+                                 None for no cache
+        :param result_cache_size: (int) size of the result cache, or None
+                                  for no cache
+        """
+        self.missing_values = missing_values
+        self.stats = stats
+        self.fuzzy_cache = None
+        self.result_cache = None
+        if fuzzy_cache_size is not None:
+            self.fuzzy_cache = LRUCache(fuzzy_cache_size)
+        if result_cache_size is not None:
+            self.result_cache = LRUCache(result_cache_size)
+
+    def index_rules(self):
+        """Derives from the rule arrays the indexes used by inference:
+        rule_levels, rule_index, var_rules, rule_sizes and rule_or.
+        """
+        self.rule_levels = self.get_rule_levels()
+        self.rule_index, self.var_rules = self.get_rule_index()
+        self.rule_sizes = np.count_nonzero(
+                self.antecedent_levels != NO_LEVEL, axis=1)
+        self.rule_or = self.operators == OPERATORS.index(OR)
+        self.mf_groups = {varname: self.get_mf_groups(varname)
+                          for varname in self.inputs}
+        self.input_mf_groups = self.get_input_mf_groups()
+
+    def get_mf_groups(self, varname):
+        """Groups the levels of a variable by mf type, so that a value is
+        fuzzified for all the levels of a type at once.
+        :param varname: (str) variable name
+        :returns: (list) mf type (str), level indices (ndarray), 2d array of
+                  their params, one row per level (ndarray)
+        """
+        types = {}
+        for k, (typename, params) in enumerate(self.params[varname].values()):
+            types.setdefault(typename, []).append(k)
+        ret = []
+        for typename, indices in types.items():
+            params = [self.params[varname][self.levels[varname][k]][1]
+                      for k in indices]
+            ret.append((typename, np.array(indices), np.array(params)))
+        return ret
+
+    def get_input_mf_groups(self):
+        """Groups the levels of all input variables by mf type.
+        :returns: (list) mf type (str), variable indices (ndarray), level
+                  indices (ndarray), 2d array of their params, one row per
+                  level (ndarray)
+        """
+        types = {}
+        for j, varname in enumerate(self.inputs):
+            for typename, indices, params in self.mf_groups[varname]:
+                group = types.setdefault(typename, ([], [], []))
+                group[0].append(np.full(len(indices), j))
+                group[1].append(indices)
+                group[2].append(params)
+        return [(typename, np.concatenate(rows), np.concatenate(cols),
+                 np.concatenate(params))
+                for typename, (rows, cols, params) in types.items()]
+
+    def save(self, pathname):
+        """Stores the compiled rule base to a directory: one .npy file per
+        array, which load() can memory-map, and a header file with the
+        names, settings and mf params. An existing header is removed first
+        and the new one written last, so a directory whose save was
+        interrupted has none and is not loaded. Files are written under a
+        temporary name and renamed into place, so processes that mapped the
+        previous arrays keep reading them unchanged.
+        :param pathname: (str) pathname to directory, created if needed
+        """
+        os.makedirs(pathname, exist_ok=True)
+        pathname_header = os.path.join(pathname, HEADER)
+        if os.path.exists(pathname_header):
+            os.remove(pathname_header)
+        arrays = {name: getattr(self, name) for name in ARRAYS}
+        for i, varname in enumerate(self.inputs + self.outputs):
+            arrays['x_{}'.format(i)] = self.x[varname]
+            if varname in self.mfs:
+                arrays['mfs_{}'.format(i)] = self.level_mfs[varname]
+        for name, array in arrays.items():
+            with replacing(os.path.join(pathname, name + '.npy'), 'wb') as fd:
+                np.save(fd, array)
+        params = {}
+        for varname in self.inputs + self.outputs:
+            params[varname] = [[typename, np.asarray(levelparams).tolist()]
+                               for typename, levelparams in
+                               self.params[varname].values()]
+        header = {'format': FORMAT,
+                  AGGREGATION: self.aggregation,
+                  DEFUZZIFICATION: self.defuzzification,
+                  'missing_values': self.missing_values,
+                  'minimized': self.minimized,
+                  'inputs': self.inputs,
+                  'outputs': self.outputs,
+                  LEVELS: self.levels,
+                  'params': params}
+        with replacing(pathname_header, 'w') as fd:
+            json.dump(header, fd)
+
+    @classmethod
+    def load(self, pathname, mmap_mode='r', missing_values=None, stats=None,
+             fuzzy_cache_size=None, result_cache_size=None):
+        """Reads a compiled rule base stored with save(), without parsing a
+        specification. With mmap_mode='r' the arrays are mapped read-only
+        rather than read, so processes loading the same directory share
+        their pages; the engine must then not be changed in place.
+        :param pathname: (str) pathname to directory
+        :param mmap_mode: (str) np.load() mmap_mode, or None to read the
+                          arrays into memory
+        :param missing_values: (boolean) compute with missing values, or
+                               None for the saved setting
+        :param stats: (Stats) instrumentation to record inference into
+        :param fuzzy_cache_size: (int) number of fuzzified input values to
+                                 keep for infer(), or None for no cache
+        :param result_cache_size: (int) number of infer() results to keep,
+                                  or None for no cache
+        :returns: (CompiledEngine) compiled rule base
+        :raises ValueError: missing header or unsupported format version, or
+                            missing values for rules minimized without
+        """
+        pathname_header = os.path.join(pathname, HEADER)
+        if not os.path.exists(pathname_header):
+            raise ValueError('"{}" not found'.format(pathname_header))
+        with open(pathname_header) as fd:
+            header = json.load(fd)
+        if header.get('format') != FORMAT:
+            raise ValueError('"{}" has format {}, expected {}'.format(
+                pathname, header.get('format'), FORMAT))
+
+        def read(name):
+            return np.load(os.path.join(pathname, name + '.npy'),
+                           mmap_mode=mmap_mode)
+
+        ret = self.__new__(self)
+        ret.aggregation = header[AGGREGATION]
+        ret.defuzzification = header[DEFUZZIFICATION]
+        if missing_values is None:
+            missing_values = header['missing_values']
+        ret.minimized = header.get('minimized')
+        if (ret.minimized is not None and missing_values and
+                not header['missing_values']):
+            # merged and dropped rules may have made missing values count
+            raise ValueError('"{}" rules minimized without missing '
+                             'values'.format(pathname))
+        ret.set_options(missing_values, stats, fuzzy_cache_size,
+                        result_cache_size)
+        ret.inputs = header['inputs']
+        ret.outputs = header['outputs']
+        ret.levels = header[LEVELS]
+        ret.x = {}
+        ret.mfs = {}
+        ret.params = {}
+        ret.level_mfs = {}
+        for i, varname in enumerate(ret.inputs + ret.outputs):
+            levels = ret.levels[varname]
+            ret.x[varname] = read('x_{}'.format(i))
+            ret.params[varname] = {
+                    level: (typename, np.array(levelparams))
+                    for level, (typename, levelparams) in
+                    zip(levels, header['params'][varname])}
+            if varname in ret.outputs:
+                mfs = read('mfs_{}'.format(i))
+                ret.mfs[varname] = dict(zip(levels, mfs))
+                ret.level_mfs[varname] = mfs
+        (ret.antecedent_levels, ret.consequent_levels, ret.operators,
+         ret.weights) = [read(name) for name in ARRAYS]
+        ret.index_rules()
+        return ret
+
+    @classmethod
+    def get_variable_names(self, data, part):
+        """Returns the names of the variables referenced by the rules, in
+        order of first appearance.
+        :param data: (list) of rule data
+        :param part: (str) ANTECEDENT or CONSEQUENT
+        :returns: (list) variable names (str)
+        """
+        ret = []
+        for ruledata in data:
+            for vardata in ruledata[part][VARIABLES]:
+                if vardata[NAME] not in ret:
+                    ret.append(vardata[NAME])
+        return ret
+
+    def input_rules(self, data):
+        """Resolves the rules' variable and level references into the rule
+        arrays: antecedent_levels, consequent_levels, operators and weights.
+        :param data: (list) of rule data
+        :raises ValueError: unknown level or operator
+        """
+        n = len(data)
+        self.antecedent_levels = np.full((n, len(self.inputs)), NO_LEVEL,
+                                         dtype=np.int32)
+        self.consequent_levels = np.full((n, len(self.outputs)), NO_LEVEL,
+                                         dtype=np.int32)
+        self.operators = np.empty(n, dtype=np.int8)
+        self.weights = np.empty(n)
+        columns = {}
+        for part, names in ((ANTECEDENT, self.inputs),
+                            (CONSEQUENT, self.outputs)):
+            for j, varname in enumerate(names):
+                levels = {level: k for k, level in
+                          enumerate(self.levels[varname])}
+                columns[(part, varname)] = (j, levels)
+        for i, ruledata in enumerate(data):
+            antecedent = ruledata[ANTECEDENT]
+            consequent = ruledata[CONSEQUENT]
+            if antecedent[OPERATOR] not in OPERATORS:
+                raise ValueError('"{}" is not an operator'.format(
+                    antecedent[OPERATOR]))
+            # arrays are implicated with np.fmin
+            assert(consequent[IMPLICATION] == MIN)
+            self.operators[i] = OPERATORS.index(antecedent[OPERATOR])
+            self.weights[i] = ruledata[WEIGHT]
+            for part, array in ((ANTECEDENT, self.antecedent_levels),
+                                (CONSEQUENT, self.consequent_levels)):
+                for vardata in ruledata[part][VARIABLES]:
+                    varname = vardata[NAME]
+                    level = vardata[LEVEL]
+                    j, levels = columns[(part, varname)]
+                    if level not in levels:
+                        raise ValueError('"{}" has no level "{}"'.format(
+                            varname, level))
+                    array[i, j] = levels[level]
+
+    @property
+    def nbytes(self):
+        """Bytes of the arrays of the compiled rule base: ranges, mf tables
+        and params, rule arrays and indices; memory-mapped arrays count in
+        full, caches do not count.
+        :returns: (int) bytes
+        """
+        arrays = list(self.x.values()) + list(self.level_mfs.values())
+        for varname, mfs in self.mfs.items():
+            # level mfs of a loaded engine are views of level_mfs
+            arrays.extend(mf for mf in mfs.values()
+                          if mf.base is not self.level_mfs[varname])
+        for params in self.params.values():
+            arrays.extend(levelparams for typename, levelparams in
+                          params.values())
+        arrays.extend(getattr(self, name) for name in ARRAYS)
+        for indices, levels in self.rule_levels.values():
+            arrays.extend([indices, levels])
+        arrays.extend(self.rule_index.values())
+        arrays.extend(self.var_rules.values())
+        arrays.extend([self.rule_sizes, self.rule_or])
+        for groups in self.mf_groups.values():
+            for typename, indices, params in groups:
+                arrays.extend([indices, params])
+        for typename, rows, cols, params in self.input_mf_groups:
+            arrays.extend([rows, cols, params])
+        return sum(array.nbytes for array in arrays)
+
+    @property
+    def rules(self):
+        """Readable view of the rule arrays.
+        :returns: (list) compiled rules (CompiledRule)
+        """
+        return [self.get_rule(i) for i in range(len(self.weights))]
+
+    def get_rule(self, index):
+        """
+        :param index: (int) rule index
+        :returns: (CompiledRule) rule, with variable and level names
+        """
+        parts = []
+        for names, levels in ((self.inputs, self.antecedent_levels[index]),
+                              (self.outputs, self.consequent_levels[index])):
+            parts.append(tuple((varname, self.levels[varname][level])
+                               for varname, level in zip(names, levels)
+                               if level != NO_LEVEL))
+        return CompiledRule(OPERATORS[self.operators[index]], parts[0],
+                            float(self.weights[index]), MIN, parts[1])
+
+    def as_dict(self):
+        variables = {}
+        for varname in self.inputs + self.outputs:
+            x = self.x[varname]
+            variables[varname] = {
+                    NAME: varname,
+                    X: x.tolist(),
+                    LEVELS: {level: kernels.membership(typename, x,
+                                                       params).tolist()
+                             for level, (typename, params) in
+                             self.params[varname].items()}}
+        rules = []
+        for rule in self.rules:
+            rules.append({
+                WEIGHT: rule.weight,
+                ANTECEDENT: {
+                    OPERATOR: rule.operator,
+                    VARIABLES: [{NAME: varname, LEVEL: level}
+                                for varname, level in rule.antecedent]},
+                CONSEQUENT: {
+                    IMPLICATION: rule.implication,
+                    VARIABLES: [{NAME: varname, LEVEL: level}
+                                for varname, level in rule.consequent]}})
+        return {VARIABLES: variables,
+                RULES: rules,
+                AGGREGATION: self.aggregation,
+                DEFUZZIFICATION: self.defuzzification}
+
+    def get_rule_levels(self):
+        """Collects, per output variable, the rules that reference it and the
+        levels they imply, so that implication and aggregation can be done
+        on whole arrays.
+        :returns: (dict) output variable name (str) -> (rule indices
+                  (ndarray), level indices (ndarray))
+        """
+        ret = {}
+        for j, varname in enumerate(self.outputs):
+            levels = self.consequent_levels[:, j]
+            indices = np.flatnonzero(levels != NO_LEVEL)
+            ret[varname] = (indices, levels[indices].astype(int))
+        return ret
+
+    def get_rule_index(self):
+        """Indexes the rules by the input variables and levels referenced by
+        their antecedents.
+        :returns: (tuple) (variable name, level name) -> rule indices
+                  (ndarray), variable name (str) -> rule indices (ndarray)
+        """
+        levels = {}
+        variables = {}
+        for j, varname in enumerate(self.inputs):
+            column = self.antecedent_levels[:, j]
+            variables[varname] = np.flatnonzero(column != NO_LEVEL)
+            for k, level in enumerate(self.levels[varname]):
+                indices = np.flatnonzero(column == k)
+                if len(indices):
+                    levels[(varname, level)] = indices
+        return levels, variables
+
+    def check_exact(self):
+        """Checks that the output variables can be defuzzified exactly.
+        :raises ValueError: some output mf is not a triangle
+        """
+        for varname in self.outputs:
+            for level, (typename, params) in self.params[varname].items():
+                if typename != TRIANGLE:
+                    raise ValueError('{} requires {} mfs: "{}" is {}'.format(
+                        EXACT_CENTROID, TRIANGLE, varname, typename))
+
+    def input_values(self, inputs):
+        """Checks input values against the variable ranges.
+        :param inputs: (dict) input variable name (str) -> value (float)
+        :returns: (dict) input variable name (str) -> value (float or None)
+        :raises ValueError: unknown variable, value missing or out of range
+        """
+        for varname in inputs:
+            if varname not in self.inputs:
+                raise ValueError('"{}" not found'.format(varname))
+        ret = {}
+        for varname in self.inputs:
+            value = check_value(self.x[varname], inputs.get(varname))
+            if value is None and self.missing_values is False:
+                raise ValueError('"{}" has no value'.format(varname))
+            ret[varname] = value
+        return ret
+
+    def infer(self, inputs):
+        """Perform fuzzy inference for one set of input values. Only the
+        rules that can fire are visited: with triangular mfs a value belongs
+        to few levels of a variable, so most rules of a large rule base have
+        a zero antecedent and would add nothing to the aggregation. Outputs
+        none of whose rules fire, or can be evaluated, for missing values,
+        are nan, as in infer_batch().
+        :param inputs: (dict) input variable name (str) -> value (float)
+        :returns: (dict) output variable name (str) -> crisp value (float)
+        """
+        stats = self.stats
+        with timer(stats, FUZZIFY):
+            values = self.input_values(inputs)
+            if self.result_cache is not None:
+                key = tuple(values[varname] for varname in self.inputs)
+                ret = self.result_cache.get(key)
+                if ret is not None:
+                    if stats is not None:
+                        stats.count(runs=1, rows=1)
+                    return dict(ret)
+            fuzzy_values = self.fuzzify_inputs(values)
+        with timer(stats, EVALUATE):
+            evaluable = self.get_evaluable_rules(values)
+            active = np.flatnonzero(self.get_active_rules(fuzzy_values) &
+                                    evaluable)
+            results = self.evaluate_antecedents(fuzzy_values, active)
+            results *= self.weights[active]
+        array_bytes = 0
+        if self.defuzzification == EXACT_CENTROID:
+            strengths = np.zeros((1, len(self.weights)))
+            strengths[0, active] = results
+            with timer(stats, DEFUZZIFY):
+                ret = {varname: value[0] for varname, value in
+                       self.defuzzify_exact(strengths).items()}
+        else:
+            ret = {}
+            for j, varname in enumerate(self.outputs):
+                with timer(stats, AGGREGATE):
+                    levels = self.consequent_levels[active, j]
+                    mask = levels != NO_LEVEL
+                    count = np.count_nonzero(
+                            evaluable[self.rule_levels[varname][0]])
+                    if count == 0:  # no rule could be evaluated
+                        ret[varname] = np.nan
+                        continue
+                    aggrmf = self.aggregate(varname, levels[mask],
+                                            results[mask], count)
+                with timer(stats, DEFUZZIFY):
+                    ret[varname] = kernels.defuzz_row(
+                            self.x[varname], aggrmf, self.defuzzification)
+                if stats is not None:
+                    array_bytes += 2 * aggrmf.nbytes
+        if stats is not None:
+            stats.count(runs=1, rows=1, rules_evaluated=len(active),
+                        rules_skipped=len(self.weights) - len(active),
+                        array_bytes=array_bytes)
+        if self.result_cache is not None:
+            self.result_cache.put(key, dict(ret))
+        return ret
+
+    def fuzzify_inputs(self, values):
+        """Fuzzifies the input values for all levels.
+        :param values: (dict) input variable name (str) -> value (float)
+        :returns: (ndarray) 2d array of fuzzy values: inputs x levels, with
+                  a last column of nan for NO_LEVEL; rows of variables
+                  without value are nan
+        """
+        width = max(len(self.levels[varname]) for varname in self.inputs)
+        ret = np.full((len(self.inputs), width + 1), np.nan)
+        if self.fuzzy_cache is None:
+            # all the levels of a type at once, for all variables
+            x = np.array([np.nan if values[varname] is None
+                          else values[varname] for varname in self.inputs])
+            for typename, rows, cols, params in self.input_mf_groups:
+                ret[rows, cols] = kernels.membership(typename, x[rows],
+                                                     params)
+            missing = np.isnan(x)
+            ret[missing] = np.nan
+            if self.stats is not None:
+                self.stats.count(interp_calls=sum(
+                    len(self.levels[varname]) for varname, skip in
+                    zip(self.inputs, missing) if not skip))
+            return ret
+        for j, varname in enumerate(self.inputs):
+            value = values[varname]
+            if value is None:
+                continue
+            fuzzy_values = self.fuzzify_variable(varname, value)
+            ret[j, :len(fuzzy_values)] = fuzzy_values
+        return ret
+
+    def fuzzify_variable(self, varname, value):
+        """Fuzzifies a value for all levels of a variable, through the
+        fuzzification cache if enabled.
+        :param varname: (str) variable name
+        :param value: (float) crisp value
+        :returns: (tuple) fuzzy values (float), in level order
+        """
+        if self.fuzzy_cache is not None:
+            ret = self.fuzzy_cache.get((varname, value))
+            if ret is not None:
+                return ret
+        fuzzy_values = np.empty(len(self.levels[varname]))
+        for typename, indices, params in self.mf_groups[varname]:
+            fuzzy_values[indices] = kernels.membership(typename, value, params)
+        ret = tuple(fuzzy_values.tolist())
+        if self.stats is not None:
+            self.stats.count(interp_calls=len(ret))
+        if self.fuzzy_cache is not None:
+            self.fuzzy_cache.put((varname, value), ret)
+        return ret
+
+    def invalidate(self):
+        """Empties the caches. Needed after changing the rules or the
+        membership functions of a compiled engine in place.
+        """
+        for cache in (self.fuzzy_cache, self.result_cache):
+            if cache is not None:
+                cache.clear()
+
+    def cache_info(self):
+        """
+        :returns: (dict) cache name (str) -> hits, misses, size and maxsize
+                  (dict), for the enabled caches
+        """
+        ret = {}
+        if self.fuzzy_cache is not None:
+            ret['fuzzy'] = self.fuzzy_cache.info()
+        if self.result_cache is not None:
+            ret['result'] = self.result_cache.info()
+        return ret
+
+    def get_evaluable_rules(self, values):
+        """Finds the rules whose antecedent variables all have values.
+        :param values: (dict) input variable name (str) -> value (float)
+        :returns: (ndarray) boolean mask over the rules
+        """
+        ret = np.ones(len(self.weights), dtype=bool)
+        for varname, value in values.items():
+            if value is None:
+                ret[self.var_rules[varname]] = False
+        return ret
+
+    def get_active_rules(self, fuzzy_values):
+        """Finds the rules that may have a non-zero antecedent: AND rules
+        whose levels are all non-zero, and OR rules with some non-zero level.
+        :param fuzzy_values: (ndarray) 2d array of fuzzy values: inputs x
+                             levels (see fuzzify_inputs)
+        :returns: (ndarray) boolean mask over the rules
+        """
+        hits = []
+        for j, k in zip(*np.nonzero(fuzzy_values > 0)):
+            varname = self.inputs[j]
+            indices = self.rule_index.get((varname, self.levels[varname][k]))
+            if indices is not None:
+                hits.append(indices)
+        if hits:
+            counts = np.bincount(np.concatenate(hits),
+                                 minlength=len(self.weights))
+        else:
+            counts = np.zeros(len(self.weights), dtype=int)
+        return np.where(self.rule_or, counts > 0, counts == self.rule_sizes)
+
+    def evaluate_antecedents(self, fuzzy_values, rules):
+        """Combines the fuzzy values of the antecedent operands of rules.
+        :param fuzzy_values: (ndarray) 2d array of fuzzy values: inputs x
+                             levels (see fuzzify_inputs)
+        :param rules: (ndarray) rule indices
+        :returns: (ndarray) antecedent fuzzy value of each rule
+        """
+        # NO_LEVEL picks the nan column, which fmin and fmax ignore
+        operands = fuzzy_values[np.arange(len(self.inputs)),
+                                self.antecedent_levels[rules]]
+        return np.where(self.rule_or[rules], np.fmax.reduce(operands, axis=1),
+                        np.fmin.reduce(operands, axis=1))
+
+    def aggregate(self, varname, levels, strengths, count):
+        """Implicates and aggregates the consequent mfs of the active rules.
+        Rules left out have zero implicated mfs, which change neither the
+        maximum nor the sum, but do count towards the average.
+        :param varname: (str) output variable name
+        :param levels: (ndarray) level index of each active rule
+        :param strengths: (ndarray) firing strength of each active rule
+        :param count: (int) number of rules that could be evaluated (> 0)
+        :returns: (ndarray) aggregated mf
+        """
+        assert(count > 0)
+        if not len(levels):
+            return np.zeros(len(self.x[varname]))
+        return helper.aggregate_levels(self.level_mfs[varname], levels,
+                                       strengths, self.aggregation, count)
+
+    def fuzzify(self, varname, level, value):
+        """Convert a crisp value to a degree of membership for a given fuzzy
+        set (level), evaluating its mf from the params.
+        :param varname: (str) variable name
+        :param level: (str) level name
+        :param value: (float) crisp value, or None if missing
+        :returns: (float) fuzzy value, or None if value is missing
+        """
+        if value is None:
+            return None
+        typename, params = self.params[varname][level]
+        return float(kernels.membership(typename, value, params))
+
+    def input_arrays(self, inputs):
+        """Checks arrays of input values against the variable ranges. With
+        missing values, nan stands for a missing value.
+        :param inputs: (dict) input variable name (str) -> values (1d array)
+        :returns: (dict) input variable name (str) -> values (ndarray)
+        :raises ValueError: unknown variable, value missing or out of range,
+                            or arrays of different lengths
+        """
+        for varname in inputs:
+            if varname not in self.inputs:
+                raise ValueError('"{}" not found'.format(varname))
+        ret = {}
+        for varname in self.inputs:
+            values = inputs.get(varname)
+            if values is None or (self.missing_values is False and
+                                  np.isnan(values).any()):
+                raise ValueError('"{}" has no value'.format(varname))
+            ret[varname] = check_values(self.x[varname], values)
+        if len(set(len(values) for values in ret.values())) > 1:
+            raise ValueError('input arrays differ in length')
+        return ret
+
+    def infer_batch(self, inputs, parallel=None):
+        """Perform fuzzy inference for many sets of input values at once, in
+        chunks of rows, so that memory use does not grow with the number of
+        rows beyond the input and output arrays. For each chunk:
+            1) fuzzify every input value: one array per variable level
+            2) compute the firing strength of every rule: rows x rules
+            3) implicate and aggregate, in smaller chunks of rows: rows x
+               rules x range, then reduce over rules; rules that do not fire
+               for any row of a chunk are left out
+            4) defuzzify each row's aggregated membership function
+        With missing values, nan inputs are missing, as None is for infer():
+        the rules that reference a missing variable do not fire, nor count
+        towards the average. Rows where no rule fires, or none can be
+        evaluated, have nan outputs.
+        :param inputs: (dict) input variable name (str) -> values (1d array)
+        :param parallel: (int) number of worker processes to split the rows
+                         across, or (WorkerPool) a running pool of this
+                         engine to use
+        :returns: (dict) output variable name (str) -> crisp values (ndarray)
+        :raises ValueError: invalid input values, or pool of another engine
+        """
+        if parallel is not None:
+            # multiprocessing is only imported when asked for
+            from blfuzzy.parallel import WorkerPool
+            if isinstance(parallel, WorkerPool):
+                if parallel.engine is not self:
+                    raise ValueError('pool is for another engine')
+                return parallel.infer_batch(inputs)
+            with WorkerPool(self, parallel) as pool:
+                return pool.infer_batch(inputs)
+        stats = self.stats
+        with timer(stats, FUZZIFY):
+            values = self.input_arrays(inputs)
+            n = len(next(iter(values.values())))
+        if stats is not None:
+            # as in infer(): every level of each input that has a value
+            stats.count(runs=1, rows=n, interp_calls=sum(
+                    len(self.levels[varname]) *
+                    int(np.count_nonzero(~np.isnan(array)))
+                    for varname, array in values.items()))
+        ret = {varname: np.empty(n) for varname in self.outputs}
+        size = max(1, STRENGTH_ELEMENTS // max(1, len(self.weights)))
+        for start in range(0, n, size):
+            stop = min(start + size, n)
+            outputs = self.infer_rows({varname: array[start:stop]
+                                       for varname, array in values.items()},
+                                      stop - start)
+            for varname, array in outputs.items():
+                ret[varname][start:stop] = array
+        return ret
+
+    def infer_rows(self, values, n):
+        """Perform fuzzy inference for a chunk of rows of infer_batch().
+        :param values: (dict) input variable name (str) -> checked values
+                       (ndarray), nan if missing
+        :param n: (int) number of rows
+        :returns: (dict) output variable name (str) -> crisp values (ndarray)
+        """
+        stats = self.stats
+        with timer(stats, EVALUATE):
+            strengths = self.evaluate_rules_batch(values, n)
+            evaluable = self.get_evaluable_rules_batch(values, n)
+            if evaluable is not None:
+                strengths[~evaluable] = 0.0
+        if stats is not None:
+            evaluated = n * len(self.weights) if evaluable is None else \
+                np.count_nonzero(evaluable)
+            stats.count(rules_evaluated=evaluated)
+        if self.defuzzification == EXACT_CENTROID:
+            with timer(stats, DEFUZZIFY):
+                ret = self.defuzzify_exact(strengths)
+            if evaluable is not None:
+                for varname, values in ret.items():
+                    indices = self.rule_levels[varname][0]
+                    values[~evaluable[:, indices].any(axis=1)] = np.nan
+            return ret
+        ret = {}
+        for varname in self.outputs:
+            indices, levels = self.rule_levels[varname]
+            counts = None
+            if evaluable is not None:
+                counts = np.count_nonzero(evaluable[:, indices], axis=1)
+            ret[varname] = np.empty(n)
+            # the aggregated mfs and a clipping buffer are the only arrays
+            # of rows x range
+            size = max(1, AGGREGATE_ELEMENTS // len(self.x[varname]))
+            for start in range(0, n, size):
+                stop = min(start + size, n)
+                with timer(stats, AGGREGATE):
+                    chunk = strengths[start:stop, indices]
+                    active = chunk.any(axis=0)
+                    count = len(indices)
+                    if counts is not None:
+                        # per row; rows without evaluable rules are nan
+                        count = np.fmax(counts[start:stop, np.newaxis], 1)
+                    aggrmfs = self.aggregate_batch(varname, levels[active],
+                                                   chunk[:, active], count)
+                with timer(stats, DEFUZZIFY):
+                    ret[varname][start:stop] = kernels.defuzz(
+                            self.x[varname], aggrmfs, self.defuzzification)
+                if stats is not None:
+                    stats.count(rules_skipped=(stop - start) * (
+                                    len(indices) - np.count_nonzero(active)),
+                                array_bytes=2 * aggrmfs.nbytes)
+            if counts is not None:
+                ret[varname][counts == 0] = np.nan
+        return ret
+
+    def evaluate_rules_batch(self, values, n):
+        """Computes the rules' weighted antecedent fuzzy values for all rows,
+        one input variable at a time: each variable's fuzzy values are
+        gathered for all the rules that reference it and combined with the
+        operands of the previous variables.
+        :param values: (dict) input variable name (str) -> values (ndarray)
+        :param n: (int) number of rows
+        :returns: (ndarray) 2d array of firing strengths: rows x rules
+        """
+        # rules x rows, so that gathering a rule's operands copies rows;
+        # nan is the identity of fmin and fmax
+        ret = np.full((len(self.weights), n), np.nan)
+        groups = [(np.fmin, ~self.rule_or), (np.fmax, self.rule_or)]
+        for j, varname in enumerate(self.inputs):
+            column = self.antecedent_levels[:, j]
+            fuzzy_values = np.empty((len(self.levels[varname]), n))
+            for typename, indices, params in self.mf_groups[varname]:
+                # levels x rows, evaluated from the params
+                fuzzy_values[indices] = kernels.membership(
+                        typename, values[varname], params[:, np.newaxis, :])
+            for fn, group in groups:
+                mask = (column != NO_LEVEL) & group
+                if mask.all():
+                    fn(ret, fuzzy_values[column], out=ret)
+                elif mask.any():
+                    rules = np.flatnonzero(mask)
+                    ret[rules] = fn(ret[rules], fuzzy_values[column[rules]])
+        ret *= self.weights[:, np.newaxis]
+        return ret.T
+
+    def get_evaluable_rules_batch(self, values, n):
+        """Finds, for every row, the rules whose antecedent variables all
+        have values.
+        :param values: (dict) input variable name (str) -> values (ndarray),
+                       nan if missing
+        :param n: (int) number of rows
+        :returns: (ndarray) 2d boolean mask: rows x rules, or None if no
+                  value is missing
+        """
+        ret = None
+        for varname in self.inputs:
+            missing = np.flatnonzero(np.isnan(values[varname]))
+            if not len(missing):
+                continue
+            if ret is None:
+                ret = np.ones((n, len(self.weights)), dtype=bool)
+            ret[np.ix_(missing, self.var_rules[varname])] = False
+        return ret
+
+    def aggregate_batch(self, varname, levels, strengths, count):
+        """Implicates and aggregates the consequent mfs of a chunk of rows.
+        :param varname: (str) output variable name
+        :param levels: (ndarray) level index of each active rule
+        :param strengths: (ndarray) 2d array of firing strengths: rows x
+                          active rules
+        :param count: (int) number of rules, active or not, for the average,
+                      or (ndarray) 2d array of the count of each row: rows x 1
+        :returns: (ndarray) 2d array of aggregated mfs, one per row
+        """
+        if not len(levels):
+            return np.zeros((len(strengths), len(self.x[varname])))
+        return helper.aggregate_levels(self.level_mfs[varname], levels,
+                                       strengths, self.aggregation, count)
+
+    def defuzzify_exact(self, strengths):
+        """Computes the exact centroids of the output variables, from the
+        rules' firing strengths and the output triangle params.
+        :param strengths: (ndarray) 2d array of firing strengths: rows x rules
+        :returns: (dict) output variable name (str) -> crisp values (ndarray)
+        """
+        ret = {}
+        for varname in self.outputs:
+            indices, levels = self.rule_levels[varname]
+            params = [params for typename, params in
+                      self.params[varname].values()]
+            x = self.x[varname]
+            ret[varname] = kernels.exact_centroid(
+                    params, levels, strengths[:, indices], self.aggregation,
+                    x[0], x[-1])
+        return ret
@@ -11,6 +11,9 @@ LEVELS = 'levels'
 MF_TYPE = 'mf_type'
 MF_PARAMS = 'mf_params'
 TRIANGLE = 'triangle'
+TRAPEZOID = 'trapezoid'
+GAUSSIAN = 'gaussian'
+SIGMOID = 'sigmoid'
 RULES = 'rules'
 WEIGHT = 'weight'
 ANTECEDENT = 'antecedent'
@@ -24,6 +27,11 @@ IMPLICATION = 'implication'
 AGGREGATION = 'aggregation'
 DEFUZZIFICATION = 'defuzzification'
 CENTROID = 'centroid'
+BISECTOR = 'bisector'
+MOM = 'mom'
+SOM = 'som'
+LOM = 'lom'
+EXACT_CENTROID = 'exact_centroid'
 
 X = 'x'
 VALUES = 'values'
@@ -38,3 +46,10 @@ AVERAGE = 'average'
 DEFAULTS_FILE = 'defaults.yaml'
 DEFAULT_MF_TYPE = TRIANGLE
 INTERVALS = 10
+BATCH_ELEMENTS = 2 ** 22  # max size of batch rules x range arrays
+AGGREGATE_ELEMENTS = 2 ** 17  # size of aggregation buffers, to fit in cache
+STRENGTH_ELEMENTS = 2 ** 20  # max size of batch rows x rules arrays
+CHUNKSIZE = 65536  # rows per chunk when streaming
+RESOLUTION = 100  # intervals per input of lookup tables
+BATCH_WINDOW = 0.001  # seconds a request waits for others to batch with
+BATCH_ROWS = 1024  # max rows of a micro-batch
@@ -1,30 +1,47 @@
-import skfuzzy as fuzz
-from math import isclose
+import threading
+import numpy as np
 from blfuzzy.constants import NAME, MIN, MAX, VALUE, LEVELS, LEVEL, WEIGHT
 from blfuzzy.constants import VARIABLES, RULES, AGGREGATION, DEFUZZIFICATION
 from blfuzzy.constants import OPERATOR, IMPLICATION, ANTECEDENT, CONSEQUENT
 from blfuzzy.constants import X, FUZZY_VALUES, AGGRMF
-from blfuzzy import helper
+from blfuzzy.constants import TRIANGLE, EXACT_CENTROID, OR, AVERAGE
+from blfuzzy import helper, kernels
 from blfuzzy.helper import get_var_range, operate, get_mf, get_implication
+from blfuzzy.helper import check_value, get_mf_params
+from blfuzzy.stats import FUZZIFY, EVALUATE, AGGREGATE, DEFUZZIFY, timer
 
 
 class FuzzyInferenceEngine(object):
     """This implementation is based on the Mamdani fuzzy inference method.
+    run() keeps its results on the variables and rules, so an engine runs
+    once, for the values it was constructed with. infer() keeps them in an
+    InferenceContext instead and leaves the engine unchanged, so one engine
+    serves any number of calls, from any number of threads, as long as each
+    thread uses its own context.
     :attr aggregation: (str) name membership function aggregation method
     :attr defuzzification: (str) name of defuzzification method
     :attr rules: (list) rule object (Rule)
+    :attr missing_values: (boolean) compute with missing values
+    :attr stats: (Stats) instrumentation, or None if disabled
+    :attr keep_imfs: (boolean) keep each rule's implicated mfs in its
+                     consequent; otherwise level mfs are clipped and
+                     aggregated per level, with the same result
     """
 
-    def __init__(self, data, missing_values=False):
+    def __init__(self, data, missing_values=False, stats=None,
+                 keep_imfs=True):
         """
         :param data: (dict) specification of system and input values
         :param missing_values: (boolean) compute with missing values
+        :param stats: (Stats) instrumentation to record run() into
+        :param keep_imfs: (boolean) keep each rule's implicated mfs
         """
         self.aggregation = data[AGGREGATION]
         self.defuzzification = data[DEFUZZIFICATION]
         self.rules = self.input_rules(data)
-        if missing_values is False:
-            self.check_missing_values()
+        self.missing_values = missing_values
+        self.stats = stats
+        self.keep_imfs = keep_imfs
 
     def as_dict(self):
         variables = {}
@@ -79,16 +96,106 @@ class FuzzyInferenceEngine(object):
             1) evaluete each rule
             2) aggregate all rules' results (implicated membership functions)
             3) defuzzify aggregated membership function to obtain crisp value
+        :raises ValueError: some input variable has no value, without missing
+                            values
         """
+        if self.missing_values is False:
+            self.check_missing_values()
+        if self.stats is not None:
+            return self.run_profiled()
         for rule in self.rules:
-            rule.evaluate()
+            rule.evaluate(self.keep_imfs)
         self.aggregate()
         self.defuzzify()
 
+    def infer(self, inputs, context=None):
+        """Perform fuzzy inference for one set of input values, as run()
+        does, but without changing the engine: the values, fuzzy values and
+        firing strengths live in the context. Rules are aggregated per level
+        from their firing strengths (see keep_imfs), into buffers of the
+        context, so that a reused context allocates no arrays per rule.
+        :param inputs: (dict) input variable name (str) -> value (float)
+        :param context: (InferenceContext) per-call state to reuse, not in
+                        use by another thread, or None for a new one
+        :returns: (dict) output variable name (str) -> crisp value (float)
+        :raises ValueError: unknown variable, value missing or out of range
+        """
+        if context is None:
+            context = InferenceContext(self)
+        assert(context.engine is self)
+        stats = self.stats
+        with timer(stats, FUZZIFY):
+            context.input_values(inputs)
+        with timer(stats, EVALUATE):
+            strengths = context.evaluate()
+        ret = {}
+        for varname, variable in context.outputs.items():
+            if self.defuzzification == EXACT_CENTROID:
+                with timer(stats, DEFUZZIFY):
+                    names = context.level_names[varname]
+                    evaluated = [(names[level], strength) for level, strength
+                                 in zip(context.level_rules[varname],
+                                        strengths) if strength == strength]
+                    ret[varname] = variable.exact_centroid(
+                            [level for level, strength in evaluated],
+                            [strength for level, strength in evaluated],
+                            self.aggregation)
+                continue
+            with timer(stats, AGGREGATE):
+                aggrmf = context.aggregate(varname, self.aggregation)
+            with timer(stats, DEFUZZIFY):
+                ret[varname] = kernels.defuzz_row(variable.x, aggrmf,
+                                                  self.defuzzification)
+        if stats is not None:
+            evaluated = sum(strength == strength for strength in strengths)
+            stats.count(runs=1, rows=1, rules_evaluated=evaluated,
+                        rules_skipped=len(strengths) - evaluated,
+                        interp_calls=sum(len(fuzzy_values) for fuzzy_values
+                                         in context.fuzzy_values.values()))
+        return ret
+
+    def run_profiled(self):
+        """Perform fuzzy inference as run() does, recording phase times and
+        counters into stats. The fuzzy values the rules need are computed
+        up front, so that fuzzification is timed apart from rule evaluation.
+        """
+        stats = self.stats
+        interp_calls = 0
+        with stats.time(FUZZIFY):
+            for rule in self.rules:
+                for varname, var in rule.antecedent.variables.items():
+                    level = rule.antecedent.levels[varname]
+                    if var.value is not None and \
+                            var.fuzzy_values[level] is None:
+                        var.fuzzify(level)
+                        interp_calls += 1
+        with stats.time(EVALUATE):
+            for rule in self.rules:
+                rule.evaluate(self.keep_imfs)
+        evaluated = 0
+        array_bytes = 0
+        for rule in self.rules:
+            if rule.antecedent.result is not None:
+                evaluated += 1
+            for imf in rule.consequent.result.values():
+                if imf is not None:
+                    array_bytes += imf.nbytes
+        with stats.time(AGGREGATE):
+            self.aggregate()
+        for variable in self.get_output_variables().values():
+            array_bytes += variable.aggrmf.nbytes
+        with stats.time(DEFUZZIFY):
+            self.defuzzify()
+        stats.count(runs=1, rows=1, rules_evaluated=evaluated,
+                    rules_skipped=len(self.rules) - evaluated,
+                    interp_calls=interp_calls, array_bytes=array_bytes)
+
     def aggregate(self):
         """Aggregates all implicated membership functions into one resulting mf.
         """
         variables = self.get_output_variables()
+        if not self.keep_imfs:
+            return self.aggregate_levels(variables)
         for varname, variable in variables.items():
             imfs = []
             for rule in self.rules:
@@ -97,12 +204,46 @@ class FuzzyInferenceEngine(object):
                     imfs.append(rule.consequent.result[varname])
             variable.aggrmf = helper.aggregate(imfs, self.aggregation)
 
+    def aggregate_levels(self, variables):
+        """Aggregates from the rules' firing strengths, clipping each level
+        mf into one buffer instead of keeping an implicated mf per rule.
+        :param variables: (dict) variable name (str) -> output variable
+        """
+        for varname, variable in variables.items():
+            levels, strengths = self.get_strengths(varname)
+            if not levels:
+                variable.aggrmf = helper.aggregate([], self.aggregation)
+                continue
+            names = list(variable.mfs)
+            variable.aggrmf = helper.aggregate_levels(
+                    np.array(list(variable.mfs.values())),
+                    [names.index(level) for level in levels], strengths,
+                    self.aggregation)
+
     def defuzzify(self):
         """Defuzzifies all output variables' implicated membership functions.
         """
         variables = self.get_output_variables()
         for varname, variable in variables.items():
-            variable.defuzzify(self.defuzzification)
+            if self.defuzzification == EXACT_CENTROID:
+                levels, strengths = self.get_strengths(varname)
+                variable.defuzzify_exact(levels, strengths, self.aggregation)
+            else:
+                variable.defuzzify(self.defuzzification)
+
+    def get_strengths(self, varname):
+        """Returns the firing strengths of the rules that could be evaluated,
+        with the output variable level they imply.
+        :param varname: (str) output variable name
+        :returns: (tuple) level names (list), firing strengths (list)
+        """
+        levels = []
+        strengths = []
+        for rule in self.rules:
+            if rule.antecedent.result is not None:
+                levels.append(rule.consequent.levels[varname])
+                strengths.append(rule.antecedent.result * rule.weight)
+        return levels, strengths
 
     def get_input_variables(self):
         """Returns references to input variables.
@@ -138,6 +279,7 @@ class Variable(object):
     :attr name: (str) variable name
     :attr x: (ndarray) variable range: 1d array of evenly spaced values
     :attr value: (float) value
+    :attr params: (dict) level name (str) -> mf type (str), params (ndarray)
     :attr mfs: (dict) level name (str) -> memebership function (ndarray)
     :attr fuzzy_values: (dict) level name (str) -> fuzzy value (float)
     :attr aggrmf: (ndarray) aggregated membership function resulting from rules
@@ -149,6 +291,7 @@ class Variable(object):
         self.name = data[NAME]
         self.input_range(data)
         self.input_value(data[VALUE])
+        self.params = self.input_params(data[LEVELS])
         self.mfs = self.input_levels(data[LEVELS])
         self.fuzzy_values = self.init_fuzzy_values()
         self.aggrmf = None
@@ -171,7 +314,7 @@ class Variable(object):
         """
         x = data.get(X)
         if x:
-            self.x = x
+            self.x = np.asarray(x, dtype=float)
             current = self.x[0]
             for nextval in self.x[1:]:
                 if nextval <= current:
@@ -185,21 +328,19 @@ class Variable(object):
         :param value: (float) input value
         """
         assert(self.x is not None)
-        if value is not None:
-            if not isclose(value, self.x[0]):
-                if not isclose(value, self.x[-1]):
-                    if value < self.x[0] or value > self.x[-1]:
-                        raise ValueError('{} out of range'.format(value))
-            # when the min/max is computed from data, the value, if happens to
-            # be min/max, might be slightly off due to rounding.
-            if isclose(value, self.x[0]):
-                self.value = self.x[0]
-            elif isclose(value, self.x[-1]):
-                self.value = self.x[-1]
-            else:
-                self.value = value
-        else:
-            self.value = value
+        self.value = check_value(self.x, value)
+
+    def input_params(self, data):
+        """Input level names and membership function types and params.
+        :param data: (list) of level data
+        :returns: (dict) levelname (str) -> mf type (str), params (ndarray)
+        """
+        assert(self.x is not None)
+        ret = {}
+        n = len(data)
+        for i, level in enumerate(data):
+            ret[level[NAME]] = get_mf_params(self.x, n, level, i)
+        return ret
 
     def input_levels(self, data):
         """Input level names and assign membership functions to levels.
@@ -228,25 +369,255 @@ class Variable(object):
 
     def fuzzify(self, level):
         """Convert the crisp value of the variable to a degree of membership
-        for a given fuzzy set (level).
+        for a given fuzzy set (level). The membership function is evaluated
+        from its params, so the result does not depend on the range grid.
         :param level: (str) level name
         """
         value = self.value
         if value is None:
             return
-        mf = self.mfs.get(level)
-        assert(mf is not None)
+        assert(level in self.params)
         assert(self.x is not None)
         assert(value >= self.x[0] and value <= self.x[-1])
-        self.fuzzy_values[level] = fuzz.interp_membership(self.x, mf, value)
+        typename, params = self.params[level]
+        self.fuzzy_values[level] = float(kernels.membership(typename, value,
+                                                            params))
 
     def defuzzify(self, method):
-        """Compute crisp value from aggregated membership function.
+        """Compute crisp value from aggregated membership function: nan if no
+        rule fired, as for the compiled engine's batches.
         :param method: (str) name of defuzzification method
         """
         assert(not self.value)
         assert(self.aggrmf is not None)
-        self.value = fuzz.defuzz(self.x, self.aggrmf, method)
+        self.value = kernels.defuzz_row(self.x, self.aggrmf, method)
+
+    def defuzzify_exact(self, levels, strengths, aggregation):
+        """Compute crisp value as the exact centroid of the aggregation of
+        the triangular mfs of the given levels, clipped at the given
+        strengths (min implication), without sampling over the range.
+        :param levels: (list) level name (str) implied by each rule
+        :param strengths: (list) firing strength (float) of each rule
+        :param aggregation: (str) name of aggregation method
+        """
+        assert(not self.value)
+        self.value = self.exact_centroid(levels, strengths, aggregation)
+
+    def exact_centroid(self, levels, strengths, aggregation):
+        """
+        :param levels: (list) level name (str) implied by each rule
+        :param strengths: (list) firing strength (float) of each rule
+        :param aggregation: (str) name of aggregation method
+        :returns: (float) exact centroid (see defuzzify_exact)
+        """
+        names = list(self.params)
+        params = []
+        for levelname, (typename, levelparams) in self.params.items():
+            if typename != TRIANGLE:
+                raise ValueError('{} requires {} mfs: "{}" is {}'.format(
+                    EXACT_CENTROID, TRIANGLE, self.name, typename))
+            params.append(levelparams)
+        indices = [names.index(level) for level in levels]
+        return kernels.exact_centroid(
+                params, indices, [strengths], aggregation,
+                self.x[0], self.x[-1])[0]
+
+
+class InferenceContext(object):
+    """Per-call state of FuzzyInferenceEngine.infer(): what run() keeps on
+    the variables (value, fuzzy_values, aggrmf) and on the rules (antecedent
+    result), for one set of input values. A context serves one call at a
+    time; reusing it for the next calls to the same engine reuses its
+    buffers, so that steady-state inference allocates a fixed number of
+    arrays, whatever the number of rules.
+    :attr engine: (FuzzyInferenceEngine) engine the context belongs to
+    :attr inputs: (dict) input variable name (str) -> variable (Variable)
+    :attr outputs: (dict) output variable name (str) -> variable (Variable)
+    :attr level_names: (dict) output variable name (str) -> level names
+                       (list)
+    :attr level_mfs: (dict) output variable name (str) -> 2d array of level
+                     mfs, one row per level
+    :attr level_rules: (dict) output variable name (str) -> index of the
+                       level each rule implies (list)
+    :attr values: (dict) input variable name (str) -> value (float or None)
+    :attr fuzzy_values: (dict) input variable name (str) -> level name (str)
+                        -> fuzzy value (float), computed on demand
+    :attr strengths: (list) weighted firing strength of each rule (float),
+                     nan if it could not be evaluated
+    :attr heights: (dict) output variable name (str) -> highest firing
+                   strength of each level (ndarray), for OR aggregation
+    :attr aggrmfs: (dict) output variable name (str) -> aggregated mf
+                   (ndarray) of the last call
+    :attr buffers: (dict) output variable name (str) -> implicated mf
+                   buffer (ndarray)
+    """
+
+    def __init__(self, engine):
+        """
+        :param engine: (FuzzyInferenceEngine) engine to infer with
+        """
+        self.engine = engine
+        self.inputs = engine.get_input_variables()
+        self.outputs = engine.get_output_variables()
+        self.level_names = {}
+        self.level_mfs = {}
+        self.level_rules = {}
+        self.heights = {}
+        self.aggrmfs = {}
+        self.buffers = {}
+        for varname, variable in self.outputs.items():
+            names = list(variable.mfs)
+            self.level_names[varname] = names
+            self.level_mfs[varname] = np.array(list(variable.mfs.values()))
+            self.level_rules[varname] = [
+                    names.index(rule.consequent.levels[varname])
+                    for rule in engine.rules]
+            self.heights[varname] = np.empty(len(names))
+            self.aggrmfs[varname] = np.empty(len(variable.x))
+            self.buffers[varname] = np.empty(len(variable.x))
+        self.values = {}
+        self.fuzzy_values = {varname: {} for varname in self.inputs}
+        self.strengths = [np.nan] * len(engine.rules)
+
+    def input_values(self, inputs):
+        """Checks input values against the variable ranges and forgets the
+        state of the previous call.
+        :param inputs: (dict) input variable name (str) -> value (float)
+        :raises ValueError: unknown variable, value missing or out of range
+        """
+        for varname in inputs:
+            if varname not in self.inputs:
+                raise ValueError('"{}" not found'.format(varname))
+        for varname, variable in self.inputs.items():
+            value = check_value(variable.x, inputs.get(varname))
+            if value is None and self.engine.missing_values is False:
+                raise ValueError('"{}" has no value'.format(varname))
+            self.values[varname] = value
+            self.fuzzy_values[varname].clear()
+
+    def get_fuzzy_value(self, varname, level):
+        """
+        :param varname: (str) input variable name
+        :param level: (str) level name
+        :returns: (float) fuzzy value, or None if the value is missing
+        """
+        fuzzy_values = self.fuzzy_values[varname]
+        ret = fuzzy_values.get(level)
+        if ret is None:
+            value = self.values[varname]
+            if value is None:
+                return None
+            typename, params = self.inputs[varname].params[level]
+            ret = float(kernels.membership(typename, value, params))
+            fuzzy_values[level] = ret
+        return ret
+
+    def evaluate(self):
+        """Computes the weighted firing strength of every rule.
+        :returns: (list) firing strength (float) of each rule, nan if it
+                  could not be evaluated
+        """
+        for i, rule in enumerate(self.engine.rules):
+            antecedent = rule.antecedent
+            fuzzy_values = []
+            for varname in antecedent.variables:
+                fuzzy_value = self.get_fuzzy_value(varname,
+                                                   antecedent.levels[varname])
+                if fuzzy_value is None:  # cannot evaluate rule
+                    break
+                fuzzy_values.append(fuzzy_value)
+            else:
+                self.strengths[i] = operate(
+                        fuzzy_values, antecedent.operator_type) * rule.weight
+                continue
+            self.strengths[i] = np.nan
+        return self.strengths
+
+    def aggregate(self, varname, aggregation):
+        """Implicates (min) and aggregates the consequent mfs of the rules
+        that could be evaluated, in place, with the same result as
+        helper.aggregate_levels(): with OR each level mf is clipped once, at
+        the highest strength of its rules; SUM and AVERAGE add the clipped
+        mfs in rule order.
+        :param varname: (str) output variable name
+        :param aggregation: (str) name of aggregation method
+        :returns: (ndarray) aggregated mf
+        """
+        levels = self.level_rules[varname]
+        mfs = self.level_mfs[varname]
+        ret = self.aggrmfs[varname]
+        buffer = self.buffers[varname]
+        ret.fill(0.0)
+        count = 0
+        if aggregation == OR:
+            heights = self.heights[varname]
+            heights.fill(np.nan)
+            for level, strength in zip(levels, self.strengths):
+                if strength == strength:  # not nan
+                    count += 1
+                    if not heights[level] >= strength:
+                        heights[level] = strength
+            for level, height in enumerate(heights.tolist()):
+                if height == height:
+                    np.fmin(mfs[level], height, out=buffer)
+                    np.fmax(ret, buffer, out=ret)
+        else:
+            for level, strength in zip(levels, self.strengths):
+                if strength == strength:
+                    count += 1
+                    np.fmin(mfs[level], strength, out=buffer)
+                    ret += buffer
+            if aggregation == AVERAGE and count:
+                ret /= count
+        if count == 0:  # no rule could be evaluated
+            return helper.aggregate([], aggregation)
+        return ret
+
+
+class ContextPool(object):
+    """Contexts of one engine for concurrent callers: a thread takes a
+    context, infers with it and puts it back, so that contexts are made
+    once per thread that ever ran concurrently instead of once per call.
+    Access is locked.
+    :attr engine: (FuzzyInferenceEngine) engine the contexts belong to
+    :attr contexts: (list) idle contexts (InferenceContext)
+    """
+
+    def __init__(self, engine):
+        """
+        :param engine: (FuzzyInferenceEngine) engine to infer with
+        """
+        self.engine = engine
+        self.contexts = []
+        self.lock = threading.Lock()
+
+    def get(self):
+        """
+        :returns: (InferenceContext) an idle context, or a new one
+        """
+        with self.lock:
+            if self.contexts:
+                return self.contexts.pop()
+        return InferenceContext(self.engine)
+
+    def put(self, context):
+        """
+        :param context: (InferenceContext) context no longer in use
+        """
+        assert(context.engine is self.engine)
+        with self.lock:
+            self.contexts.append(context)
+
+    def infer(self, inputs):
+        """Perform fuzzy inference with a pooled context.
+        :param inputs: (dict) input variable name (str) -> value (float)
+        :returns: (dict) output variable name (str) -> crisp value (float)
+        """
+        context = self.get()
+        try:
+            return self.engine.infer(inputs, context)
+        finally:
+            self.put(context)
 
 
 class Rule(object):
@@ -268,11 +639,13 @@ class Rule(object):
         return {ANTECEDENT: self.antecedent.as_dict(),
                 CONSEQUENT: self.consequent.as_dict()}
 
-    def evaluate(self):
+    def evaluate(self, implicate=True):
         """Evaluates the rule and sets the implicated mfs for each variable.
+        :param implicate: (boolean) compute the implicated mfs; otherwise
+                          only the antecedent is evaluated
         """
         self.antecedent.evaluate()
-        if self.antecedent.result is not None:
+        if implicate and self.antecedent.result is not None:
             self.consequent.evaluate(self.antecedent.result * self.weight)
 
 
@@ -365,7 +738,8 @@ class Consequent(object):
         ret['variables'] = self.levels
         ret['result'] = {}
         for varname, imf in self.result.items():
-            ret['result'][varname] = imf.tolist()
+            # None if the rule did not fire, or its imfs were not kept
+            ret['result'][varname] = None if imf is None else imf.tolist()
         return ret
 
     def input_var_references(self, data, variables):
@@ -1,12 +1,14 @@
 import math
+import warnings
+from math import isclose
 import numpy as np
-import pandas as pd
-import skfuzzy as fuzz
 from blfuzzy.constants import TRIANGLE, OR, AND, MIN, MAX, SUM, AVERAGE
 from blfuzzy.constants import NAME, VALUE, LEVEL, LEVELS, WEIGHT
-from blfuzzy.constants import MF_TYPE, MF_PARAMS
+from blfuzzy.constants import MF_TYPE, MF_PARAMS, X
 from blfuzzy.constants import ANTECEDENT, CONSEQUENT, OPERATOR, IMPLICATION
 from blfuzzy.constants import DEFAULT_MF_TYPE, INTERVALS, VARIABLES
+from blfuzzy import kernels
+from blfuzzy.lazy import pandas as pd
 
 DEFAULT_MFS = {
         TRIANGLE: [
@@ -88,21 +90,74 @@ def get_var_range(xmin, xmax, n=INTERVALS):
     return np.arange(xmin, xmax + step, step)
 
 
+def check_value(x, value):
+    """Verifies that a value is within the variable range. When the min/max
+    is computed from data, the value, if it happens to be min/max, might be
+    slightly off due to rounding, so it is snapped to the range end.
+    :param x: (ndarray) variable range: 1d array of evenly spaced values
+    :param value: (float) value, or None if missing
+    :returns: (float) checked value, or None if missing
+    :raises ValueError: value not a number or out of range
+    """
+    if value is None:
+        return value
+    if math.isnan(value):
+        raise ValueError('{} is not a number'.format(value))
+    if isclose(value, x[0]):
+        return x[0]
+    if isclose(value, x[-1]):
+        return x[-1]
+    if value < x[0] or value > x[-1]:
+        raise ValueError('{} out of range'.format(value))
+    return value
+
+
+def check_values(x, values):
+    """Verifies that an array of values is within the variable range, as
+    check_value() does for a single value.
+    :param x: (ndarray) variable range: 1d array of evenly spaced values
+    :param values: (ndarray) 1d array of values
+    :returns: (ndarray) 1d array of checked values
+    :raises ValueError: some value out of range
+    """
+    values = np.array(values, dtype=float)
+    for end in (x[0], x[-1]):
+        close = np.abs(values - end) <= 1e-09 * np.fmax(np.abs(values),
+                                                        abs(end))
+        values[close] = end
+    out = (values < x[0]) | (values > x[-1])
+    if out.any():
+        raise ValueError('{} out of range'.format(values[out][0]))
+    return values
+
+
 def get_variables_from_excel(pathname, sheet):
     """Parses variable data.
     :param pathname: (str) path to Excel file
     :param sheet: (str) name of Excel worksheet
+    :returns: (list) of variables
+    """
+    return get_variables_from_frame(pd.read_excel(pathname, sheet_name=sheet))
+
+
+def get_variables_from_csv(pathname):
+    """Parses variable data, laid out as in get_variables_from_excel().
+    :param pathname: (str) path to CSV file with a header row
+    :returns: (list) of variables
+    """
+    return get_variables_from_frame(pd.read_csv(pathname))
+
+
+def get_variables_from_frame(df):
+    """Parses variable data, one variable per row, reading whole columns.
+    :param df: (DataFrame) name, min, max, value and levels columns
+    :returns: (list) of variables
     """
     ret = []
-    df = pd.read_excel(pathname, sheetname=sheet)
-    for index, row in df.iterrows():
-        name = row[NAME]
-        xmin = check_nan(row[MIN])
-        xmax = check_nan(row[MAX])
-        value = check_nan(row[VALUE])
-        levels = make_levels(row[LEVELS])
-        var = {NAME: name, MIN: xmin, MAX: xmax, VALUE: value, LEVELS: levels}
-        ret.append(var)
+    columns = [df[name].tolist() for name in [NAME, MIN, MAX, VALUE, LEVELS]]
+    for name, xmin, xmax, value, codes in zip(*columns):
+        ret.append({NAME: name, MIN: check_nan(xmin), MAX: check_nan(xmax),
+                    VALUE: check_nan(value), LEVELS: make_levels(codes)})
     return ret
 
 
@@ -134,25 +189,77 @@ def get_rules_from_excel(pathname, sheet, ante_nvars, cons_nvars):
     :param cons_nvars: (int) number of consequent variables to expect
     :returns: (list) of rules
     """
-    df = pd.read_excel(pathname, sheetname=sheet)
-    ante_vars = set()
-    for i in range(ante_nvars):
-        ante_vars.add(df.columns[i])
-    cons_vars = set()
-    for i in range(cons_nvars):
-        cons_vars.add(df.columns[ante_nvars + i])
+    df = pd.read_excel(pathname, sheet_name=sheet, dtype=object)
+    return get_rules_from_frame(df, ante_nvars, cons_nvars)
+
+
+def get_rules_from_csv(pathname, ante_nvars, cons_nvars):
+    """Parses rule definitions from a CSV file, laid out as the Excel
+    spreadsheet of get_rules_from_excel().
+    :param pathname: (str) path to CSV file with a header row
+    :param ante_nvars: (int) number of antecedent variables to expect
+    :param cons_nvars: (int) number of consequent variables to expect
+    :returns: (list) of rules
+    """
+    df = pd.read_csv(pathname, dtype=object, keep_default_na=False,
+                     na_values=[''])
+    return get_rules_from_frame(df, ante_nvars, cons_nvars)
+
+
+def get_rules_from_frame(df, ante_nvars, cons_nvars, operator=AND,
+                         implication=MIN):
+    """Builds rule definitions from a table of level codes, one rule per
+    row: the first ante_nvars columns are antecedent variables and the next
+    cons_nvars consequent variables. Codes are mapped to level names a
+    column at a time, rather than a cell at a time; an empty antecedent
+    cell leaves the variable out of the rule.
+    :param df: (DataFrame) level codes (see EXCEL_LEVELS)
+    :param ante_nvars: (int) number of antecedent variables
+    :param cons_nvars: (int) number of consequent variables
+    :param operator: (str) antecedent operator of every rule
+    :param implication: (str) implication of every rule
+    :returns: (list) of rules
+    :raises ValueError: unknown level code, or empty consequent cell
+    """
+    ante_vars = list(df.columns[:ante_nvars])
+    cons_vars = list(df.columns[ante_nvars:ante_nvars + cons_nvars])
+    columns = []
+    for name in ante_vars + cons_vars:
+        codes = df[name]
+        levels = codes.map(EXCEL_LEVELS)
+        missing = levels.isna()
+        unknown = missing & codes.notna()
+        if unknown.any():
+            raise ValueError('"{}" is not a level code'.format(
+                codes[unknown].iloc[0]))
+        if missing.any() and name in cons_vars:
+            raise ValueError('"{}" has no level'.format(name))
+        columns.append(levels.astype(object).where(~missing, None).tolist())
     ret = []
-    rows = len(df.index)
-    for i in range(rows):
-        antecedent = get_antecedent_from_row(df, i, ante_vars)
-        consequent = get_consequent_from_row(df, i, cons_vars)
-        ret.append({WEIGHT: 1, ANTECEDENT: antecedent, CONSEQUENT: consequent})
+    for row in zip(*columns):
+        antecedent = [{NAME: name, LEVEL: level}
+                      for name, level in zip(ante_vars, row)
+                      if level is not None]
+        consequent = [{NAME: name, LEVEL: level}
+                      for name, level in zip(cons_vars, row[ante_nvars:])]
+        ret.append({WEIGHT: 1,
+                    ANTECEDENT: {OPERATOR: operator, VARIABLES: antecedent},
+                    CONSEQUENT: {IMPLICATION: implication,
+                                 VARIABLES: consequent}})
     return ret
 
 
 def get_antecedent_from_row(df, i, varnames, operator=AND):
+    """Reads the antecedent of a rule a cell at a time. Deprecated: rule
+    sheets are read a column at a time (see get_rules_from_frame()).
+    :param df: (DataFrame) rule sheet
+    :param i: (int) row index
+    :param varnames: (iterable) antecedent variable names
+    :param operator: (str) antecedent operator
+    :returns: (dict) antecedent
     """
-    """
+    warnings.warn('get_antecedent_from_row() is deprecated, use '
+                  'get_rules_from_frame()', DeprecationWarning, stacklevel=2)
     variables = []
     for name in varnames:
         level = check_nan(df.iloc[i][name])
@@ -163,8 +270,16 @@ def get_antecedent_from_row(df, i, varnames, operator=AND):
 
 
 def get_consequent_from_row(df, i, varnames, implication=MIN):
+    """Reads the consequent of a rule a cell at a time. Deprecated: rule
+    sheets are read a column at a time (see get_rules_from_frame()).
+    :param df: (DataFrame) rule sheet
+    :param i: (int) row index
+    :param varnames: (iterable) consequent variable names
+    :param implication: (str) implication method
+    :returns: (dict) consequent
     """
-    """
+    warnings.warn('get_consequent_from_row() is deprecated, use '
+                  'get_rules_from_frame()', DeprecationWarning, stacklevel=2)
     variables = []
     for name in varnames:
         level = df.iloc[i][name]
@@ -172,15 +287,15 @@ def get_consequent_from_row(df, i, varnames, implication=MIN):
     return {IMPLICATION: implication, VARIABLES: variables}
 
 
-def get_mf(x, levels, level, index):
-    """Returns the membership function for the variable fuzzy level,
-    as specified in the level data. If not specified, a default membership
-    function is returned. Assumes levels are ordered from low to high.
+def get_mf_params(x, levels, level, index):
+    """Returns the membership function type and params for the variable fuzzy
+    level, as specified in the level data. If not specified, default params
+    are returned. Assumes levels are ordered from low to high.
     :param x: (ndarray) variable description: 1d array evenly spaced values
     :params levels: (int) number of levels
     :param level: (dict) level specification: name, mf type, mf params
     :param index: (int) determines the level position within the levels
-    :returns: (ndarray) membership function description: 1d array
+    :returns: (tuple) membership function type (str), params (ndarray)
     """
     typename = level.get(MF_TYPE)
     if typename is None:
@@ -190,9 +305,40 @@ def get_mf(x, levels, level, index):
         xmin = x[0]
         xmax = x[-1]
         params = get_default_mf_params(xmin, xmax, levels, index, typename)
-    if typename == TRIANGLE:
-        return fuzz.trimf(x, params)
-    assert(False)  # work in progress
+    return typename, np.asarray(params, dtype=float)
+
+
+def get_mf(x, levels, level, index):
+    """Returns the membership function for the variable fuzzy level,
+    as specified in the level data. If not specified, a default membership
+    function is returned. Assumes levels are ordered from low to high.
+    :param x: (ndarray) variable description: 1d array evenly spaced values
+    :params levels: (int) number of levels
+    :param level: (dict) level specification: name, mf type, mf params
+    :param index: (int) determines the level position within the levels
+    :returns: (ndarray) membership function description: 1d array
+    """
+    typename, params = get_mf_params(x, levels, level, index)
+    return kernels.membership(typename, np.asarray(x, dtype=float), params)
+
+
+def get_var_params(data):
+    """Resolves a variable's range and its levels' mf types and params, as
+    Variable does, without computing the mfs.
+    :param data: (dict) variable data
+    :returns: (tuple) range (ndarray), level name (str) -> mf type (str),
+              params (ndarray) (dict)
+    """
+    x = data.get(X)
+    if x:
+        x = np.asarray(x, dtype=float)
+    else:
+        x = get_var_range(data[MIN], data[MAX])
+    params = {}
+    n = len(data[LEVELS])
+    for i, level in enumerate(data[LEVELS]):
+        params[level[NAME]] = get_mf_params(x, n, level, i)
+    return x, params
 
 
 def get_implication(typename):
@@ -234,23 +380,29 @@ def aggregate(mfs, method=OR):
 
 
 def aggregate_or(mfs):
-    """
+    """Accumulates in place into one new array.
     :param mfs: (list) of membership functions (1darray)
     :returns: (1darray) aggregated membership function
     """
     assert(mfs)
-    ret = 0
-    for mf in mfs:
-        ret = np.fmax(ret, mf)
+    ret = np.fmax(0, mfs[0])
+    for mf in mfs[1:]:
+        np.fmax(ret, mf, out=ret)
     return ret
 
 
 def aggregate_sum(mfs):
-    """
+    """Accumulates in place into one new array, in list order, as np.sum()
+    over the stacked mfs does, without stacking them.
     :param mfs: (list) of membership functions (1darray)
     :returns: (1darray) aggregated membership function
     """
-    return np.sum(mfs, axis=0)
+    if not len(mfs):
+        return np.sum(mfs, axis=0)
+    ret = np.array(mfs[0], dtype=float)
+    for mf in mfs[1:]:
+        ret += mf
+    return ret
 
 
 def aggregate_average(mfs):
@@ -258,4 +410,45 @@ def aggregate_average(mfs):
     :param mfs: (list) of membership functions (1darray)
     :returns: (1darray) aggregated membership function
     """
-    return np.average(mfs, axis=0)
+    if not len(mfs):
+        return np.average(mfs, axis=0)
+    ret = aggregate_sum(mfs)
+    ret /= len(mfs)
+    return ret
+
+
+def aggregate_levels(mfs, levels, strengths, method=OR, count=None):
+    """Implicates (min) and aggregates the rules' consequent mfs without
+    making one implicated mf per rule: each level mf is clipped into a
+    buffer and accumulated in place. For OR the rules of a level are first
+    reduced to their highest strength, so each level mf is clipped once;
+    SUM and AVERAGE add the clipped mfs in rule order. Results are the same
+    as those of aggregate() over the implicated mfs.
+    :param mfs: (ndarray) 2d array of level mfs, one row per level
+    :param levels: (ndarray) level index of each rule
+    :param strengths: (ndarray) firing strength of each rule: 1d array, or
+                      2d array rows x rules
+    :param method: (str) aggregation method
+    :param count: (int) number of rules to average over, if not all of them
+    :returns: (ndarray) aggregated mf: 1d array, or 2d array rows x range
+    """
+    levels = np.asarray(levels, dtype=int)
+    strengths = np.asarray(strengths, dtype=float)
+    assert(len(levels))
+    ret = np.zeros(strengths.shape[:-1] + mfs.shape[-1:])
+    buffer = np.empty_like(ret)
+    heights = strengths[..., np.newaxis]
+    if method == OR:
+        for level in np.unique(levels):
+            height = heights[..., levels == level, :].max(axis=-2)
+            np.fmin(mfs[level], height, out=buffer)
+            np.fmax(ret, buffer, out=ret)
+        return ret
+    for i, level in enumerate(levels):
+        np.fmin(mfs[level], heights[..., i, :], out=buffer)
+        ret += buffer
+    if method == AVERAGE:
+        ret /= len(levels) if count is None else count
+        return ret
+    assert(method == SUM)
+    return ret
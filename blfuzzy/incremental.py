@@ -0,0 +1,216 @@
+import numpy as np
+from blfuzzy.constants import OR, EXACT_CENTROID
+from blfuzzy import kernels
+from blfuzzy.helper import check_value
+from blfuzzy.compiled import NO_LEVEL
+
+
+class IncrementalEngine(object):
+    """State of a compiled rule base for one set of input values that changes
+    a few variables at a time, as in a control loop. Changing a variable
+    re-evaluates only the rules that reference its levels whose fuzzy value
+    changed, and only the outputs those rules imply are defuzzified again.
+    With OR aggregation the highest firing strength of each output level is
+    kept up to date, so that only the touched levels are reduced again; SUM
+    and AVERAGE are aggregated from the rules that fire. Results are the
+    same as those of CompiledEngine.infer().
+    :attr engine: (CompiledEngine) compiled rule base
+    :attr values: (dict) input variable name (str) -> value (float or None)
+    :attr fuzzy_values: (ndarray) 2d array of fuzzy values: inputs x levels
+                        (see CompiledEngine.fuzzify_inputs)
+    :attr strengths: (ndarray) weighted firing strength of each rule, 0 for
+                     rules that cannot be evaluated
+    :attr evaluable: (ndarray) whether each rule's variables all have values
+    :attr counts: (ndarray) number of non-zero antecedent operands of each
+                  rule, to tell the rules that may fire (see
+                  CompiledEngine.get_active_rules)
+    :attr level_rules: (dict) output variable name (str) -> level index
+                       (int) -> indices of the rules implying it (ndarray)
+    :attr heights: (dict) output variable name (str) -> level index (int)
+                   -> highest firing strength of the level's rules (float)
+    :attr results: (dict) output variable name (str) -> crisp value (float),
+                   for the outputs whose rules did not change since
+    """
+
+    def __init__(self, engine, inputs):
+        """
+        :param engine: (CompiledEngine) compiled rule base
+        :param inputs: (dict) input variable name (str) -> value (float)
+        """
+        self.engine = engine
+        self.values = engine.input_values(inputs)
+        self.fuzzy_values = engine.fuzzify_inputs(self.values)
+        n = len(engine.weights)
+        self.strengths = np.zeros(n)
+        self.evaluable = np.zeros(n, dtype=bool)
+        self.counts = np.zeros(n, dtype=int)
+        self.level_rules = {}
+        self.heights = {}
+        for varname in engine.outputs:
+            indices, levels = engine.rule_levels[varname]
+            self.level_rules[varname] = {
+                    level: indices[levels == level]
+                    for level in np.unique(levels).tolist()}
+            self.heights[varname] = {}
+        self.results = {}
+        rules = np.arange(n)
+        self.check_evaluable(rules)
+        self.count_operands(rules)
+        self.evaluate(np.ones(n, dtype=bool))
+
+    def update(self, **values):
+        """Changes some input values, e.g. update(food=7.2), and recomputes
+        the state that depends on them.
+        :param values: (dict) input variable name (str) -> value (float or
+                       None)
+        :returns: (int) number of rules re-evaluated
+        :raises ValueError: unknown variable, value missing or out of range
+        """
+        engine = self.engine
+        # every value is checked before any is applied, so that an invalid
+        # one leaves the state as it was
+        checked = {}
+        for varname, value in values.items():
+            if varname not in engine.inputs:
+                raise ValueError('"{}" not found'.format(varname))
+            value = check_value(engine.x[varname], value)
+            if value is None and engine.missing_values is False:
+                raise ValueError('"{}" has no value'.format(varname))
+            checked[varname] = value
+        touched = np.zeros(len(engine.weights), dtype=bool)
+        recount = np.zeros(len(engine.weights), dtype=bool)
+        for varname, value in checked.items():
+            if value == self.values[varname]:
+                continue
+            j = engine.inputs.index(varname)
+            n = len(engine.levels[varname])
+            previous = self.fuzzy_values[j, :n].copy()
+            self.fuzzy_values[j] = np.nan
+            if value is not None:
+                self.fuzzy_values[j, :n] = engine.fuzzify_variable(varname,
+                                                                   value)
+            if value is None or self.values[varname] is None:
+                # the rules become evaluable, or stop being so
+                self.values[varname] = value
+                rules = engine.var_rules[varname]
+                recount[rules[self.check_evaluable(rules)]] = True
+                self.count_operands(rules)
+                touched[rules] = True
+            else:
+                # operands that stay the same, typically zero, leave the
+                # rules' strengths unchanged
+                current = self.fuzzy_values[j, :n]
+                for k in np.flatnonzero(previous != current):
+                    indices = engine.rule_index.get(
+                            (varname, engine.levels[varname][k]))
+                    if indices is not None:
+                        touched[indices] = True
+                        self.counts[indices] += (int(current[k] > 0) -
+                                                 int(previous[k] > 0))
+            self.values[varname] = value
+        return self.evaluate(touched, recount)
+
+    def evaluate(self, touched, recount=None):
+        """Recomputes the firing strengths of rules and the highest strengths
+        of the output levels they imply.
+        :param touched: (ndarray) boolean mask of the rules to recompute
+        :param recount: (ndarray) boolean mask of the rules that became
+                        evaluable or stopped being so: the outputs they imply
+                        are recomputed even if no strength changed, as the
+                        number of evaluable rules is part of their results
+        :returns: (int) number of rules re-evaluated
+        """
+        engine = self.engine
+        rules = np.flatnonzero(touched)
+        if not len(rules):
+            return 0
+        counts = self.counts[rules]
+        active = np.where(engine.rule_or[rules], counts > 0,
+                          counts == engine.rule_sizes[rules])
+        active &= self.evaluable[rules]
+        strengths = np.zeros(len(rules))
+        fire = rules[active]
+        if len(fire):
+            strengths[active] = engine.evaluate_antecedents(
+                    self.fuzzy_values, fire) * engine.weights[fire]
+        changed = rules[strengths != self.strengths[rules]]
+        self.strengths[rules] = strengths
+        recounted = np.zeros((0, len(engine.outputs)), dtype=int)
+        if recount is not None:
+            recounted = engine.consequent_levels[recount]
+        for j, varname in enumerate(engine.outputs):
+            levels = engine.consequent_levels[changed, j]
+            levels = np.flatnonzero(np.bincount(
+                levels[levels != NO_LEVEL],
+                minlength=len(engine.levels[varname]))).tolist()
+            if engine.aggregation == OR:
+                for level in levels:
+                    indices = self.level_rules[varname][level]
+                    self.heights[varname][level] = \
+                        self.strengths[indices].max()
+            if (levels or len(rules) == len(engine.weights) or
+                    (recounted[:, j] != NO_LEVEL).any()):
+                self.results.pop(varname, None)
+        return len(fire)
+
+    def check_evaluable(self, rules):
+        """Finds which rules have values for all their variables.
+        :param rules: (ndarray) rule indices
+        :returns: (ndarray) boolean mask of the rules whose evaluability
+                  changed
+        """
+        engine = self.engine
+        missing = np.array([self.values[varname] is None
+                            for varname in engine.inputs])
+        operands = engine.antecedent_levels[rules] != NO_LEVEL
+        evaluable = ~(operands & missing).any(axis=1)
+        ret = evaluable != self.evaluable[rules]
+        self.evaluable[rules] = evaluable
+        return ret
+
+    def count_operands(self, rules):
+        """Counts the non-zero antecedent operands of rules from scratch.
+        :param rules: (ndarray) rule indices
+        """
+        engine = self.engine
+        operands = self.fuzzy_values[np.arange(len(engine.inputs)),
+                                     engine.antecedent_levels[rules]]
+        self.counts[rules] = np.count_nonzero(operands > 0, axis=1)
+
+    def outputs(self):
+        """Returns the crisp output values for the current input values,
+        defuzzifying only the outputs whose rules changed.
+        :returns: (dict) output variable name (str) -> crisp value (float)
+        """
+        for varname in self.engine.outputs:
+            if varname not in self.results:
+                self.results[varname] = self.defuzzify(varname)
+        return dict(self.results)
+
+    def defuzzify(self, varname):
+        """
+        :param varname: (str) output variable name
+        :returns: (float) crisp value
+        """
+        engine = self.engine
+        indices, levels = engine.rule_levels[varname]
+        x = engine.x[varname]
+        if engine.defuzzification == EXACT_CENTROID:
+            return kernels.exact_centroid(
+                    [params for typename, params in
+                     engine.params[varname].values()],
+                    levels, self.strengths[np.newaxis, indices],
+                    engine.aggregation, x[0], x[-1])[0]
+        count = np.count_nonzero(self.evaluable[indices])
+        if count == 0:  # no rule could be evaluated
+            return np.nan
+        if engine.aggregation == OR:
+            aggrmf = np.zeros(len(x))
+            mfs = engine.level_mfs[varname]
+            for level, height in self.heights[varname].items():
+                np.fmax(aggrmf, np.fmin(mfs[level], height), out=aggrmf)
+        else:
+            active = self.strengths[indices] > 0
+            aggrmf = engine.aggregate(varname, levels[active],
+                                      self.strengths[indices[active]], count)
+        return kernels.defuzz_row(x, aggrmf, engine.defuzzification)
@@ -0,0 +1,385 @@
+import numpy as np
+from blfuzzy.constants import CENTROID, BISECTOR, MOM, SOM, LOM
+from blfuzzy.constants import TRIANGLE, TRAPEZOID, GAUSSIAN, SIGMOID
+from blfuzzy.constants import OR, SUM, AVERAGE, BATCH_ELEMENTS
+
+
+class EmptyMembershipError(AssertionError):
+    """The membership function to defuzzify has zero area (the same error
+    as skfuzzy's).
+    """
+
+
+def defuzz(x, mfs, method):
+    """Defuzzifies a batch of membership functions defined over the same
+    range, one row per membership function. Rows with zero area give nan.
+    :param x: (ndarray) variable range: 1d array of evenly spaced values
+    :param mfs: (ndarray) 2d array of membership functions, one per row
+    :param method: (str) name of defuzzification method
+    :returns: (ndarray) 1d array of crisp values, one per row
+    """
+    method = method.lower()
+    x = np.asarray(x, dtype=float)
+    mfs = np.asarray(mfs, dtype=float)
+    if method == CENTROID:
+        return centroid(x, mfs)
+    if method == BISECTOR:
+        return bisector(x, mfs)
+    if method in (MOM, SOM, LOM):
+        return maximum(x, mfs, method)
+    raise ValueError('The input for `mode`, {}, was incorrect.'.format(method))
+
+
+def defuzz_mf(x, mf, method):
+    """Defuzzifies one membership function, with the results and errors of
+    skfuzzy's defuzz.
+    :param x: (ndarray) variable range: 1d array of evenly spaced values
+    :param mf: (ndarray) membership function
+    :param method: (str) name of defuzzification method
+    :returns: (float) crisp value
+    :raises EmptyMembershipError: centroid or bisector of zero area
+    :raises ValueError: unknown method
+    """
+    method = method.lower()
+    if method in (CENTROID, BISECTOR):
+        if mf.sum() == 0:
+            raise EmptyMembershipError('The membership function area is '
+                                       'empty.')
+        if method == CENTROID:
+            return centroid_mf(x, mf)
+        return bisector(x, mf[np.newaxis, :])[0]
+    if method in (MOM, SOM, LOM):
+        # all points are maxima of an empty membership function
+        peak = x[mf == mf.max()]
+        if method == MOM:
+            return np.mean(peak)
+        return np.min(peak) if method == SOM else np.max(peak)
+    raise ValueError('The input for `mode`, {}, was incorrect.'.format(method))
+
+
+def defuzz_row(x, mf, method):
+    """Defuzzifies one membership function as defuzz() does a row: zero
+    area gives nan, for every method, instead of skfuzzy's results.
+    :param x: (ndarray) variable range: 1d array of evenly spaced values
+    :param mf: (ndarray) membership function
+    :param method: (str) name of defuzzification method
+    :returns: (float) crisp value, or nan
+    :raises ValueError: unknown method
+    """
+    if mf.any():
+        return defuzz_mf(x, mf, method)
+    return defuzz(x, mf[np.newaxis, :], method)[0]
+
+
+def centroid(x, mfs):
+    """Centroid of area, taking the membership functions as piecewise linear
+    between the points of the range (the same as skfuzzy's centroid, up to
+    rounding).
+    :param x: (ndarray) variable range: 1d array of evenly spaced values
+    :param mfs: (ndarray) 2d array of membership functions, one per row
+    :returns: (ndarray) 1d array of crisp values, one per row
+    """
+    if len(x) == 1:
+        return np.where(mfs[:, 0] > 0, x[0], np.nan)
+    x1 = x[:-1]
+    dx = np.diff(x)
+    y1 = mfs[:, :-1]
+    y2 = mfs[:, 1:]
+    areas = 0.5 * dx * (y1 + y2)
+    moments = dx * dx * (y2 + 0.5 * y1) / 3.0 + x1 * areas
+    area = areas.sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(area > 0, moments.sum(axis=1) / area, np.nan)
+
+
+def centroid_mf(x, mf):
+    """Centroid of area of one membership function, with the segment
+    formulas of skfuzzy's centroid, summed in the same order, so that
+    results are the same to the last bit.
+    :param x: (ndarray) variable range: 1d array of evenly spaced values
+    :param mf: (ndarray) membership function, of non-zero area
+    :returns: (float) crisp value
+    """
+    if len(x) == 1:
+        return x[0] * mf[0] / np.fmax(mf[0], np.finfo(float).eps)
+    x1 = x[:-1]
+    x2 = x[1:]
+    dx = np.diff(x)
+    y1 = mf[:-1]
+    y2 = mf[1:]
+    areas = 0.5 * dx * (y1 + y2)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        moments = 2.0 / 3.0 * dx * (y2 + 0.5 * y1) / (y1 + y2) + x1
+    # rectangles and triangles
+    moments = np.where(y2 == 0.0, 1.0 / 3.0 * dx + x1, moments)
+    moments = np.where(y1 == 0.0, 2.0 / 3.0 * dx + x1, moments)
+    moments = np.where(y1 == y2, 0.5 * (x1 + x2), moments)
+    moments *= areas
+    # cumulative sums add in order, where sum() would add pairwise
+    moment = np.cumsum(moments)[-1]
+    area = np.cumsum(areas)[-1]
+    return moment / np.fmax(area, np.finfo(float).eps)
+
+
+def bisector(x, mfs):
+    """Point that divides the area under the membership functions in two
+    halves, taking them as piecewise linear between the points of the
+    range, with the formulas of skfuzzy's bisector.
+    :param x: (ndarray) variable range: 1d array of evenly spaced values
+    :param mfs: (ndarray) 2d array of membership functions, one per row
+    :returns: (ndarray) 1d array of crisp values, one per row
+    """
+    if len(x) == 1:
+        return np.where(mfs[:, 0] > 0, x[0], np.nan)
+    dx = np.diff(x)
+    areas = 0.5 * dx * (mfs[:, :-1] + mfs[:, 1:])
+    # cumulative sums add in order, as skfuzzy does
+    accum = np.cumsum(areas, axis=1)
+    area = accum[:, -1]
+    rows = np.arange(len(mfs))
+    index = np.argmax(accum >= 0.5 * area[:, np.newaxis], axis=1)
+    subarea = area / 2. - np.where(index > 0, accum[rows, index - 1], 0.0)
+    x1 = x[index]
+    x2 = x[index + 1]
+    dx = dx[index]
+    y1 = mfs[rows, index]
+    y2 = mfs[rows, index + 1]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        m = (y2 - y1) / dx
+        ret = x1 - (y1 - np.sqrt(y1 * y1 + 2.0 * m * subarea)) / m
+        ret = np.where(y2 == 0.0,
+                       x2 - np.sqrt(dx * dx - (2. * subarea * dx / y1)), ret)
+        ret = np.where(y1 == 0.0, x1 + np.sqrt(2. * subarea * dx / y2), ret)
+        ret = np.where(y1 == y2, subarea / y1 + x1, ret)
+    return np.where(area > 0, ret, np.nan)
+
+
+def maximum(x, mfs, method):
+    """Mean, smallest or largest of the points of maximum membership.
+    :param x: (ndarray) variable range: 1d array of evenly spaced values
+    :param mfs: (ndarray) 2d array of membership functions, one per row
+    :param method: (str) MOM, SOM or LOM
+    :returns: (ndarray) 1d array of crisp values, one per row
+    """
+    peak = mfs.max(axis=1)
+    mask = mfs == peak[:, np.newaxis]
+    if method == MOM:
+        # added in order, as np.mean() adds up to 8 points of maximum
+        ret = np.cumsum(np.where(mask, x, 0.0), axis=1)[:, -1] / \
+            mask.sum(axis=1)
+    elif method == SOM:
+        ret = np.where(mask, x, np.inf).min(axis=1)
+    else:
+        ret = np.where(mask, x, -np.inf).max(axis=1)
+    return np.where(peak > 0, ret, np.nan)
+
+
+def membership(typename, x, params):
+    """Membership function of a given type evaluated at arbitrary points,
+    with the same conventions as skfuzzy's trimf, trapmf, gaussmf and sigmf.
+    :param typename: (str) mf type: TRIANGLE, TRAPEZOID, GAUSSIAN or SIGMOID
+    :param x: (ndarray) points
+    :param params: (ndarray) mf params along the last axis; the other axes
+                   must broadcast against x
+    :returns: (ndarray) membership values
+    :raises ValueError: unknown mf type
+    """
+    params = np.asarray(params, dtype=float)
+    if typename == TRIANGLE:
+        return triangle(x, params)
+    if typename == TRAPEZOID:
+        return trapezoid(x, params)
+    if typename == GAUSSIAN:
+        return gaussian(x, params)
+    if typename == SIGMOID:
+        return sigmoid(x, params)
+    raise ValueError('"{}" is not an mf type'.format(typename))
+
+
+def triangle(x, params):
+    """Triangular membership function evaluated at arbitrary points, with the
+    same conventions as skfuzzy's trimf.
+    :param x: (ndarray) points
+    :param params: (ndarray) a, b, c along the last axis; the other axes must
+                   broadcast against x
+    :returns: (ndarray) membership values
+    """
+    a = params[..., 0]
+    b = params[..., 1]
+    c = params[..., 2]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        # vertical sides (a == b or b == c) give infinite slopes, which the
+        # clipping turns into steps; the smaller side is at most 1, and nan
+        # only at x == b
+        ret = np.fmin((x - a) / (b - a), (c - x) / (c - b))
+    ret = np.fmax(ret, 0.0)
+    return np.where(x == b, 1.0, ret)
+
+
+def trapezoid(x, params):
+    """Trapezoidal membership function evaluated at arbitrary points, with
+    the same conventions as skfuzzy's trapmf.
+    :param x: (ndarray) points
+    :param params: (ndarray) a, b, c, d along the last axis; the other axes
+                   must broadcast against x
+    :returns: (ndarray) membership values
+    """
+    a = params[..., 0]
+    b = params[..., 1]
+    c = params[..., 2]
+    d = params[..., 3]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        ret = np.fmin((x - a) / (b - a), (d - x) / (d - c))
+    ret = np.clip(ret, 0.0, 1.0)
+    return np.where((x >= b) & (x <= c), 1.0, ret)
+
+
+def gaussian(x, params):
+    """Gaussian membership function, as skfuzzy's gaussmf.
+    :param x: (ndarray) points
+    :param params: (ndarray) mean, sigma along the last axis; the other axes
+                   must broadcast against x
+    :returns: (ndarray) membership values
+    """
+    mean = params[..., 0]
+    sigma = params[..., 1]
+    return np.exp(-((x - mean) ** 2.) / (2 * sigma ** 2.))
+
+
+def sigmoid(x, params):
+    """Sigmoid membership function, as skfuzzy's sigmf.
+    :param x: (ndarray) points
+    :param params: (ndarray) b (center), c (width) along the last axis; the
+                   other axes must broadcast against x
+    :returns: (ndarray) membership values
+    """
+    b = params[..., 0]
+    c = params[..., 1]
+    return 1. / (1. + np.exp(- c * (x - b)))
+
+
+def exact_centroid(params, levels, strengths, method, xmin, xmax):
+    """Centroid of the aggregation of triangular membership functions clipped
+    at the rules' firing strengths (min implication). The aggregated function
+    is piecewise linear, so it is integrated exactly between its breakpoints
+    instead of being sampled over the variable range.
+    :param params: (ndarray) 2d array of triangle params, one row per level
+    :param levels: (ndarray) 1d array of the level index of each rule
+    :param strengths: (ndarray) 2d array of firing strengths: rows x rules
+    :param method: (str) aggregation method: OR, SUM or AVERAGE
+    :param xmin: (float) lowest variable value possible
+    :param xmax: (float) highest variable value possible
+    :returns: (ndarray) 1d array of crisp values, one per row; nan where the
+              aggregated function has zero area
+    """
+    params = np.asarray(params, dtype=float)
+    levels = np.asarray(levels, dtype=int)
+    strengths = np.asarray(strengths, dtype=float)
+    if method == OR:
+        # clipping each level's mf at its highest rule strength is the same
+        # as clipping once per rule and taking the maximum
+        heights = np.zeros((len(strengths), len(params)))
+        for i in range(len(params)):
+            mask = levels == i
+            if mask.any():
+                heights[:, i] = strengths[:, mask].max(axis=1)
+        kernel = exact_moments_or
+        size = 8 * len(params) ** 3
+    elif method in (SUM, AVERAGE):
+        # the centroid of the average is that of the sum
+        heights = strengths
+        params = params[levels]
+        kernel = exact_moments_sum
+        size = 16 * len(levels)
+    else:
+        raise ValueError('exact centroid requires {}, {} or {} '
+                         'aggregation'.format(OR, SUM, AVERAGE))
+    ret = np.empty(len(heights))
+    size = max(1, BATCH_ELEMENTS // max(1, size))
+    for start in range(0, len(ret), size):
+        stop = start + size
+        area, moment = kernel(params, heights[start:stop], xmin, xmax)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            ret[start:stop] = np.where(area > 0, moment / area, np.nan)
+    return ret
+
+
+def exact_moments_or(params, heights, xmin, xmax):
+    """Area and first moment of the maximum of clipped triangles.
+    :param params: (ndarray) 2d array of triangle params, one row per level
+    :param heights: (ndarray) 2d array of clipping heights: rows x levels
+    :param xmin: (float) lowest variable value possible
+    :param xmax: (float) highest variable value possible
+    :returns: (tuple) area (ndarray), moment (ndarray), one value per row
+    """
+    a, b, c = params.T
+    with np.errstate(invalid='ignore', divide='ignore'):
+        # lines of the rising and falling sides: y = slope * x + intercept
+        slopes = np.concatenate([1.0 / (b - a), -1.0 / (c - b)])
+        intercepts = np.concatenate([-a / (b - a), c / (c - b)])
+        crossings = ((intercepts[np.newaxis, :] - intercepts[:, np.newaxis]) /
+                     (slopes[:, np.newaxis] - slopes[np.newaxis, :]))
+    # breakpoints of the maximum are among the vertices, the crossings of
+    # sides, and the points where sides reach the clipping heights
+    h = heights[:, np.newaxis, :]
+    rising = a[:, np.newaxis] + h * (b - a)[:, np.newaxis]
+    falling = c[:, np.newaxis] - h * (c - b)[:, np.newaxis]
+    fixed = np.concatenate([params.ravel(), crossings.ravel()])
+    fixed = np.unique(fixed[(fixed >= xmin) & (fixed <= xmax)])
+    points = np.concatenate([
+        np.broadcast_to(fixed, (len(heights), len(fixed))),
+        rising.reshape(len(heights), -1),
+        falling.reshape(len(heights), -1)], axis=1)
+
+    def evaluate(x):
+        y = triangle(x[..., np.newaxis], params)
+        return np.fmin(y, heights[:, np.newaxis, :]).max(axis=-1)
+    return integrate(points, evaluate, xmin, xmax)
+
+
+def exact_moments_sum(params, heights, xmin, xmax):
+    """Area and first moment of the sum of clipped triangles.
+    :param params: (ndarray) 2d array of triangle params, one row per rule
+    :param heights: (ndarray) 2d array of clipping heights: rows x rules
+    :param xmin: (float) lowest variable value possible
+    :param xmax: (float) highest variable value possible
+    :returns: (tuple) area (ndarray), moment (ndarray), one value per row
+    """
+    a, b, c = params.T
+    points = np.stack(np.broadcast_arrays(
+        a, a + heights * (b - a), b, c - heights * (c - b), c), axis=-1)
+
+    def evaluate(x):
+        y = triangle(x, params[:, np.newaxis, :])
+        return np.fmin(y, heights[..., np.newaxis])
+    area, moment = integrate(points, evaluate, xmin, xmax)
+    return area.sum(axis=-1), moment.sum(axis=-1)
+
+
+def integrate(points, evaluate, xmin, xmax):
+    """Area and first moment of functions that are linear between the given
+    points. Values are taken inside each segment, at a quarter and three
+    quarters of its length, so that discontinuities at the points (e.g. of
+    triangles with a == b) are handled.
+    :param points: (ndarray) breakpoints along the last axis, in any order
+    :param evaluate: (function) evaluates the functions at an array of points
+                     shaped like the breakpoints
+    :param xmin: (float) lowest variable value possible
+    :param xmax: (float) highest variable value possible
+    :returns: (tuple) area (ndarray), moment (ndarray), reduced over the last
+              axis
+    """
+    points = np.where(np.isfinite(points), points, xmin)
+    ends = np.broadcast_to([xmin, xmax], points.shape[:-1] + (2,))
+    points = np.sort(np.clip(np.concatenate([points, ends], axis=-1),
+                             xmin, xmax), axis=-1)
+    x1 = points[..., :-1]
+    x2 = points[..., 1:]
+    dx = x2 - x1
+    m1 = evaluate(x1 + 0.25 * dx)
+    m2 = evaluate(x1 + 0.75 * dx)
+    y1 = 1.5 * m1 - 0.5 * m2
+    y2 = 1.5 * m2 - 0.5 * m1
+    area = 0.5 * dx * (m1 + m2)
+    moment = dx * (y1 * (2 * x1 + x2) + y2 * (x1 + 2 * x2)) / 6.0
+    return area.sum(axis=-1), moment.sum(axis=-1)
@@ -0,0 +1,26 @@
+import importlib
+
+
+class LazyModule(object):
+    """Stand-in for a module that is imported on first attribute access,
+    for dependencies that are slow to import and not needed by every use of
+    the package. Attributes are copied to the stand-in once read, so later
+    accesses cost the same as those of the module itself.
+    :attr name: (str) module name
+    """
+
+    def __init__(self, name):
+        """
+        :param name: (str) module name, e.g. 'pandas'
+        """
+        self.name = name
+
+    def __getattr__(self, attr):
+        module = importlib.import_module(self.name)
+        value = getattr(module, attr)
+        setattr(self, attr, value)
+        return value
+
+
+# pandas is only needed to read specifications from Excel
+pandas = LazyModule('pandas')
@@ -0,0 +1,207 @@
+from blfuzzy.helper import get_var_params
+from blfuzzy.constants import NAME, LEVEL, WEIGHT, VARIABLES, RULES
+from blfuzzy.constants import AGGREGATION, ANTECEDENT, CONSEQUENT, OPERATOR
+from blfuzzy.constants import IMPLICATION, AND, OR, AVERAGE
+from blfuzzy.constants import TRIANGLE, TRAPEZOID, GAUSSIAN
+
+
+def minimize_rules(data, missing_values=False):
+    """Rewrites the rules of a specification into fewer rules that give the
+    same outputs for every input:
+        1) zero-weight rules are dropped, as they add nothing to a sum or a
+           max; but not under the average, where every rule counts, nor
+           with missing values, where they make a row's output computable
+        2) with max (OR) aggregation, identical rules, with the antecedent
+           operands in any order, become one rule of the greatest weight:
+           max(min(mf, s * w1), min(mf, s * w2)) = min(mf, s * max(w1, w2))
+        3) with max aggregation and without missing values, AND rules that
+           differ only in the level of one variable, with the same weight
+           and consequent, become one rule without that variable, when at
+           every point of its range one of their levels is exactly 1: the
+           max of the group's strengths is then the strength of the other
+           operands. Repeated until no rules merge.
+    Each output keeps at least one rule, and the rules keep the order of
+    their first occurrence. Outputs are the same to the bit, but for the
+    exact centroid of a sum, which the breakpoints of dropped zero-weight
+    rules change by rounding.
+    :param data: (dict) specification of system
+    :param missing_values: (boolean) the rules are to be evaluated with
+                           missing values
+    :returns: (tuple) specification with the minimized rules (dict), counts
+              of rules before, dropped for zero weight, duplicates, merged,
+              and after (dict)
+    """
+    rules = data[RULES]
+    counts = {'before': len(rules)}
+    if data[AGGREGATION] != AVERAGE and missing_values is False:
+        rules = drop_zero_weight(rules)
+    counts['zero_weight'] = counts['before'] - len(rules)
+    counts['duplicates'] = 0
+    counts['merged'] = 0
+    if data[AGGREGATION] == OR:
+        n = len(rules)
+        keyed = dedupe(rules)
+        counts['duplicates'] = n - len(keyed)
+        if missing_values is False:
+            n = len(keyed)
+            merge(keyed, data[VARIABLES])
+            counts['merged'] = n - len(keyed)
+        rules = [dict(ruledata, **{WEIGHT: weight}) for position, weight,
+                 ruledata in sorted(keyed.values(), key=lambda v: v[0])]
+    counts['after'] = len(rules)
+    ret = dict(data)
+    ret[RULES] = rules
+    return ret, counts
+
+
+def get_rule_key(ruledata):
+    """
+    :param ruledata: (dict) rule data
+    :returns: (tuple) operator (str; AND for a single operand), antecedent
+              (frozenset of (variable name, level name)), implication (str),
+              consequent (frozenset of (variable name, level name))
+    """
+    antecedent = frozenset((vardata[NAME], vardata[LEVEL])
+                           for vardata in ruledata[ANTECEDENT][VARIABLES])
+    consequent = frozenset((vardata[NAME], vardata[LEVEL])
+                           for vardata in ruledata[CONSEQUENT][VARIABLES])
+    operator = ruledata[ANTECEDENT][OPERATOR] if len(antecedent) > 1 else AND
+    return (operator, antecedent, ruledata[CONSEQUENT][IMPLICATION],
+            consequent)
+
+
+def drop_zero_weight(rules):
+    """
+    :param rules: (list) of rule data
+    :returns: (list) rules of non-zero weight, and the first zero-weight
+              rule of any output that has no other
+    """
+    covered = set(vardata[NAME] for ruledata in rules if ruledata[WEIGHT]
+                  for vardata in ruledata[CONSEQUENT][VARIABLES])
+    ret = []
+    for ruledata in rules:
+        varnames = [vardata[NAME]
+                    for vardata in ruledata[CONSEQUENT][VARIABLES]]
+        if ruledata[WEIGHT] or not covered.issuperset(varnames):
+            ret.append(ruledata)
+            covered.update(varnames)
+    return ret
+
+
+def dedupe(rules):
+    """
+    :param rules: (list) of rule data
+    :returns: (dict) rule key (tuple, see get_rule_key()) -> position of
+              first occurrence (int), greatest weight (float), rule data
+              (dict)
+    """
+    ret = {}
+    for position, ruledata in enumerate(rules):
+        key = get_rule_key(ruledata)
+        if key in ret:
+            ret[key][1] = max(ret[key][1], ruledata[WEIGHT])
+        else:
+            ret[key] = [position, ruledata[WEIGHT], ruledata]
+    return ret
+
+
+def get_core(typename, params):
+    """
+    :param typename: (str) mf type
+    :param params: (ndarray) mf params
+    :returns: (tuple) bounds of the interval where the mf is exactly 1, or
+              None if there is none
+    """
+    if typename == TRIANGLE:
+        return params[1], params[1]
+    if typename == TRAPEZOID:
+        return params[1], params[2]
+    if typename == GAUSSIAN:
+        return params[0], params[0]
+    return None
+
+
+def covers(x, cores):
+    """
+    :param x: (ndarray) variable range
+    :param cores: (list) of (lower bound, upper bound) intervals
+    :returns: (boolean) the intervals cover the range
+    """
+    reach = x[0]
+    for lower, upper in sorted(cores):
+        if lower > reach:
+            return False
+        reach = max(reach, upper)
+    return reach >= x[-1]
+
+
+def merge(keyed, variables):
+    """Merges, in place, groups of rules made redundant by a variable whose
+    levels cover its range, until there are none.
+    :param keyed: (dict) rules, as returned by dedupe()
+    :param variables: (list) of variable data
+    """
+    cores = {}
+    ranges = {}
+    for variable in variables:
+        x, params = get_var_params(variable)
+        ranges[variable[NAME]] = x
+        cores[variable[NAME]] = {level: get_core(typename, levelparams)
+                                 for level, (typename, levelparams) in
+                                 params.items()}
+    varnames = []
+    for position, weight, ruledata in keyed.values():
+        for vardata in ruledata[ANTECEDENT][VARIABLES]:
+            if vardata[NAME] not in varnames:
+                varnames.append(vardata[NAME])
+    merged = True
+    while merged:
+        merged = False
+        for varname in varnames:
+            groups = get_groups(keyed, varname)
+            for (rest, implication, consequent, weight), members in \
+                    groups.items():
+                levelcores = [cores[varname][level] for level in members]
+                if not covers(ranges[varname],
+                              [core for core in levelcores
+                               if core is not None]):
+                    continue
+                removed = [keyed.pop(key) for key in members.values()]
+                position, _, ruledata = min(removed, key=lambda v: v[0])
+                ruledata = {
+                    WEIGHT: weight,
+                    ANTECEDENT: {
+                        OPERATOR: AND,
+                        VARIABLES: [
+                            vardata for vardata in
+                            ruledata[ANTECEDENT][VARIABLES]
+                            if vardata[NAME] != varname]},
+                    CONSEQUENT: ruledata[CONSEQUENT]}
+                key = (AND, rest, implication, consequent)
+                if key in keyed:
+                    keyed[key][0] = min(keyed[key][0], position)
+                    keyed[key][1] = max(keyed[key][1], weight)
+                else:
+                    keyed[key] = [position, weight, ruledata]
+                merged = True
+
+
+def get_groups(keyed, varname):
+    """Groups the AND rules that reference a variable, and at least one
+    other, by their other operands, implication, consequent and weight.
+    :param keyed: (dict) rules, as returned by dedupe()
+    :param varname: (str) variable name
+    :returns: (dict) (other operands (frozenset), implication (str),
+              consequent (frozenset), weight (float)) -> level name (str) ->
+              rule key (tuple)
+    """
+    ret = {}
+    for key, (position, weight, ruledata) in keyed.items():
+        operator, antecedent, implication, consequent = key
+        levels = [level for name, level in antecedent if name == varname]
+        if operator != AND or len(levels) != 1 or len(antecedent) < 2:
+            continue
+        rest = antecedent - {(varname, levels[0])}
+        group = ret.setdefault((rest, implication, consequent, weight), {})
+        group[levels[0]] = key
+    return ret
@@ -0,0 +1,122 @@
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from blfuzzy.constants import CHUNKSIZE
+
+_engine = None  # the compiled rule base of a worker process
+
+
+class WorkerPool(object):
+    """Persistent pool of worker processes for batch inference on one rule
+    base. The compiled engine is sent to each worker once, when the worker
+    starts; input and output arrays are exchanged through shared memory, so
+    tasks only carry the names of the shared blocks and the rows to compute.
+    :attr engine: (CompiledEngine) compiled rule base
+    :attr workers: (int) number of worker processes
+    :attr chunksize: (int) rows per task
+    """
+
+    def __init__(self, engine, workers, chunksize=CHUNKSIZE):
+        """
+        :param engine: (CompiledEngine) compiled rule base
+        :param workers: (int) number of worker processes
+        :param chunksize: (int) rows per task
+        """
+        if workers < 1:
+            raise ValueError('workers must be positive')
+        self.engine = engine
+        self.workers = workers
+        self.chunksize = chunksize
+        self.executor = ProcessPoolExecutor(
+                workers, initializer=init_worker, initargs=(engine,))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        self.executor.shutdown()
+
+    def infer_batch(self, inputs):
+        """Perform fuzzy inference for many sets of input values, splitting
+        the rows across the worker processes. Results are the same as those
+        of CompiledEngine.infer_batch().
+        :param inputs: (dict) input variable name (str) -> values (1d array)
+        :returns: (dict) output variable name (str) -> crisp values (ndarray)
+        """
+        engine = self.engine
+        values = engine.input_arrays(inputs)
+        n = len(next(iter(values.values())))
+        shape_in = (len(engine.inputs), n)
+        shape_out = (len(engine.outputs), n)
+        shm_in = make_shared(shape_in)
+        shm_out = make_shared(shape_out)
+        try:
+            array_in = np.ndarray(shape_in, buffer=shm_in.buf)
+            for i, varname in enumerate(engine.inputs):
+                array_in[i] = values[varname]
+            del array_in
+            futures = []
+            for start in range(0, n, self.chunksize):
+                stop = min(start + self.chunksize, n)
+                futures.append(self.executor.submit(
+                    infer_rows, shm_in.name, shape_in, shm_out.name,
+                    shape_out, start, stop))
+            for future in futures:
+                future.result()
+            array_out = np.ndarray(shape_out, buffer=shm_out.buf)
+            ret = {}
+            for i, varname in enumerate(engine.outputs):
+                ret[varname] = array_out[i].copy()
+            del array_out
+            return ret
+        finally:
+            for shm in (shm_in, shm_out):
+                shm.close()
+                shm.unlink()
+
+
+def make_shared(shape):
+    """Creates a shared memory block for a float array.
+    :param shape: (tuple) array shape
+    :returns: (SharedMemory) shared memory block
+    """
+    size = max(1, int(np.prod(shape)) * np.dtype(float).itemsize)
+    return shared_memory.SharedMemory(create=True, size=size)
+
+
+def init_worker(engine):
+    """Keeps the compiled rule base in the worker process.
+    :param engine: (CompiledEngine) compiled rule base
+    """
+    global _engine
+    _engine = engine
+
+
+def infer_rows(name_in, shape_in, name_out, shape_out, start, stop):
+    """Computes a range of rows, reading inputs from and writing outputs to
+    shared memory.
+    :param name_in: (str) name of shared inputs block: inputs x rows
+    :param shape_in: (tuple) shape of inputs array
+    :param name_out: (str) name of shared outputs block: outputs x rows
+    :param shape_out: (tuple) shape of outputs array
+    :param start: (int) first row
+    :param stop: (int) row after the last row
+    """
+    shm_in = shared_memory.SharedMemory(name=name_in)
+    shm_out = shared_memory.SharedMemory(name=name_out)
+    try:
+        array_in = np.ndarray(shape_in, buffer=shm_in.buf)
+        array_out = np.ndarray(shape_out, buffer=shm_out.buf)
+        inputs = {}
+        for i, varname in enumerate(_engine.inputs):
+            inputs[varname] = array_in[i, start:stop]
+        outputs = _engine.infer_batch(inputs)
+        for i, varname in enumerate(_engine.outputs):
+            array_out[i, start:stop] = outputs[varname]
+        del inputs, outputs, array_in, array_out
+    finally:
+        shm_in.close()
+        shm_out.close()
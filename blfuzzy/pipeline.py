@@ -0,0 +1,176 @@
+import numpy as np
+
+
+class Pipeline(object):
+    """Hierarchical fuzzy system: compiled rule bases, the stages, whose
+    output variables feed input variables of other stages. Stage inputs are
+    wired to the output of the same name, or to the output given in links;
+    the remaining inputs are the inputs of the pipeline. Wiring is checked
+    once, at construction: every output range must lie within the range of
+    the inputs it feeds, so that crisp values passed along are always valid
+    inputs, and the stages must not form a cycle. infer_batch() then runs
+    whole batches a stage at a time, in dependency order, each stage taking
+    the arrays of its predecessors as they are, without going back to rows.
+    Outputs that could not be computed are nan, from infer() too; the
+    stages they feed need missing_values, or they raise ValueError.
+    :attr stages: (dict) stage name (str) -> CompiledEngine
+    :attr producers: (dict) output variable name (str) -> name of the stage
+                     that computes it (str)
+    :attr links: (dict) (stage name (str), input variable name (str)) ->
+                 output variable name (str) feeding it
+    :attr order: (list) stage names, each after the stages it takes inputs
+                 from
+    :attr inputs: (list) input variable names not fed by a stage
+    :attr outputs: (list) output variable names of all stages, in order
+    """
+
+    def __init__(self, stages, links=None):
+        """
+        :param stages: (dict) stage name (str) -> CompiledEngine
+        :param links: (dict) (stage name (str), input variable name (str)) ->
+                      output variable name (str), for inputs not named as
+                      the output feeding them
+        :raises ValueError: unknown stage or variable, output computed by
+                            two stages, range mismatch, or cycle
+        """
+        self.stages = dict(stages)
+        self.producers = self.get_producers()
+        self.links = self.get_links(links or {})
+        self.check_ranges()
+        self.order = self.get_order()
+        self.inputs = []
+        for name in self.order:
+            for varname in self.stages[name].inputs:
+                if ((name, varname) not in self.links and
+                        varname not in self.inputs):
+                    self.inputs.append(varname)
+        self.outputs = [varname for name in self.order
+                        for varname in self.stages[name].outputs]
+
+    def get_producers(self):
+        """
+        :returns: (dict) output variable name (str) -> stage name (str)
+        :raises ValueError: output computed by two stages
+        """
+        ret = {}
+        for name, engine in self.stages.items():
+            for varname in engine.outputs:
+                if varname in ret:
+                    raise ValueError('"{}" is an output of "{}" and "{}"'
+                                     .format(varname, ret[varname], name))
+                ret[varname] = name
+        return ret
+
+    def get_links(self, links):
+        """Resolves the explicit links, and wires the other stage inputs to
+        the outputs of the same name.
+        :param links: (dict) (stage name, input variable name) -> output
+                      variable name
+        :returns: (dict) (stage name, input variable name) -> output
+                  variable name, for every stage input fed by a stage
+        :raises ValueError: unknown stage or variable
+        """
+        for (name, varname), output in links.items():
+            if name not in self.stages:
+                raise ValueError('"{}" not found'.format(name))
+            if varname not in self.stages[name].inputs:
+                raise ValueError('"{}" not found'.format(varname))
+            if output not in self.producers:
+                raise ValueError('"{}" not found'.format(output))
+        ret = dict(links)
+        for name, engine in self.stages.items():
+            for varname in engine.inputs:
+                if (name, varname) not in ret and varname in self.producers:
+                    ret[(name, varname)] = varname
+        return ret
+
+    def check_ranges(self):
+        """Verifies that each output lies within the range of the inputs it
+        feeds.
+        :raises ValueError: output range exceeds input range
+        """
+        for (name, varname), output in self.links.items():
+            source = self.stages[self.producers[output]].x[output]
+            target = self.stages[name].x[varname]
+            if source[0] < target[0] or source[-1] > target[-1]:
+                raise ValueError(
+                        '"{}" range [{}, {}] exceeds "{}" range [{}, {}] of '
+                        '"{}"'.format(output, source[0], source[-1], varname,
+                                      target[0], target[-1], name))
+
+    def get_order(self):
+        """Orders the stages topologically: stages whose predecessors have
+        all been placed are placed next, in the order they were given.
+        :returns: (list) stage names
+        :raises ValueError: cycle
+        """
+        predecessors = {name: set() for name in self.stages}
+        for (name, varname), output in self.links.items():
+            predecessors[name].add(self.producers[output])
+        ret = []
+        done = set()
+        while len(ret) < len(self.stages):
+            ready = [name for name in self.stages if name not in done and
+                     predecessors[name] <= done]
+            if not ready:
+                raise ValueError('stages "{}" form a cycle'.format(
+                        '", "'.join(name for name in self.stages
+                                    if name not in done)))
+            ret.extend(ready)
+            done.update(ready)
+        return ret
+
+    def get_stage_inputs(self, name, values):
+        """
+        :param name: (str) stage name
+        :param values: (dict) variable name (str) -> values computed or
+                       given so far
+        :returns: (dict) input variable name (str) -> values, for the stage
+        """
+        ret = {}
+        for varname in self.stages[name].inputs:
+            source = self.links.get((name, varname), varname)
+            if source in values:
+                ret[varname] = values[source]
+        return ret
+
+    def check_inputs(self, inputs):
+        """
+        :param inputs: (dict) input variable name (str) -> values
+        :raises ValueError: unknown variable
+        """
+        for varname in inputs:
+            if varname not in self.inputs:
+                raise ValueError('"{}" not found'.format(varname))
+
+    def infer(self, inputs):
+        """Perform fuzzy inference for one set of input values, a stage at a
+        time.
+        :param inputs: (dict) input variable name (str) -> value (float)
+        :returns: (dict) output variable name (str) -> crisp value (float),
+                  for the outputs of all stages
+        """
+        self.check_inputs(inputs)
+        values = dict(inputs)
+        for name in self.order:
+            stage_inputs = self.get_stage_inputs(name, values)
+            for varname, value in stage_inputs.items():
+                if value is not None and np.isnan(value):
+                    stage_inputs[varname] = None
+            values.update(self.stages[name].infer(stage_inputs))
+        return {varname: values[varname] for varname in self.outputs}
+
+    def infer_batch(self, inputs):
+        """Perform fuzzy inference for many sets of input values at once, a
+        stage at a time (see CompiledEngine.infer_batch()); the outputs of a
+        stage stay arrays in memory until the stages they feed have run.
+        :param inputs: (dict) input variable name (str) -> values (1d array)
+        :returns: (dict) output variable name (str) -> crisp values
+                  (ndarray), for the outputs of all stages
+        """
+        self.check_inputs(inputs)
+        values = dict(inputs)
+        for name in self.order:
+            values.update(self.stages[name].infer_batch(
+                    self.get_stage_inputs(name, values)))
+        return {varname: values[varname] for varname in self.outputs}
@@ -0,0 +1,138 @@
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from blfuzzy.compiled import CompiledEngine
+from blfuzzy.helper import get_var_params
+from blfuzzy.constants import NAME, LEVELS, LEVEL, WEIGHT, X
+from blfuzzy.constants import VARIABLES, RULES, AGGREGATION, DEFUZZIFICATION
+from blfuzzy.constants import OPERATOR, IMPLICATION, ANTECEDENT, CONSEQUENT
+
+
+def canonical_variable(data):
+    """
+    :param data: (dict) variable data
+    :returns: (dict) range (list) and level name, mf type and params (list)
+              of each level, resolved as Variable does, without computing
+              the mfs
+    """
+    x, params = get_var_params(data)
+    return {X: x.tolist(),
+            LEVELS: [[level, typename, levelparams.tolist()]
+                     for level, (typename, levelparams) in params.items()]}
+
+
+def canonical_spec(data):
+    """Canonical form of a specification, without input values: variables
+    resolved to their range and the mf type and params of each level, as
+    the engines use them, and rules as lists. Specifications that differ
+    only in input values, key order, int versus float numbers, or mf params
+    given versus left to their defaults have the same canonical form.
+    :param data: (dict) specification of system; values are ignored
+    :returns: (str) JSON text, keys sorted
+    """
+    ret = {
+        VARIABLES: {variable[NAME]: canonical_variable(variable)
+                    for variable in data[VARIABLES]},
+        RULES: [[float(ruledata[WEIGHT]),
+                 ruledata[ANTECEDENT][OPERATOR],
+                 [[vardata[NAME], vardata[LEVEL]]
+                  for vardata in ruledata[ANTECEDENT][VARIABLES]],
+                 ruledata[CONSEQUENT][IMPLICATION],
+                 [[vardata[NAME], vardata[LEVEL]]
+                  for vardata in ruledata[CONSEQUENT][VARIABLES]]]
+                for ruledata in data[RULES]],
+        AGGREGATION: data[AGGREGATION],
+        DEFUZZIFICATION: data[DEFUZZIFICATION]}
+    return json.dumps(ret, sort_keys=True, separators=(',', ':'))
+
+
+def spec_key(data):
+    """
+    :param data: (dict) specification of system; values are ignored
+    :returns: (str) SHA-256 hex digest of the canonical specification
+    """
+    return hashlib.sha256(canonical_spec(data).encode()).hexdigest()
+
+
+class EngineRegistry(object):
+    """Compiled engines of many rule bases, keyed by the hash of their
+    canonical specification, so that all the requests that carry the same
+    specification share one engine, compiled once. The least recently used
+    engines are evicted when the engines kept take more than max_bytes
+    (see CompiledEngine.nbytes); the engine just compiled is kept even if
+    it alone takes more. Access is locked, so one registry can be shared
+    by threads; two threads missing the same specification at once both
+    compile it, and the first engine stored is kept.
+    :attr max_bytes: (int) bytes of engines kept
+    :attr options: (dict) CompiledEngine keyword arguments of every engine
+    :attr engines: (OrderedDict) key (str) -> CompiledEngine, least recently
+                   used first
+    :attr nbytes: (int) bytes of the engines kept
+    :attr counts: (dict) hits, misses and evictions (int)
+    """
+
+    def __init__(self, max_bytes, **options):
+        """
+        :param max_bytes: (int) bytes of engines kept
+        :param options: (dict) CompiledEngine keyword arguments, e.g.
+                        missing_values=True
+        """
+        if max_bytes < 1:
+            raise ValueError('max_bytes must be positive')
+        self.max_bytes = max_bytes
+        self.options = options
+        self.engines = OrderedDict()
+        self.nbytes = 0
+        self.counts = {'hits': 0, 'misses': 0, 'evictions': 0}
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.engines)
+
+    def get(self, data):
+        """Returns the compiled engine of a specification, compiling it if
+        it is not kept.
+        :param data: (dict) specification of system; values are ignored
+        :returns: (CompiledEngine) compiled rule base
+        """
+        key = spec_key(data)
+        with self.lock:
+            engine = self.engines.get(key)
+            if engine is not None:
+                self.engines.move_to_end(key)
+                self.counts['hits'] += 1
+                return engine
+            self.counts['misses'] += 1
+        engine = CompiledEngine(data, **self.options)
+        with self.lock:
+            kept = self.engines.get(key)
+            if kept is not None:  # compiled meanwhile by another thread
+                self.engines.move_to_end(key)
+                return kept
+            self.engines[key] = engine
+            self.nbytes += engine.nbytes
+            while self.nbytes > self.max_bytes and len(self.engines) > 1:
+                key, evicted = self.engines.popitem(last=False)
+                self.nbytes -= evicted.nbytes
+                self.counts['evictions'] += 1
+        return engine
+
+    def clear(self):
+        """Removes all engines and resets the counts.
+        """
+        with self.lock:
+            self.engines.clear()
+            self.nbytes = 0
+            self.counts = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    def info(self):
+        """
+        :returns: (dict) hits, misses, evictions, size (number of engines),
+                  nbytes and max_bytes (int)
+        """
+        with self.lock:
+            ret = dict(self.counts)
+            ret.update({'size': len(self.engines), 'nbytes': self.nbytes,
+                        'max_bytes': self.max_bytes})
+        return ret
@@ -0,0 +1,323 @@
+#! /usr/bin/env python
+"""HTTP inference service for compiled rule bases.
+
+Serves one or more saved CompiledEngines (see CompiledEngine.save()), each
+under a name, and batches concurrent requests to the same rule base:
+
+    python -m blfuzzy.server tipping=/path/to/engine --port 8080
+
+    POST /infer/<name>  {"food": 8, "service": 3}  ->  {"tip": 13.35}
+    GET /engines        input and output variables of each rule base
+    GET /stats          throughput and latency of each rule base
+"""
+import json
+import time
+import asyncio
+import argparse
+import collections
+from http import HTTPStatus
+import numpy as np
+from blfuzzy.compiled import CompiledEngine
+from blfuzzy.constants import BATCH_WINDOW, BATCH_ROWS
+
+LATENCY_SAMPLES = 10000  # most recent request latencies kept for percentiles
+MAX_BODY = 2 ** 20  # max bytes of a request body
+INFER = '/infer/'
+
+
+class MicroBatcher(object):
+    """Collects the requests made concurrently for one rule base into
+    micro-batches: a batch is run when its oldest request has waited for
+    the window, or as soon as it has max_rows requests. Batches run through
+    CompiledEngine.infer_batch() in an executor, off the event loop, so that
+    requests keep being collected meanwhile. Missing values are passed to
+    the batch as nan.
+    :attr engine: (CompiledEngine) compiled rule base
+    :attr window: (float) seconds a request waits for others to batch with
+    :attr max_rows: (int) max rows of a batch
+    :attr executor: (Executor) where batches run, or None for the event
+                    loop's default executor
+    :attr pending: (list) of (input values (dict), future, start time)
+    :attr timer: (TimerHandle) flush of the pending requests, or None
+    :attr tasks: (set) batches running
+    :attr counts: (dict) requests, batches and errors (int)
+    :attr latencies: (deque) seconds of the most recent requests, from
+                     arrival to result
+    :attr started: (float) perf_counter() time of the last reset
+    """
+
+    def __init__(self, engine, window=BATCH_WINDOW, max_rows=BATCH_ROWS,
+                 executor=None):
+        """
+        :param engine: (CompiledEngine) compiled rule base
+        :param window: (float) seconds a request waits for others
+        :param max_rows: (int) max rows of a batch
+        :param executor: (Executor) where batches run, or None for the
+                         event loop's default executor
+        """
+        if max_rows < 1:
+            raise ValueError('max_rows must be positive')
+        self.engine = engine
+        self.window = window
+        self.max_rows = max_rows
+        self.executor = executor
+        self.pending = []
+        self.timer = None
+        self.tasks = set()
+        self.reset()
+
+    def reset(self):
+        """Sets the counters to zero and forgets the latencies.
+        """
+        self.counts = {'requests': 0, 'batches': 0, 'errors': 0}
+        self.latencies = collections.deque(maxlen=LATENCY_SAMPLES)
+        self.started = time.perf_counter()
+
+    async def infer(self, inputs):
+        """Perform fuzzy inference for one set of input values, batched with
+        the other requests that arrive within the window.
+        :param inputs: (dict) input variable name (str) -> value (float)
+        :returns: (dict) output variable name (str) -> crisp value (float)
+        :raises ValueError: unknown variable, value missing or out of range
+        """
+        values = self.engine.input_values(inputs)
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.pending.append((values, future, time.perf_counter()))
+        if len(self.pending) >= self.max_rows:
+            self.flush()
+        elif self.timer is None:
+            self.timer = loop.call_later(self.window, self.flush)
+        return await future
+
+    def flush(self):
+        """Starts a batch of the pending requests.
+        """
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        batch, self.pending = self.pending, []
+        if batch:
+            task = asyncio.ensure_future(self.run(batch))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+
+    async def run(self, batch):
+        """Runs a batch in the executor and sets each request's result.
+        :param batch: (list) of (input values (dict), future, start time)
+        """
+        loop = asyncio.get_running_loop()
+        rows = [values for values, future, start in batch]
+        try:
+            results = await loop.run_in_executor(self.executor,
+                                                 self.infer_rows, rows)
+        except Exception as e:
+            results = [e] * len(batch)
+        now = time.perf_counter()
+        self.counts['requests'] += len(batch)
+        self.counts['batches'] += 1
+        for (values, future, start), result in zip(batch, results):
+            self.latencies.append(now - start)
+            if isinstance(result, Exception):
+                self.counts['errors'] += 1
+            if future.done():  # the client went away
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def infer_rows(self, rows):
+        """Perform fuzzy inference for a batch of requests. Runs in the
+        executor. If the batch fails, its rows are run one at a time, so
+        that only the requests at fault get an error.
+        :param rows: (list) of input values (dict), already checked
+        :returns: (list) of results (dict: output variable name (str) ->
+                  crisp value (float), or Exception), in the order of the
+                  rows
+        """
+        inputs = {varname: np.array([np.nan if values[varname] is None
+                                     else values[varname] for values in rows])
+                  for varname in self.engine.inputs}
+        try:
+            outputs = self.engine.infer_batch(inputs)
+        except Exception:
+            return [self.infer_row(values) for values in rows]
+        return [{varname: float(values[i])
+                 for varname, values in outputs.items()}
+                for i in range(len(rows))]
+
+    def infer_row(self, values):
+        """
+        :param values: (dict) input values of one request, already checked
+        :returns: (dict) output variable name (str) -> crisp value (float),
+                  or the Exception raised
+        """
+        try:
+            return {varname: float(value) for varname, value in
+                    self.engine.infer(values).items()}
+        except Exception as e:
+            return e
+
+    def info(self):
+        """
+        :returns: (dict) counts of requests, batches and errors, mean batch
+                  size, requests per second since the last reset, and
+                  latency mean and percentiles in seconds
+        """
+        ret = dict(self.counts)
+        batches = max(1, ret['batches'])
+        ret['mean_batch_size'] = ret['requests'] / batches
+        ret['requests_per_second'] = ret['requests'] / (
+                time.perf_counter() - self.started)
+        latencies = np.array(self.latencies)
+        for name, q in [('p50', 50), ('p90', 90), ('p99', 99)]:
+            ret['latency_{}_seconds'.format(name)] = \
+                float(np.percentile(latencies, q)) if len(latencies) else 0.0
+        ret['latency_mean_seconds'] = \
+            float(latencies.mean()) if len(latencies) else 0.0
+        return ret
+
+
+class InferenceServer(object):
+    """Minimal HTTP/1.1 front end, with persistent connections, for resident
+    compiled rule bases, one MicroBatcher each. Request and response bodies
+    are JSON objects; errors are {"error": message}, with status 400 for
+    bad input values, 404 for unknown rule bases or paths and 500 for
+    failed inference. Outputs that could not be computed are null.
+    :attr batchers: (dict) rule base name (str) -> MicroBatcher
+    :attr server: (Server) asyncio server, or None if not started
+    :attr port: (int) port listened on, or None if not started
+    """
+
+    def __init__(self, engines, window=BATCH_WINDOW, max_rows=BATCH_ROWS,
+                 executor=None):
+        """
+        :param engines: (dict) rule base name (str) -> CompiledEngine
+        :param window: (float) seconds a request waits for others
+        :param max_rows: (int) max rows of a batch
+        :param executor: (Executor) where batches run, or None for the
+                         event loop's default executor
+        """
+        self.batchers = {name: MicroBatcher(engine, window, max_rows,
+                                            executor)
+                         for name, engine in engines.items()}
+        self.server = None
+        self.port = None
+
+    async def start(self, host='127.0.0.1', port=0):
+        """
+        :param host: (str) interface to listen on
+        :param port: (int) port to listen on, 0 for any free port
+        :returns: (int) port listened on
+        """
+        self.server = await asyncio.start_server(self.handle, host, port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self.port
+
+    async def close(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def handle(self, reader, writer):
+        """Serves the requests of one connection.
+        :param reader: (StreamReader) connection input
+        :param writer: (StreamWriter) connection output
+        """
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                method, path, version = line.decode('latin-1').split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get('content-length', 0))
+                if length > MAX_BODY:
+                    break
+                body = await reader.readexactly(length)
+                status, payload = await self.respond(method, path, body)
+                data = json.dumps(payload).encode()
+                writer.write('HTTP/1.1 {} {}\r\n'
+                             'Content-Type: application/json\r\n'
+                             'Content-Length: {}\r\n\r\n'.format(
+                                 status, HTTPStatus(status).phrase,
+                                 len(data)).encode('latin-1') + data)
+                await writer.drain()
+                if headers.get('connection', '').lower() == 'close':
+                    break
+        except (ValueError, asyncio.IncompleteReadError, ConnectionError):
+            pass  # malformed request or connection lost
+        finally:
+            writer.close()
+
+    async def respond(self, method, path, body):
+        """
+        :param method: (str) HTTP method
+        :param path: (str) request path
+        :param body: (bytes) request body
+        :returns: (tuple) status (int), JSON payload (dict)
+        """
+        if method == 'GET' and path == '/engines':
+            return 200, {name: {'inputs': batcher.engine.inputs,
+                                'outputs': batcher.engine.outputs}
+                         for name, batcher in self.batchers.items()}
+        if method == 'GET' and path == '/stats':
+            return 200, {name: batcher.info()
+                         for name, batcher in self.batchers.items()}
+        if method == 'POST' and path.startswith(INFER):
+            name = path[len(INFER):]
+            if name not in self.batchers:
+                return 404, {'error': '"{}" not found'.format(name)}
+            try:
+                inputs = json.loads(body.decode())
+                if not isinstance(inputs, dict):
+                    raise ValueError('expected a JSON object')
+                result = await self.batchers[name].infer(inputs)
+            except (ValueError, TypeError) as e:
+                return 400, {'error': str(e)}
+            except Exception as e:
+                return 500, {'error': repr(e)}
+            return 200, {varname: None if np.isnan(value) else value
+                         for varname, value in result.items()}
+        return 404, {'error': '"{}" not found'.format(path)}
+
+
+def get_command_line_args():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('engines', nargs='+', metavar='NAME=PATHNAME',
+                        help='rule base name and saved CompiledEngine')
+    parser.add_argument('--host', default='127.0.0.1',
+                        help='interface to listen on')
+    parser.add_argument('--port', type=int, default=8080,
+                        help='port to listen on')
+    parser.add_argument('--window', type=float, default=BATCH_WINDOW,
+                        help='seconds a request waits for others to batch '
+                             'with')
+    parser.add_argument('--max-rows', type=int, default=BATCH_ROWS,
+                        help='max rows of a batch')
+    return parser.parse_args()
+
+
+async def serve(server, host, port):
+    await server.start(host, port)
+    await server.server.serve_forever()
+
+
+def main():
+    args = get_command_line_args()
+    engines = {}
+    for spec in args.engines:
+        name, _, pathname = spec.partition('=')
+        engines[name] = CompiledEngine.load(pathname)
+    server = InferenceServer(engines, args.window, args.max_rows)
+    asyncio.run(serve(server, args.host, args.port))
+
+
+if __name__ == '__main__':
+    main()
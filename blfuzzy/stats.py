@@ -0,0 +1,126 @@
+import time
+import logging
+import threading
+from contextlib import nullcontext
+
+FUZZIFY = 'fuzzify'
+EVALUATE = 'evaluate'
+AGGREGATE = 'aggregate'
+DEFUZZIFY = 'defuzzify'
+PHASES = [FUZZIFY, EVALUATE, AGGREGATE, DEFUZZIFY]
+COUNTERS = ['runs', 'rows', 'rules_evaluated', 'rules_skipped',
+            'interp_calls', 'array_bytes']
+
+_null_timer = nullcontext()
+logger = logging.getLogger('blfuzzy')
+
+
+class Stats(object):
+    """Opt-in inference instrumentation: wall time per phase and counters,
+    accumulated over the runs of the engines it is given to. Engines without
+    a Stats object do no bookkeeping at all. Updates are locked, so one
+    object can be shared by threads; worker processes keep their own copies,
+    which are not collected.
+    :attr seconds: (dict) phase name (str) -> accumulated wall time (float)
+    :attr counts: (dict) counter name (str) -> accumulated count (int):
+        runs: calls to run(), infer() or infer_batch()
+        rows: sets of input values inferred
+        rules_evaluated: rule antecedents computed, per row
+        rules_skipped: rules left out of implication and aggregation, per
+            row, for missing values or a zero firing strength
+        interp_calls: membership evaluations, one per level of each input
+            value
+        array_bytes: bytes of implicated and aggregated mfs allocated
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def __getstate__(self):
+        return {'seconds': self.seconds, 'counts': self.counts}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+
+    def reset(self):
+        """Sets all times and counters to zero.
+        """
+        self.seconds = {phase: 0.0 for phase in PHASES}
+        self.counts = {name: 0 for name in COUNTERS}
+
+    def time(self, phase):
+        """Returns a context manager that adds its wall time to a phase.
+        :param phase: (str) phase name
+        :returns: (Timer) context manager
+        """
+        return Timer(self, phase)
+
+    def add_time(self, phase, seconds):
+        """
+        :param phase: (str) phase name
+        :param seconds: (float) wall time
+        """
+        with self.lock:
+            self.seconds[phase] = self.seconds.get(phase, 0.0) + seconds
+
+    def count(self, **counters):
+        """Adds to counters, e.g. count(runs=1, interp_calls=6).
+        :param counters: (dict) counter name (str) -> increment (int)
+        """
+        with self.lock:
+            for name, n in counters.items():
+                self.counts[name] = self.counts.get(name, 0) + int(n)
+
+    def as_dict(self):
+        """Flat view for metrics exporters.
+        :returns: (dict) '<phase>_seconds' and counter names -> value
+        """
+        with self.lock:
+            ret = {'{}_seconds'.format(phase): seconds
+                   for phase, seconds in self.seconds.items()}
+            ret.update(self.counts)
+        return ret
+
+    def log(self, log=None, level=logging.INFO):
+        """Writes the times and counters as one log record.
+        :param log: (Logger) logger, 'blfuzzy' if not given
+        :param level: (int) logging level
+        """
+        log = log or logger
+        if log.isEnabledFor(level):
+            log.log(level, 'inference stats: %s', ' '.join(
+                '{}={}'.format(name, value)
+                for name, value in self.as_dict().items()))
+
+
+class Timer(object):
+    """Context manager timing one phase.
+    :attr stats: (Stats) where the time is added
+    :attr phase: (str) phase name
+    """
+
+    def __init__(self, stats, phase):
+        self.stats = stats
+        self.phase = phase
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        self.stats.add_time(self.phase, time.perf_counter() - self.start)
+
+
+def timer(stats, phase):
+    """Returns a context manager timing a phase, or doing nothing if stats
+    are disabled.
+    :param stats: (Stats) instrumentation, or None
+    :param phase: (str) phase name
+    :returns: context manager
+    """
+    if stats is None:
+        return _null_timer
+    return stats.time(phase)
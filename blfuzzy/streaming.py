@@ -0,0 +1,174 @@
+import csv
+import numpy as np
+from blfuzzy.constants import CHUNKSIZE
+
+CSV = '.csv'
+PARQUET = '.parquet'
+
+
+def infer_stream(engine, source, chunksize=CHUNKSIZE):
+    """Performs batch inference over a source of rows, one chunk at a time,
+    so that memory use is bounded by the chunk size, not the source size.
+    :param engine: (CompiledEngine) compiled rule base
+    :param source: (str) pathname to a CSV or Parquet file, or an iterable of
+                   rows (dict: name (str) -> value) or of chunks (dict:
+                   name (str) -> values (1d array))
+    :param chunksize: (int) maximum number of rows per chunk
+    :returns: (generator) of chunks (dict: name (str) -> values (ndarray))
+              with the source columns followed by the output variables
+    """
+    for chunk in read_chunks(source, chunksize, engine.inputs):
+        inputs = {varname: chunk[varname] for varname in engine.inputs}
+        chunk.update(engine.infer_batch(inputs))
+        yield chunk
+
+
+def run_stream(engine, source, pathname, chunksize=CHUNKSIZE):
+    """Performs batch inference over a source of rows and writes the results
+    to a CSV file as each chunk is computed.
+    :param engine: (CompiledEngine) compiled rule base
+    :param source: (str or iterable) source of rows (see infer_stream)
+    :param pathname: (str) pathname to result CSV file
+    :param chunksize: (int) maximum number of rows per chunk
+    :returns: (int) number of rows written
+    """
+    return write_csv(pathname, infer_stream(engine, source, chunksize))
+
+
+def read_chunks(source, chunksize, numeric=()):
+    """Reads a source of rows in chunks.
+    :param source: (str or iterable) source of rows (see infer_stream)
+    :param chunksize: (int) maximum number of rows per chunk
+    :param numeric: (iterable) names of columns to be read as floats
+    :returns: (generator) of chunks (dict: name (str) -> values (ndarray))
+    """
+    if chunksize < 1:
+        raise ValueError('chunksize must be positive')
+    if isinstance(source, str):
+        if source.endswith(PARQUET):
+            return read_parquet_chunks(source, chunksize)
+        return read_csv_chunks(source, chunksize, numeric)
+    return read_iterable_chunks(source, chunksize)
+
+
+def read_csv_chunks(pathname, chunksize, numeric=()):
+    """Reads a CSV file with a header row in chunks. Empty cells of numeric
+    columns are read as nan.
+    :param pathname: (str) pathname to CSV file
+    :param chunksize: (int) maximum number of rows per chunk
+    :param numeric: (iterable) names of columns to be read as floats
+    :returns: (generator) of chunks (dict: name (str) -> values (ndarray))
+    """
+    with open(pathname, 'r', newline='') as fd:
+        reader = csv.reader(fd)
+        header = next(reader)
+        for name in numeric:
+            if name not in header:
+                raise ValueError('"{}" not found'.format(name))
+        rows = []
+        for row in reader:
+            rows.append(row)
+            if len(rows) == chunksize:
+                yield make_csv_chunk(header, rows, numeric)
+                rows = []
+        if rows:
+            yield make_csv_chunk(header, rows, numeric)
+
+
+def make_csv_chunk(header, rows, numeric):
+    """
+    :param header: (list) column names (str)
+    :param rows: (list) of rows (list of str)
+    :param numeric: (iterable) names of columns to be read as floats
+    :returns: (dict) name (str) -> values (ndarray)
+    """
+    ret = {}
+    for name, values in zip(header, zip(*rows)):
+        if name in numeric:
+            ret[name] = np.array([float(v) if v else np.nan for v in values])
+        else:
+            ret[name] = np.array(values, dtype=object)
+    return ret
+
+
+def read_parquet_chunks(pathname, chunksize):
+    """Reads a Parquet file in chunks. Requires pyarrow.
+    :param pathname: (str) pathname to Parquet file
+    :param chunksize: (int) maximum number of rows per chunk
+    :returns: (generator) of chunks (dict: name (str) -> values (ndarray))
+    """
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError('reading Parquet files requires pyarrow')
+    parquet = pq.ParquetFile(pathname)
+    for batch in parquet.iter_batches(batch_size=chunksize):
+        ret = {}
+        for name, column in zip(batch.schema.names, batch.columns):
+            ret[name] = column.to_numpy(zero_copy_only=False)
+        yield ret
+
+
+def read_iterable_chunks(rows, chunksize):
+    """Groups an iterable of rows, or of chunks, into chunks of at most
+    chunksize rows.
+    :param rows: (iterable) of rows (dict: name (str) -> value) or of chunks
+                 (dict: name (str) -> values (1d array))
+    :param chunksize: (int) maximum number of rows per chunk
+    :returns: (generator) of chunks (dict: name (str) -> values (ndarray))
+    """
+    pending = []
+    for item in rows:
+        if np.ndim(next(iter(item.values()))) == 0:  # a single row
+            pending.append(item)
+            if len(pending) == chunksize:
+                yield make_rows_chunk(pending)
+                pending = []
+            continue
+        if pending:
+            yield make_rows_chunk(pending)
+            pending = []
+        chunk = {name: np.asarray(values) for name, values in item.items()}
+        n = len(next(iter(chunk.values())))
+        for start in range(0, n, chunksize):
+            yield {name: values[start:start + chunksize]
+                   for name, values in chunk.items()}
+    if pending:
+        yield make_rows_chunk(pending)
+
+
+def make_rows_chunk(rows):
+    """
+    :param rows: (list) of rows (dict: name (str) -> value)
+    :returns: (dict) name (str) -> values (ndarray)
+    """
+    ret = {}
+    for name in rows[0]:
+        values = [row.get(name) for row in rows]
+        try:
+            ret[name] = np.array([np.nan if v is None else v for v in values],
+                                 dtype=float)
+        except (TypeError, ValueError):
+            ret[name] = np.array(values, dtype=object)
+    return ret
+
+
+def write_csv(pathname, chunks):
+    """Writes chunks to a CSV file as they are produced, with a header row
+    taken from the first chunk.
+    :param pathname: (str) pathname to CSV file
+    :param chunks: (iterable) of chunks (dict: name (str) -> values)
+    :returns: (int) number of rows written
+    """
+    ret = 0
+    with open(pathname, 'w', newline='') as fd:
+        writer = csv.writer(fd)
+        header = None
+        for chunk in chunks:
+            if header is None:
+                header = list(chunk)
+                writer.writerow(header)
+            columns = [chunk[name] for name in header]
+            writer.writerows(zip(*columns))
+            ret += len(columns[0])
+    return ret
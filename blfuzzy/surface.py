@@ -0,0 +1,190 @@
+import numpy as np
+from blfuzzy.constants import RESOLUTION
+from blfuzzy.helper import check_value, check_values
+
+
+class Surface(object):
+    """Lookup table of the outputs of a compiled rule base over a grid of
+    its input ranges, queried by multilinear interpolation. Meant for rule
+    bases with two or three inputs: the table has one entry per grid point,
+    i.e. (resolution + 1) ** inputs entries per output.
+    :attr inputs: (list) input variable names
+    :attr outputs: (list) output variable names
+    :attr axes: (list) grid points of each input (ndarray), evenly spaced
+    :attr tables: (dict) output variable name (str) -> table (ndarray), one
+                  axis per input
+    :attr error: (dict) output variable name (str) -> largest absolute
+                 difference from the engine measured at the sample points
+                 (float), or None if not measured
+    :attr offsets: (list) offsets of the corners of a grid cell: tuples of
+                   0/1, one per input
+    :attr bounds: (list) first and last grid points (float) of each input
+    """
+
+    def __init__(self, inputs, axes, tables, error=None):
+        """
+        :param inputs: (list) input variable names
+        :param axes: (list) grid points of each input (ndarray)
+        :param tables: (dict) output variable name (str) -> table (ndarray)
+        :param error: (dict) output variable name (str) -> error (float)
+        """
+        self.inputs = list(inputs)
+        self.outputs = list(tables)
+        self.axes = [np.asarray(axis, dtype=float) for axis in axes]
+        self.tables = tables
+        self.error = error
+        n = len(self.inputs)
+        self.offsets = [tuple((k >> d) & 1 for d in range(n))
+                        for k in range(2 ** n)]
+        self.bounds = [(float(axis[0]), float(axis[-1]))
+                       for axis in self.axes]
+        for table in tables.values():
+            if table.shape != tuple(len(axis) for axis in self.axes):
+                raise ValueError('table shape does not match the axes')
+
+    @classmethod
+    def build(self, engine, resolution=RESOLUTION, samples=10000, seed=0):
+        """Evaluates a compiled rule base over a grid of its input ranges.
+        :param engine: (CompiledEngine) compiled rule base
+        :param resolution: (int or list) number of intervals of each input
+        :param samples: (int) number of points at which the error is measured
+        :param seed: (int) seed of the random sample points
+        :returns: (Surface) lookup table
+        """
+        if np.ndim(resolution) == 0:
+            resolution = [resolution] * len(engine.inputs)
+        axes = []
+        for varname, n in zip(engine.inputs, resolution):
+            x = engine.x[varname]
+            axes.append(np.linspace(x[0], x[-1], n + 1))
+        grid = np.meshgrid(*axes, indexing='ij')
+        values = engine.infer_batch({varname: points.ravel() for
+                                     varname, points in
+                                     zip(engine.inputs, grid)})
+        tables = {varname: values[varname].reshape(grid[0].shape)
+                  for varname in engine.outputs}
+        ret = self(engine.inputs, axes, tables)
+        if samples:
+            ret.error = ret.measure_error(engine, samples, seed)
+        return ret
+
+    def measure_error(self, engine, samples=10000, seed=0):
+        """Measures the largest difference from exact inference, at the
+        centers of the grid cells (where interpolation is furthest from the
+        grid points) and at random points.
+        :param engine: (CompiledEngine) compiled rule base
+        :param samples: (int) number of points of each kind, at most
+        :param seed: (int) seed of the random sample points
+        :returns: (dict) output variable name (str) -> error (float)
+        """
+        rng = np.random.RandomState(seed)
+        centers = [0.5 * (axis[:-1] + axis[1:]) for axis in self.axes]
+        ncells = int(np.prod([len(c) for c in centers]))
+        if ncells <= samples:
+            grid = np.meshgrid(*centers, indexing='ij')
+            points = [axis.ravel() for axis in grid]
+        else:
+            points = [c[rng.randint(len(c), size=samples)] for c in centers]
+        points = [np.concatenate([p, rng.uniform(axis[0], axis[-1], samples)])
+                  for p, axis in zip(points, self.axes)]
+        inputs = dict(zip(self.inputs, points))
+        expect = engine.infer_batch(inputs)
+        actual = self.infer_batch(inputs)
+        return {varname: float(np.nanmax(np.abs(actual[varname] -
+                                                expect[varname])))
+                for varname in self.outputs}
+
+    def infer(self, inputs):
+        """Interpolates the outputs for one set of input values.
+        :param inputs: (dict) input variable name (str) -> value (float)
+        :returns: (dict) output variable name (str) -> crisp value (float)
+        """
+        corner = []
+        fractions = []
+        for varname, axis, bounds in zip(self.inputs, self.axes,
+                                         self.bounds):
+            value = inputs.get(varname)
+            if value is None:
+                raise ValueError('"{}" has no value'.format(varname))
+            value = check_value(bounds, float(value))
+            intervals = len(axis) - 1
+            t = (value - bounds[0]) / (bounds[1] - bounds[0]) * intervals
+            i = min(int(t), intervals - 1)
+            corner.append(i)
+            fractions.append(t - i)
+        ret = {}
+        for varname, table in self.tables.items():
+            total = 0.0
+            for offsets in self.offsets:
+                weight = 1.0
+                index = []
+                for i, offset, fraction in zip(corner, offsets, fractions):
+                    weight *= fraction if offset else 1.0 - fraction
+                    index.append(i + offset)
+                if weight:
+                    total += weight * table.item(tuple(index))
+            ret[varname] = total
+        return ret
+
+    def infer_batch(self, inputs):
+        """Interpolates the outputs for many sets of input values.
+        :param inputs: (dict) input variable name (str) -> values (1d array)
+        :returns: (dict) output variable name (str) -> crisp values (ndarray)
+        """
+        corner = []
+        fractions = []
+        for varname, axis in zip(self.inputs, self.axes):
+            values = inputs.get(varname)
+            if values is None or np.isnan(values).any():
+                raise ValueError('"{}" has no value'.format(varname))
+            values = check_values(axis, values)
+            t = (values - axis[0]) / (axis[-1] - axis[0]) * (len(axis) - 1)
+            i = np.minimum(t.astype(int), len(axis) - 2)
+            corner.append(i)
+            fractions.append(t - i)
+        ret = {}
+        for varname, table in self.tables.items():
+            total = np.zeros(len(corner[0]))
+            for offsets in self.offsets:
+                weight = np.ones(len(corner[0]))
+                index = []
+                for i, offset, fraction in zip(corner, offsets, fractions):
+                    weight *= fraction if offset else 1.0 - fraction
+                    index.append(i + offset)
+                total += weight * table[tuple(index)]
+            ret[varname] = total
+        return ret
+
+    def save(self, pathname):
+        """Stores the lookup table to a .npz file.
+        :param pathname: (str) pathname to file
+        """
+        arrays = {}
+        for i, axis in enumerate(self.axes):
+            arrays['axis_{}'.format(i)] = axis
+        for i, varname in enumerate(self.outputs):
+            arrays['table_{}'.format(i)] = self.tables[varname]
+        error = [np.nan if self.error is None else self.error[varname]
+                 for varname in self.outputs]
+        np.savez(pathname, inputs=np.array(self.inputs),
+                 outputs=np.array(self.outputs), error=np.array(error),
+                 **arrays)
+
+    @classmethod
+    def load(self, pathname):
+        """Reads a lookup table stored with save().
+        :param pathname: (str) pathname to file
+        :returns: (Surface) lookup table
+        """
+        with np.load(pathname) as data:
+            inputs = data['inputs'].tolist()
+            outputs = data['outputs'].tolist()
+            axes = [data['axis_{}'.format(i)] for i in range(len(inputs))]
+            tables = {varname: data['table_{}'.format(i)]
+                      for i, varname in enumerate(outputs)}
+            error = data['error']
+        if np.isnan(error).any():
+            error = None
+        else:
+            error = dict(zip(outputs, error.tolist()))
+        return self(inputs, axes, tables, error)
@@ -27,12 +27,12 @@ setup(
         'python-dateutil==2.6.1',
         'pytz==2017.3',
         'PyYAML==3.12',
-        'scikit-fuzzy==0.3.1',
         'scipy==1.0.0',
         'six==1.11.0',
         'xlrd==1.1.0'
     ],
     tests_require=[
-        'pytest==3.2.3'
+        'pytest==3.2.3',
+        'scikit-fuzzy==0.3.1'
     ],
     zip_safe=False)
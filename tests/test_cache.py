@@ -0,0 +1,65 @@
+import os
+import yaml
+import pickle
+import unittest
+from blfuzzy import CompiledEngine
+from blfuzzy.cache import LRUCache
+
+HERE = os.path.dirname(__file__)
+FILENAME = 'data.yaml'
+PATHNAME = os.path.join(HERE, FILENAME)
+
+
+class TestCases(unittest.TestCase):
+
+    def setUp(self):
+        with open(PATHNAME, 'r') as self.fd:
+            self.data = yaml.load(self.fd)
+
+    def test_lru_eviction(self):
+        cache = LRUCache(2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        self.assertEqual(cache.get('a'), 1)  # b is now least recently used
+        cache.put('c', 3)
+        self.assertEqual(cache.get('b'), None)
+        self.assertEqual(cache.get('c'), 3)
+        self.assertEqual(cache.info(), {'hits': 2, 'misses': 1, 'size': 2,
+                                        'maxsize': 2})
+        cache = pickle.loads(pickle.dumps(cache))
+        self.assertEqual(cache.get('a'), 1)
+        self.assertRaises(ValueError, LRUCache, 0)
+
+    def test_cached_inference(self):
+        plain = CompiledEngine(self.data)
+        engine = CompiledEngine(self.data, fuzzy_cache_size=8,
+                                result_cache_size=4)
+        inputs = [{'service': 3.0, 'food': 8.0},
+                  {'service': 3.0, 'food': 2.0},
+                  {'service': 3.0, 'food': 8.0}]
+        for values in inputs:
+            self.assertEqual(engine.infer(values), plain.infer(values))
+        info = engine.cache_info()
+        self.assertEqual(info['result']['hits'], 1)
+        self.assertEqual(info['result']['misses'], 2)
+        # service 3.0 is fuzzified once for the two computed results
+        self.assertEqual(info['fuzzy']['hits'], 1)
+        self.assertEqual(info['fuzzy']['misses'], 3)
+        result = engine.infer(inputs[0])
+        result['tip'] = None  # callers get copies
+        self.assertEqual(engine.infer(inputs[0]), plain.infer(inputs[0]))
+        engine.invalidate()
+        self.assertEqual(engine.cache_info()['result']['size'], 0)
+        self.assertEqual(engine.cache_info()['fuzzy']['hits'], 0)
+
+    def test_cache_disabled(self):
+        engine = CompiledEngine(self.data)
+        self.assertEqual(engine.cache_info(), {})
+        engine.invalidate()
+
+    def tearDown(self):
+        self.fd.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
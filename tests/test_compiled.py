@@ -0,0 +1,347 @@
+import os
+import copy
+import json
+import yaml
+import tempfile
+import tracemalloc
+import unittest
+import pytest
+from unittest import mock
+import numpy as np
+from blfuzzy import FuzzyInferenceEngine, CompiledEngine, IncrementalEngine
+from blfuzzy.compiled import FORMAT
+from blfuzzy.constants import VARIABLES, NAME, VALUE, AGGREGATION
+from blfuzzy.constants import OR, SUM, AVERAGE, X, MIN, MAX
+from blfuzzy.constants import DEFUZZIFICATION, EXACT_CENTROID
+from blfuzzy.constants import RULES, ANTECEDENT, OPERATOR, LEVEL, AND
+from blfuzzy.constants import CENTROID, BISECTOR, MOM, SOM, LOM
+from blfuzzy.helper import get_var_range
+
+HERE = os.path.dirname(__file__)
+FILENAME = 'data.yaml'
+PATHNAME = os.path.join(HERE, FILENAME)
+
+
+def run_engine(data, inputs):
+    """Runs a single-use engine on a copy of the data with the given inputs.
+    :param data: (dict) specification of system
+    :param inputs: (dict) input variable name (str) -> value (float)
+    :returns: (dict) output variable name (str) -> crisp value (float)
+    """
+    data = copy.deepcopy(data)
+    for variable in data[VARIABLES]:
+        if variable[NAME] in inputs:
+            variable[VALUE] = inputs[variable[NAME]]
+    engine = FuzzyInferenceEngine(data)
+    engine.run()
+    ret = {}
+    for varname, variable in engine.get_output_variables().items():
+        ret[varname] = variable.value
+    return ret
+
+
+class TestCases(unittest.TestCase):
+
+    def setUp(self):
+        with open(PATHNAME, 'r') as self.fd:
+            self.data = yaml.load(self.fd)
+
+    def test_compiled_engine_variables(self):
+        engine = CompiledEngine(self.data)
+        self.assertEqual(engine.inputs, ['service', 'food'])
+        self.assertEqual(engine.outputs, ['tip'])
+        self.assertEqual(len(engine.rules), len(self.data['rules']))
+
+    def test_compiled_engine_rule_arrays(self):
+        engine = CompiledEngine(self.data)
+        assert(np.array_equal(engine.antecedent_levels,
+                              [[0, 0], [1, -1], [2, 2]]))
+        assert(np.array_equal(engine.consequent_levels, [[0], [1], [2]]))
+        assert(np.array_equal(engine.rule_or, [True, True, True]))
+        assert(np.array_equal(engine.weights, [1, 1, 1]))
+        rule = engine.rules[1]
+        self.assertEqual(rule.antecedent, (('service', 'good'),))
+        self.assertEqual(rule.consequent, (('tip', 'average'),))
+        spec = engine.as_dict()
+        self.assertEqual(spec[RULES][2][ANTECEDENT][VARIABLES],
+                         [{NAME: 'service', LEVEL: 'excellent'},
+                          {NAME: 'food', LEVEL: 'delicious'}])
+        self.data[RULES][0][ANTECEDENT][OPERATOR] = 'xor'
+        with pytest.raises(ValueError):
+            CompiledEngine(self.data)
+
+    def test_compiled_engine_infer(self):
+        engine = CompiledEngine(self.data)
+        actual = engine.infer({'service': 3, 'food': 8})
+        self.assertEqual(actual, {'tip': 13.348484848484848})
+
+    def test_compiled_engine_reuse(self):
+        for aggregation in [OR, SUM, AVERAGE]:
+            self.data[AGGREGATION] = aggregation
+            engine = CompiledEngine(self.data)
+            for service in [0, 2.5, 3, 7.25, 10]:
+                for food in [0, 1, 4.5, 8, 10]:
+                    inputs = {'service': service, 'food': food}
+                    expect = run_engine(self.data, inputs)
+                    self.assertEqual(engine.infer(inputs), expect)
+
+    def test_compiled_engine_rule_index(self):
+        engine = CompiledEngine(self.data)
+        assert(np.array_equal(engine.rule_index[('service', 'poor')], [0]))
+        assert(np.array_equal(engine.rule_index[('food', 'delicious')], [2]))
+        assert(np.array_equal(engine.var_rules['service'], [0, 1, 2]))
+        assert(np.array_equal(engine.var_rules['food'], [0, 2]))
+        fuzzy_values = engine.fuzzify_inputs({'service': 0, 'food': 10})
+        active = engine.get_active_rules(fuzzy_values)
+        assert(np.array_equal(active, [True, False, True]))
+        fuzzy_values = engine.fuzzify_inputs({'service': 5, 'food': None})
+        active = engine.get_active_rules(fuzzy_values)
+        assert(np.array_equal(active, [False, True, False]))
+        evaluable = engine.get_evaluable_rules({'service': 5, 'food': None})
+        assert(np.array_equal(evaluable, [False, True, False]))
+
+    def test_compiled_engine_missing_values(self):
+        engine = CompiledEngine(self.data)
+        with pytest.raises(ValueError) as excinfo:
+            engine.infer({'service': 3})
+        self.assertEqual(str(excinfo.value), '"food" has no value')
+        with pytest.raises(ValueError) as excinfo:
+            engine.infer({'service': 3, 'food': 8, 'ambience': 1})
+        self.assertEqual(str(excinfo.value), '"ambience" not found')
+        with pytest.raises(ValueError) as excinfo:
+            engine.infer({'service': 3, 'food': 11})
+        self.assertEqual(str(excinfo.value), '11 out of range')
+        for missing_values in [False, True]:
+            engine = CompiledEngine(self.data, missing_values=missing_values)
+            with pytest.raises(ValueError) as excinfo:
+                engine.infer({'service': 3, 'food': np.nan})
+            self.assertEqual(str(excinfo.value), 'nan is not a number')
+        engine = CompiledEngine(self.data, missing_values=True)
+        data = copy.deepcopy(self.data)
+        data[VARIABLES][1][VALUE] = None
+        expect = FuzzyInferenceEngine(data, missing_values=True)
+        expect.run()
+        actual = engine.infer({'service': 3})
+        self.assertEqual(actual['tip'], expect.get_variable_value('tip'))
+
+    def test_compiled_engine_infer_batch(self):
+        service, food = np.meshgrid(np.linspace(0, 10, 41),
+                                    np.linspace(0, 10, 37))
+        inputs = {'service': service.ravel(), 'food': food.ravel()}
+        for aggregation in [OR, SUM, AVERAGE]:
+            self.data[AGGREGATION] = aggregation
+            engine = CompiledEngine(self.data)
+            actual = engine.infer_batch(inputs)
+            self.assertEqual(list(actual.keys()), ['tip'])
+            self.assertEqual(actual['tip'].shape, (41 * 37,))
+            for i in range(0, 41 * 37, 97):
+                expect = engine.infer({'service': inputs['service'][i],
+                                       'food': inputs['food'][i]})
+                assert(np.isclose(actual['tip'][i], expect['tip']))
+
+    def test_compiled_engine_infer_batch_missing_values(self):
+        # the first rule references food only, the second service only
+        self.data[RULES][0][ANTECEDENT][VARIABLES].pop(0)
+        rng = np.random.RandomState(0)
+        # values where the rules left fire
+        inputs = {'service': rng.uniform(0.1, 9.9, 60),
+                  'food': rng.uniform(0, 4.9, 60)}
+        inputs['service'][::3] = np.nan
+        inputs['food'][::4] = np.nan
+        for aggregation in [OR, SUM, AVERAGE]:
+            self.data[AGGREGATION] = aggregation
+            engine = CompiledEngine(self.data, missing_values=True)
+            actual = engine.infer_batch(inputs)['tip']
+            for i in range(60):
+                values = {varname: None if np.isnan(values[i])
+                          else values[i] for varname, values in inputs.items()}
+                expect = engine.infer(values)['tip']
+                if np.isnan(expect):
+                    self.assertEqual(list(values.values()), [None, None])
+                    assert(np.isnan(actual[i]))
+                else:
+                    assert(np.isclose(actual[i], expect, rtol=0, atol=1e-12))
+            state = IncrementalEngine(engine, {'service': 3, 'food': 2})
+            state.update(service=None, food=None)
+            assert(np.isnan(state.outputs()['tip']))
+
+    def test_compiled_engine_nothing_fires(self):
+        # poor and rancid, or excellent and delicious: nothing fires for
+        # service 5 or food 5, and every engine gives nan
+        del self.data[RULES][1]
+        for rule in self.data[RULES]:
+            rule[ANTECEDENT][OPERATOR] = AND
+        inputs = {'service': np.array([5, 5, 5, 0, 10, 2, 7.5]),
+                  'food': np.array([0, 5, 10, 5, 5, 1, 9])}
+        for aggregation in [OR, SUM, AVERAGE]:
+            for defuzzification in [CENTROID, BISECTOR, MOM, SOM, LOM,
+                                    EXACT_CENTROID]:
+                self.data[AGGREGATION] = aggregation
+                self.data[DEFUZZIFICATION] = defuzzification
+                engine = CompiledEngine(self.data)
+                shared = FuzzyInferenceEngine(self.data)
+                actual = engine.infer_batch(inputs)['tip']
+                assert(np.isnan(actual[:5]).all())
+                assert(not np.isnan(actual[5:]).any())
+                state = IncrementalEngine(engine, {'service': 2, 'food': 1})
+                for i in range(len(actual)):
+                    values = {varname: values[i]
+                              for varname, values in inputs.items()}
+                    expect = run_engine(self.data, values)['tip']
+                    np.testing.assert_equal(shared.infer(values)['tip'],
+                                            expect)
+                    np.testing.assert_equal(engine.infer(values)['tip'],
+                                            expect)
+                    state.update(**values)
+                    np.testing.assert_equal(state.outputs()['tip'], expect)
+                    np.testing.assert_allclose(actual[i], expect, rtol=0,
+                                               atol=1e-12)
+
+    def test_compiled_engine_infer_batch_memory(self):
+        self.data[RULES] = self.data[RULES] * 100
+        engine = CompiledEngine(self.data)
+        rng = np.random.RandomState(0)
+        peaks = []
+        for n in [10000, 40000]:
+            inputs = {'service': rng.uniform(0, 10, n),
+                      'food': rng.uniform(0, 10, n)}
+            tracemalloc.start()
+            try:
+                engine.infer_batch(inputs)
+                peaks.append(tracemalloc.get_traced_memory()[1])
+            finally:
+                tracemalloc.stop()
+        # rows x rules arrays are chunked: only the input copies and the
+        # outputs grow with the number of rows
+        assert(peaks[1] - peaks[0] < 30000 * 64)
+
+    def test_compiled_engine_infer_batch_errors(self):
+        engine = CompiledEngine(self.data)
+        with pytest.raises(ValueError) as excinfo:
+            engine.infer_batch({'service': [3, 4], 'food': [8, np.nan]})
+        self.assertEqual(str(excinfo.value), '"food" has no value')
+        with pytest.raises(ValueError) as excinfo:
+            engine.infer_batch({'service': [3, 4], 'food': [8, 10.5]})
+        self.assertEqual(str(excinfo.value), '10.5 out of range')
+        with pytest.raises(ValueError) as excinfo:
+            engine.infer_batch({'service': [3, 4], 'food': [8]})
+        self.assertEqual(str(excinfo.value), 'input arrays differ in length')
+
+    def test_compiled_engine_exact_centroid(self):
+        inputs = {'service': np.array([0, 1.7, 3, 5, 9.9]),
+                  'food': np.array([10, 2.2, 8, 5, 0.4])}
+        for aggregation in [OR, SUM, AVERAGE]:
+            self.data[AGGREGATION] = aggregation
+            tip = self.data[VARIABLES][2]
+            tip[X] = get_var_range(tip[MIN], tip[MAX], 20000).tolist()
+            expect = CompiledEngine(self.data).infer_batch(inputs)
+            self.data[DEFUZZIFICATION] = EXACT_CENTROID
+            engine = CompiledEngine(self.data)
+            actual = engine.infer_batch(inputs)
+            assert(np.allclose(actual['tip'], expect['tip'], atol=1e-6))
+            del tip[X]
+            engine = CompiledEngine(self.data)
+            actual = engine.infer_batch(inputs)
+            assert(np.allclose(actual['tip'], expect['tip'], atol=1e-6))
+            for i in range(len(inputs['food'])):
+                values = {'service': inputs['service'][i],
+                          'food': inputs['food'][i]}
+                self.assertEqual(engine.infer(values)['tip'],
+                                 actual['tip'][i])
+                self.assertEqual(run_engine(self.data, values)['tip'],
+                                 actual['tip'][i])
+            self.data[DEFUZZIFICATION] = 'centroid'
+
+    def test_compiled_engine_fuzzify_params(self):
+        engine = CompiledEngine(self.data)
+        self.assertEqual(list(engine.mfs), ['tip'])
+        fuzzy_values = engine.fuzzify_variable('service', 4.2)
+        assert(np.allclose(fuzzy_values, [0.16, 0.84, 0]))
+        # inputs are fuzzified from the mf params, so a coarse input range
+        # without the mf breakpoints gives the same results
+        inputs = {'service': np.array([0, 1.7, 4.2, 5, 9.9]),
+                  'food': np.array([10, 2.2, 8, 5, 0.4])}
+        expect = engine.infer_batch(inputs)
+        service = self.data[VARIABLES][0]
+        service[X] = get_var_range(service[MIN], service[MAX], 3).tolist()
+        engine = CompiledEngine(self.data)
+        self.assertEqual(engine.fuzzify_variable('service', 4.2),
+                         fuzzy_values)
+        actual = engine.infer_batch(inputs)
+        assert(np.array_equal(actual['tip'], expect['tip']))
+        values = {'service': 4.2, 'food': 8}
+        self.assertEqual(engine.infer(values)['tip'], actual['tip'][2])
+        self.assertEqual(run_engine(self.data, values)['tip'],
+                         actual['tip'][2])
+
+    def test_compiled_engine_save_load(self):
+        engine = CompiledEngine(self.data)
+        inputs = {'service': np.array([0, 1.7, 3, 5, 9.9]),
+                  'food': np.array([10, 2.2, 8, 5, 0.4])}
+        expect = engine.infer_batch(inputs)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            pathname = os.path.join(tmpdir, 'tip')
+            engine.save(pathname)
+            loaded = CompiledEngine.load(pathname)
+            assert(isinstance(loaded.weights, np.memmap))
+            self.assertEqual(loaded.inputs, engine.inputs)
+            self.assertEqual(loaded.rules, engine.rules)
+            self.assertEqual(loaded.as_dict(), engine.as_dict())
+            actual = loaded.infer_batch(inputs)
+            assert(np.array_equal(actual['tip'], expect['tip']))
+            values = {'service': 3, 'food': 8}
+            self.assertEqual(loaded.infer(values), engine.infer(values))
+            loaded = CompiledEngine.load(pathname, mmap_mode=None,
+                                         missing_values=True)
+            values = {'service': 3, 'food': None}
+            expect = CompiledEngine(self.data, missing_values=True)
+            self.assertEqual(loaded.infer(values), expect.infer(values))
+            header = os.path.join(pathname, 'engine.json')
+            with open(header) as fd:
+                data = json.load(fd)
+            data['format'] = 0
+            with open(header, 'w') as fd:
+                json.dump(data, fd)
+            with pytest.raises(ValueError) as excinfo:
+                CompiledEngine.load(pathname)
+            self.assertEqual(str(excinfo.value), '"{}" has format 0, '
+                             'expected {}'.format(pathname, FORMAT))
+
+    def test_compiled_engine_resave(self):
+        engine = CompiledEngine(self.data)
+        data = copy.deepcopy(self.data)
+        data[AGGREGATION] = SUM
+        other = CompiledEngine(data)
+        values = {'service': 3, 'food': 8}
+        save = np.save
+        calls = []
+
+        def interrupt(*args, **kwargs):
+            calls.append(args)
+            if len(calls) == 3:
+                raise KeyboardInterrupt
+            return save(*args, **kwargs)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            engine.save(tmpdir)
+            loaded = CompiledEngine.load(tmpdir)
+            with mock.patch('blfuzzy.compiled.np.save', interrupt):
+                self.assertRaises(KeyboardInterrupt, other.save, tmpdir)
+            # no header: the mix of old and new arrays is not loaded
+            with pytest.raises(ValueError) as excinfo:
+                CompiledEngine.load(tmpdir)
+            self.assertEqual(str(excinfo.value), '"{}" not found'.format(
+                    os.path.join(tmpdir, 'engine.json')))
+            # the arrays mapped before keep their contents
+            self.assertEqual(loaded.infer(values), engine.infer(values))
+            other.save(tmpdir)
+            self.assertEqual(CompiledEngine.load(tmpdir).infer(values),
+                             other.infer(values))
+            self.assertEqual([name for name in os.listdir(tmpdir)
+                              if name.endswith('.tmp')], [])
+
+    def tearDown(self):
+        self.fd.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,17 +1,21 @@
 import os
+import copy
 import yaml
+import tracemalloc
 import unittest
 import pytest
 import numpy as np
 import pprint
 from math import isclose
-from blfuzzy import FuzzyInferenceEngine
+from concurrent.futures import ThreadPoolExecutor
+from blfuzzy import FuzzyInferenceEngine, InferenceContext, ContextPool
 from blfuzzy.engine import Rule, Variable, Antecedent, Consequent
 from blfuzzy.constants import VALUE
 from blfuzzy.constants import VARIABLES, NAME, LEVEL, CENTROID
 from blfuzzy.constants import RULES, ANTECEDENT, CONSEQUENT
 from blfuzzy.constants import OPERATOR, IMPLICATION
 from blfuzzy.constants import AGGREGATION, DEFUZZIFICATION
+from blfuzzy.constants import EXACT_CENTROID, BISECTOR, X
 
 HERE = os.path.dirname(__file__)
 FILENAME = 'data.yaml'
@@ -20,6 +24,21 @@ PATHNAME = os.path.join(HERE, FILENAME)
 pp = pprint.PrettyPrinter(width=200, compact=True)
 
 
+def peak_bytes(fn):
+    """Measures the memory a call allocates at its peak, after a first call
+    that warms up buffers and caches.
+    :param fn: (function) function without arguments
+    :returns: (int) bytes
+    """
+    fn()
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
 class TestCases(unittest.TestCase):
 
     def setUp(self):
@@ -185,6 +204,98 @@ class TestCases(unittest.TestCase):
         pp.pprint(engine.as_dict())
         # assert(False)
 
+    def test_fuzzy_inference_engine_levels(self):
+        for aggregation in ['or', 'sum', 'average']:
+            self.data[AGGREGATION] = aggregation
+            for service in [0, 3, 7.25]:
+                for food in [0, 4.5, 8]:
+                    self.data[VARIABLES][0][VALUE] = service
+                    self.data[VARIABLES][1][VALUE] = food
+                    expect = FuzzyInferenceEngine(self.data)
+                    expect.run()
+                    engine = FuzzyInferenceEngine(self.data, keep_imfs=False)
+                    engine.run()
+                    self.assertEqual(engine.get_variable_value('tip'),
+                                     expect.get_variable_value('tip'))
+                    for rule in engine.rules:
+                        self.assertIsNone(rule.consequent.result['tip'])
+                    for rule in engine.as_dict()[RULES]:
+                        self.assertEqual(rule[CONSEQUENT]['result'],
+                                         {'tip': None})
+
+    def test_fuzzy_inference_engine_infer(self):
+        for defuzzification in [CENTROID, BISECTOR, EXACT_CENTROID]:
+            self.data[DEFUZZIFICATION] = defuzzification
+            for aggregation in ['or', 'sum', 'average']:
+                self.data[AGGREGATION] = aggregation
+                engine = FuzzyInferenceEngine(self.data)
+                context = InferenceContext(engine)
+                for service in [0, 3, 7.25]:
+                    for food in [0, 4.5, 8]:
+                        self.data[VARIABLES][0][VALUE] = service
+                        self.data[VARIABLES][1][VALUE] = food
+                        expect = FuzzyInferenceEngine(self.data)
+                        expect.run()
+                        actual = engine.infer({'service': service,
+                                               'food': food}, context)
+                        self.assertEqual(actual['tip'],
+                                         expect.get_variable_value('tip'))
+                # the engine is left as constructed
+                output = engine.get_output_variables()['tip']
+                self.assertIsNone(output.value)
+                self.assertIsNone(output.aggrmf)
+                for rule in engine.rules:
+                    self.assertIsNone(rule.antecedent.result)
+        with pytest.raises(ValueError) as excinfo:
+            engine.infer({'service': 3})
+        self.assertEqual(str(excinfo.value), '"food" has no value')
+        with pytest.raises(ValueError) as excinfo:
+            engine.infer({'service': 3, 'food': 8, 'ambience': 1})
+        self.assertEqual(str(excinfo.value), '"ambience" not found')
+        self.data[VARIABLES][1][VALUE] = None
+        expect = FuzzyInferenceEngine(self.data, missing_values=True)
+        expect.run()
+        engine = FuzzyInferenceEngine(self.data, missing_values=True)
+        self.assertEqual(engine.infer({'service': 3})['tip'],
+                         expect.get_variable_value('tip'))
+
+    def test_fuzzy_inference_engine_threads(self):
+        engine = FuzzyInferenceEngine(self.data)
+        pool = ContextPool(engine)
+        rng = np.random.RandomState(0)
+        rows = [{'service': service, 'food': food} for service, food
+                in rng.uniform(0, 10, (200, 2)).tolist()]
+        expect = [engine.infer(row) for row in rows]
+        with ThreadPoolExecutor(8) as executor:
+            actual = list(executor.map(pool.infer, rows))
+        self.assertEqual(actual, expect)
+        assert(1 <= len(pool.contexts) <= 8)
+        # a shared engine needs no input values
+        for variable in self.data[VARIABLES]:
+            variable[VALUE] = None
+        engine = FuzzyInferenceEngine(self.data)
+        self.assertEqual(ContextPool(engine).infer(rows[0]), expect[0])
+        with pytest.raises(ValueError) as excinfo:
+            engine.run()
+        self.assertEqual(str(excinfo.value), '"service" has no value')
+
+    def test_fuzzy_inference_engine_allocations(self):
+        x = np.linspace(0, 25, 2001)
+        self.data[VARIABLES][2][X] = x.tolist()
+        for aggregation in ['or', 'sum', 'average']:
+            self.data[AGGREGATION] = aggregation
+            peaks = []
+            for copies in [1, 100]:
+                data = copy.deepcopy(self.data)
+                data[RULES] = data[RULES] * copies
+                engine = FuzzyInferenceEngine(data)
+                context = InferenceContext(engine)
+                peaks.append(peak_bytes(lambda: engine.infer(
+                        {'service': 3, 'food': 8}, context)))
+            # a few range-sized arrays, whatever the number of rules
+            assert(peaks[0] < 8 * x.nbytes)
+            assert(peaks[1] - peaks[0] < x.nbytes)
+
     def tearDown(self):
         self.fd.close()
 
@@ -1,7 +1,16 @@
+import os
+import tempfile
 import unittest
+import pytest
 import numpy as np
-from blfuzzy.helper import aggregate
-from blfuzzy.constants import OR, AVERAGE
+import pandas as pd
+from blfuzzy.helper import aggregate, aggregate_levels
+from blfuzzy.helper import get_rules_from_csv, get_variables_from_csv
+from blfuzzy.helper import get_rules_from_frame
+from blfuzzy.helper import get_antecedent_from_row, get_consequent_from_row
+from blfuzzy.constants import OR, SUM, AVERAGE, AND, MIN
+from blfuzzy.constants import NAME, LEVEL, LEVELS, VALUE, WEIGHT, VARIABLES
+from blfuzzy.constants import ANTECEDENT, CONSEQUENT, OPERATOR, IMPLICATION
 
 
 class TestCases(unittest.TestCase):
@@ -34,6 +43,79 @@ class TestCases(unittest.TestCase):
         actual = aggregate([a], method=OR)
         assert(np.allclose(actual, expect))
 
+    def test_aggregate_levels(self):
+        rng = np.random.RandomState(0)
+        mfs = rng.uniform(0, 1, (3, 11))
+        levels = np.array([0, 2, 2, 1, 0, 2])
+        strengths = rng.uniform(0, 1, (4, len(levels)))
+        for method in [OR, SUM, AVERAGE]:
+            for row in strengths:
+                imfs = [np.fmin(mfs[level], strength)
+                        for level, strength in zip(levels, row)]
+                expect = aggregate(imfs, method=method)
+                actual = aggregate_levels(mfs, levels, row, method)
+                assert(np.array_equal(actual, expect))
+            rows = aggregate_levels(mfs, levels, strengths, method)
+            assert(np.array_equal(rows[-1], actual))
+
+    def test_get_rules_from_csv(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            pathname = os.path.join(tmpdir, 'rules.csv')
+            with open(pathname, 'w') as fd:
+                fd.write('service,food,tip,comment\n'
+                         'L,L,L,x\n'
+                         'M,,M,\n'
+                         'H,H,H,x\n')
+            rules = get_rules_from_csv(pathname, 2, 1)
+            self.assertEqual(len(rules), 3)
+            self.assertEqual(rules[1], {
+                    WEIGHT: 1,
+                    ANTECEDENT: {OPERATOR: AND, VARIABLES: [
+                        {NAME: 'service', LEVEL: 'medium'}]},
+                    CONSEQUENT: {IMPLICATION: MIN, VARIABLES: [
+                        {NAME: 'tip', LEVEL: 'medium'}]}})
+            self.assertEqual(rules[2][ANTECEDENT][VARIABLES], [
+                    {NAME: 'service', LEVEL: 'high'},
+                    {NAME: 'food', LEVEL: 'high'}])
+            with open(pathname, 'w') as fd:
+                fd.write('service,food,tip\nL,X,L\n')
+            with pytest.raises(ValueError) as excinfo:
+                get_rules_from_csv(pathname, 2, 1)
+            self.assertEqual(str(excinfo.value), '"X" is not a level code')
+            with open(pathname, 'w') as fd:
+                fd.write('service,food,tip\nL,L,\n')
+            with pytest.raises(ValueError) as excinfo:
+                get_rules_from_csv(pathname, 2, 1)
+            self.assertEqual(str(excinfo.value), '"tip" has no level')
+
+    def test_get_rule_from_row(self):
+        df = pd.DataFrame({'service': ['L', 'M'], 'food': ['L', np.nan],
+                           'tip': ['L', 'M']})
+        expect = get_rules_from_frame(df, 2, 1)
+        for i in range(2):
+            with pytest.warns(DeprecationWarning):
+                antecedent = get_antecedent_from_row(df, i,
+                                                     ['service', 'food'])
+            with pytest.warns(DeprecationWarning):
+                consequent = get_consequent_from_row(df, i, ['tip'])
+            self.assertEqual(antecedent, expect[i][ANTECEDENT])
+            self.assertEqual(consequent, expect[i][CONSEQUENT])
+
+    def test_get_variables_from_csv(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            pathname = os.path.join(tmpdir, 'variables.csv')
+            with open(pathname, 'w') as fd:
+                fd.write('name,min,max,value,levels\n'
+                         'service,0,10,3,LMH\n'
+                         'tip,0,25,,LH\n')
+            variables = get_variables_from_csv(pathname)
+        self.assertEqual([variable[NAME] for variable in variables],
+                         ['service', 'tip'])
+        self.assertEqual(variables[0][VALUE], 3)
+        self.assertIsNone(variables[1][VALUE])
+        self.assertEqual([level[NAME] for level in variables[1][LEVELS]],
+                         ['low', 'high'])
+
 
 if __name__ == '__main__':
     unittest.main()
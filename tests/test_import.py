@@ -0,0 +1,52 @@
+import sys
+import unittest
+import subprocess
+
+# import time of blfuzzy's own modules, excluding numpy (seconds)
+IMPORT_BUDGET = 0.1
+# slow to import, and only needed by some uses of the package
+LAZY_MODULES = ['skfuzzy', 'scipy', 'pandas', 'matplotlib', 'multiprocessing']
+
+
+def get_import_times(statement):
+    """Runs an import statement in a new interpreter with -X importtime.
+    :param statement: (str) Python statement
+    :returns: (dict) module name (str) -> cumulative import time (float),
+              in seconds
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c',
+                             statement], stderr=subprocess.PIPE,
+                            universal_newlines=True, check=True)
+    ret = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        fields = line[len('import time:'):].split('|')
+        ret[fields[2].strip()] = int(fields[1]) / 1e6
+    return ret
+
+
+class TestCases(unittest.TestCase):
+
+    def test_import_time(self):
+        times = get_import_times('import blfuzzy')
+        for name in LAZY_MODULES:
+            self.assertNotIn(name, times)
+        own = times['blfuzzy'] - times.get('numpy', 0.0)
+        self.assertLess(own, IMPORT_BUDGET)
+
+    def test_lazy_imports(self):
+        statement = ('import sys, blfuzzy; '
+                     'blfuzzy.WorkerPool; '
+                     'blfuzzy.lazy.pandas.DataFrame; '
+                     'assert "pandas" in sys.modules; '
+                     'assert "multiprocessing" in sys.modules')
+        subprocess.run([sys.executable, '-c', statement], check=True)
+        import blfuzzy
+        with self.assertRaises(AttributeError):
+            blfuzzy.NoSuchName
+        self.assertIn('Surface', dir(blfuzzy))
+
+
+if __name__ == '__main__':
+    unittest.main()
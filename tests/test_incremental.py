@@ -0,0 +1,106 @@
+import os
+import yaml
+import unittest
+import pytest
+import numpy as np
+from blfuzzy import CompiledEngine, IncrementalEngine
+from blfuzzy.constants import AGGREGATION, DEFUZZIFICATION
+from blfuzzy.constants import RULES, ANTECEDENT, VARIABLES
+from blfuzzy.constants import OR, SUM, AVERAGE, CENTROID, EXACT_CENTROID
+
+HERE = os.path.dirname(__file__)
+FILENAME = 'data.yaml'
+PATHNAME = os.path.join(HERE, FILENAME)
+
+
+class TestCases(unittest.TestCase):
+
+    def setUp(self):
+        with open(PATHNAME, 'r') as self.fd:
+            self.data = yaml.load(self.fd)
+
+    def test_incremental_updates(self):
+        rng = np.random.RandomState(0)
+        for aggregation in [OR, SUM, AVERAGE]:
+            for defuzzification in [CENTROID, EXACT_CENTROID]:
+                self.data[AGGREGATION] = aggregation
+                self.data[DEFUZZIFICATION] = defuzzification
+                engine = CompiledEngine(self.data)
+                inputs = {'service': 3.0, 'food': 8.0}
+                incremental = IncrementalEngine(engine, inputs)
+                self.assertEqual(incremental.outputs(), engine.infer(inputs))
+                for i in range(30):
+                    varname = ['service', 'food'][rng.randint(2)]
+                    inputs[varname] = float(rng.randint(0, 41)) / 4
+                    incremental.update(**{varname: inputs[varname]})
+                    self.assertEqual(incremental.outputs(),
+                                     engine.infer(inputs))
+
+    def test_incremental_rules_touched(self):
+        engine = CompiledEngine(self.data)
+        incremental = IncrementalEngine(engine, {'service': 3, 'food': 8})
+        self.assertEqual(incremental.update(service=3), 0)
+        # food 8 -> 9 leaves rancid at zero and changes delicious (rule 2)
+        self.assertEqual(incremental.update(food=9), 1)
+        self.assertEqual(incremental.outputs(),
+                         engine.infer({'service': 3, 'food': 9}))
+
+    def test_incremental_missing_values(self):
+        engine = CompiledEngine(self.data, missing_values=True)
+        incremental = IncrementalEngine(engine, {'service': 3, 'food': 8})
+        incremental.update(food=None)
+        self.assertEqual(incremental.outputs(),
+                         engine.infer({'service': 3}))
+        incremental.update(food=2)
+        self.assertEqual(incremental.outputs(),
+                         engine.infer({'service': 3, 'food': 2}))
+        with pytest.raises(ValueError) as excinfo:
+            incremental.update(drinks=1)
+        self.assertEqual(str(excinfo.value), '"drinks" not found')
+        engine = CompiledEngine(self.data)
+        incremental = IncrementalEngine(engine, {'service': 3, 'food': 8})
+        with pytest.raises(ValueError) as excinfo:
+            incremental.update(food=None)
+        self.assertEqual(str(excinfo.value), '"food" has no value')
+
+    def test_incremental_invalid_update(self):
+        engine = CompiledEngine(self.data)
+        incremental = IncrementalEngine(engine, {'service': 3, 'food': 8})
+        expect = incremental.outputs()
+        for values in [{'food': 2, 'service': 11}, {'food': 2, 'drinks': 1},
+                       {'food': 2, 'service': None}]:
+            self.assertRaises(ValueError, incremental.update, **values)
+            self.assertEqual(incremental.values, {'service': 3, 'food': 8})
+            self.assertEqual(incremental.outputs(), expect)
+        incremental.update(food=2)
+        self.assertEqual(incremental.outputs(),
+                         engine.infer({'service': 3, 'food': 2}))
+
+    def test_incremental_missing_updates(self):
+        # food is only in the first rule, which does not fire for food
+        # above 5: it stops being evaluable without its strength changing,
+        # and the average is taken over fewer rules
+        self.data[RULES][0][ANTECEDENT][VARIABLES].pop(0)
+        self.data[RULES][2][ANTECEDENT][VARIABLES].pop(1)
+        for aggregation in [OR, SUM, AVERAGE]:
+            self.data[AGGREGATION] = aggregation
+            engine = CompiledEngine(self.data, missing_values=True)
+            for service in np.linspace(0, 10, 21).tolist():
+                for food in [6.0, 8.0, 10.0]:
+                    incremental = IncrementalEngine(
+                            engine, {'service': service, 'food': food})
+                    incremental.outputs()
+                    incremental.update(food=None)
+                    np.testing.assert_equal(incremental.outputs(),
+                                            engine.infer({'service': service}))
+                    incremental.update(food=food)
+                    np.testing.assert_equal(
+                            incremental.outputs(),
+                            engine.infer({'service': service, 'food': food}))
+
+    def tearDown(self):
+        self.fd.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+import unittest
+import pytest
+import numpy as np
+import skfuzzy as fuzz
+from blfuzzy import kernels
+from blfuzzy.helper import get_mf
+from blfuzzy.constants import NAME, MF_TYPE, MF_PARAMS
+from blfuzzy.constants import TRIANGLE, TRAPEZOID, GAUSSIAN, SIGMOID
+from blfuzzy.constants import CENTROID, BISECTOR, MOM, SOM, LOM
+
+METHODS = [CENTROID, BISECTOR, MOM, SOM, LOM]
+
+
+def make_mfs(rng, rows, n):
+    """Random aggregated-like membership functions: clipped, with plateaus
+    and zero runs.
+    :param rng: (RandomState) random numbers
+    :param rows: (int) number of membership functions
+    :param n: (int) number of points of the range
+    :returns: (ndarray) 2d array of membership functions, one per row
+    """
+    mfs = np.round(rng.rand(rows, n), 1)
+    return np.fmin(mfs, rng.rand(rows, 1))
+
+
+class TestCases(unittest.TestCase):
+
+    def test_membership_functions(self):
+        x = np.linspace(-2, 12, 141)
+        for params in [[0, 5, 10], [0, 0, 10], [0, 10, 10], [5, 5, 5],
+                       [-1.3, 2.7, 8.1]]:
+            expect = fuzz.trimf(x, params)
+            actual = kernels.membership(TRIANGLE, x, params)
+            assert(np.array_equal(actual, expect))
+        for params in [[0, 2, 6, 10], [0, 0, 6, 10], [0, 2, 10, 10],
+                       [3, 3, 3, 3], [-1.3, 2.7, 2.7, 8.1]]:
+            expect = fuzz.trapmf(x, params)
+            actual = kernels.membership(TRAPEZOID, x, params)
+            assert(np.array_equal(actual, expect))
+        for mean, sigma in [(5, 1), (0, 2.5), (11.3, 0.1)]:
+            expect = fuzz.gaussmf(x, mean, sigma)
+            actual = kernels.membership(GAUSSIAN, x, [mean, sigma])
+            assert(np.array_equal(actual, expect))
+        for b, c in [(5, 1), (2, -3), (7.7, 0.4)]:
+            expect = fuzz.sigmf(x, b, c)
+            actual = kernels.membership(SIGMOID, x, [b, c])
+            assert(np.array_equal(actual, expect))
+
+    def test_membership_points(self):
+        # one row of params per level, evaluated at one point each
+        params = np.array([[0, 0, 5], [0, 5, 10], [5, 10, 10]])
+        actual = kernels.triangle(np.array([[2.5], [7.5]]), params)
+        assert(np.array_equal(actual, [[0.5, 0.5, 0], [0, 0.5, 0.5]]))
+        with pytest.raises(ValueError) as excinfo:
+            kernels.membership('square', np.array([1.0]), [0, 1])
+        self.assertEqual(str(excinfo.value), '"square" is not an mf type')
+
+    def test_get_mf(self):
+        x = np.linspace(0, 10, 11)
+        level = {NAME: 'mid', MF_TYPE: TRAPEZOID, MF_PARAMS: [2, 4, 6, 8]}
+        assert(np.array_equal(get_mf(x, 3, level, 1),
+                              fuzz.trapmf(x, [2, 4, 6, 8])))
+        level = {NAME: 'mid', MF_TYPE: None, MF_PARAMS: None}
+        assert(np.array_equal(get_mf(x, 3, level, 1),
+                              fuzz.trimf(x, [0, 5, 10])))
+
+    def test_defuzz(self):
+        rng = np.random.RandomState(0)
+        x = np.linspace(0, 25, 51)
+        mfs = make_mfs(rng, 200, len(x))
+        for method in METHODS:
+            expect = [fuzz.defuzz(x, mf, method) for mf in mfs]
+            actual = [kernels.defuzz_mf(x, mf, method) for mf in mfs]
+            self.assertEqual(actual, expect)
+            actual = kernels.defuzz(x, mfs, method)
+            assert(np.allclose(actual, expect))
+
+    def test_defuzz_exact(self):
+        rng = np.random.RandomState(1)
+        x = np.linspace(-5, 5, 101)
+        # without zero runs inside, where skfuzzy's bisector loses area
+        mfs = np.round(rng.rand(100, len(x)), 2) + 0.01
+        for method in [CENTROID, BISECTOR]:
+            expect = [fuzz.defuzz(x, mf, method) for mf in mfs]
+            actual = [kernels.defuzz_mf(x, mf, method) for mf in mfs]
+            self.assertEqual(actual, expect)
+        expect = [fuzz.defuzz(x, mf, BISECTOR) for mf in mfs]
+        actual = kernels.defuzz(x, mfs, BISECTOR).tolist()
+        self.assertEqual(actual, expect)
+
+    def test_defuzz_empty(self):
+        x = np.linspace(0, 10, 11)
+        mfs = np.zeros((2, len(x)))
+        mfs[1, 3] = 0.5
+        for method in METHODS:
+            actual = kernels.defuzz(x, mfs, method)
+            assert(np.isnan(actual[0]))
+            self.assertEqual(actual[1], 3.0)
+        for method in [CENTROID, BISECTOR]:
+            with pytest.raises(kernels.EmptyMembershipError):
+                kernels.defuzz_mf(x, mfs[0], method)
+        self.assertEqual(kernels.defuzz_mf(x, mfs[0], MOM), 5.0)
+        method = 'rubbish'
+        for fn in [kernels.defuzz, kernels.defuzz_mf]:
+            with pytest.raises(ValueError) as excinfo:
+                fn(x, mfs[1], method)
+            msg = 'The input for `mode`, {}, was incorrect.'.format(method)
+            self.assertEqual(str(excinfo.value), msg)
+
+
+if __name__ == '__main__':
+    unittest.main()
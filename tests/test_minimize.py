@@ -0,0 +1,171 @@
+import copy
+import tempfile
+import unittest
+import numpy as np
+from blfuzzy import FuzzyInferenceEngine, CompiledEngine, minimize_rules
+from blfuzzy.constants import NAME, MIN, MAX, VALUE, LEVELS, LEVEL, WEIGHT
+from blfuzzy.constants import VARIABLES, RULES, AGGREGATION, DEFUZZIFICATION
+from blfuzzy.constants import OPERATOR, IMPLICATION, ANTECEDENT, CONSEQUENT
+from blfuzzy.constants import MF_TYPE, MF_PARAMS, TRAPEZOID
+from blfuzzy.constants import AND, OR, SUM, AVERAGE, CENTROID, MOM
+from blfuzzy.constants import EXACT_CENTROID
+
+LEVEL_NAMES = ['low', 'medium', 'high']
+# trapezoids whose cores, [0, 6] and [4, 10], cover the range: one of them
+# is 1 everywhere, so a variable of these levels can be merged out
+COVERING = [{NAME: 'low', MF_TYPE: TRAPEZOID, MF_PARAMS: [0, 0, 6, 8]},
+            {NAME: 'high', MF_TYPE: TRAPEZOID, MF_PARAMS: [2, 4, 10, 10]}]
+
+
+def make_spec(rules, aggregation=OR, defuzzification=CENTROID):
+    """Inputs a and b have covering trapezoid levels, input c and output out
+    default triangles.
+    :param rules: (list) of (weight, operator, antecedent (list of
+                  (variable name, level name)), output level name)
+    :returns: (dict) specification of system
+    """
+    variables = [{NAME: varname, MIN: 0, MAX: 10, VALUE: None,
+                  LEVELS: copy.deepcopy(COVERING)} for varname in 'ab']
+    variables += [{NAME: varname, MIN: 0, MAX: 10, VALUE: None,
+                   LEVELS: [{NAME: level} for level in LEVEL_NAMES]}
+                  for varname in ['c', 'out']]
+    return {VARIABLES: variables,
+            RULES: [{WEIGHT: weight,
+                     ANTECEDENT: {OPERATOR: operator,
+                                  VARIABLES: [{NAME: varname, LEVEL: level}
+                                              for varname, level in operands]},
+                     CONSEQUENT: {IMPLICATION: MIN,
+                                  VARIABLES: [{NAME: 'out', LEVEL: output}]}}
+                    for weight, operator, operands, output in rules],
+            AGGREGATION: aggregation,
+            DEFUZZIFICATION: defuzzification}
+
+
+def make_random_rules(rng, n):
+    """Rules over random operands, with duplicates and cartesian products of
+    the levels of a and b.
+    :param rng: (RandomState) random numbers
+    :param n: (int) number of random rules
+    :returns: (list) of rules, as make_spec() takes them
+    """
+    levels = {'a': ['low', 'high'], 'b': ['low', 'high'], 'c': LEVEL_NAMES}
+    ret = []
+    for i in range(n):
+        varnames = [['a', 'b', 'c'][k]
+                    for k in rng.permutation(3)[:rng.randint(1, 4)]]
+        operands = [(varname, levels[varname][rng.randint(
+                        len(levels[varname]))]) for varname in varnames]
+        ret.append((float(rng.choice([0, 0.5, 1])),
+                    AND if rng.randint(4) else OR, operands,
+                    LEVEL_NAMES[rng.randint(3)]))
+    for i in range(n // 4):
+        weight, operator, operands, output = ret[rng.randint(n)]
+        operands = [(varname, level) for varname, level in operands
+                    if varname != 'b']
+        for level in levels['b']:
+            ret.append((weight, AND, operands + [('b', level)], output))
+    for i in range(n // 4):
+        weight, operator, operands, output = ret[rng.randint(len(ret))]
+        ret.append((weight, operator, operands[::-1], output))
+    return [ret[i] for i in rng.permutation(len(ret))]
+
+
+class TestCases(unittest.TestCase):
+
+    def setUp(self):
+        self.rules = [
+            (1, AND, [('a', 'low'), ('b', 'low')], 'low'),
+            (1, AND, [('a', 'low'), ('b', 'high')], 'low'),
+            (0.5, AND, [('b', 'high'), ('a', 'low')], 'low'),
+            (1, AND, [('c', 'low'), ('a', 'high')], 'high'),
+            (1, AND, [('c', 'medium'), ('a', 'high')], 'high'),
+            (1, AND, [('c', 'high'), ('a', 'high')], 'high'),
+            (0, AND, [('a', 'high')], 'medium')]
+
+    def test_minimize_rules(self):
+        data, counts = minimize_rules(make_spec(self.rules))
+        self.assertEqual(counts, {'before': 7, 'zero_weight': 1,
+                                  'duplicates': 1, 'merged': 1, 'after': 4})
+        rule = data[RULES][0]
+        self.assertEqual(rule[WEIGHT], 1)
+        self.assertEqual(rule[ANTECEDENT][VARIABLES],
+                         [{NAME: 'a', LEVEL: 'low'}])
+        # triangles are 1 only at their peaks: c is not merged out
+        self.assertEqual([len(rule[ANTECEDENT][VARIABLES])
+                          for rule in data[RULES][1:]], [2, 2, 2])
+        data, counts = minimize_rules(make_spec(self.rules), True)
+        self.assertEqual((counts['zero_weight'], counts['duplicates'],
+                          counts['merged']), (0, 1, 0))
+        data, counts = minimize_rules(make_spec(self.rules, SUM))
+        self.assertEqual(counts['after'], 6)
+        data, counts = minimize_rules(make_spec(self.rules, AVERAGE))
+        self.assertEqual(counts['after'], 7)
+        rules = [(0, AND, [('a', 'low')], 'low')] * 2
+        data, counts = minimize_rules(make_spec(rules))
+        self.assertEqual(len(data[RULES]), 1)  # the output keeps a rule
+
+    def test_minimized_engine(self):
+        engine = CompiledEngine(make_spec(self.rules), minimize=True)
+        self.assertEqual(engine.inputs, ['a', 'b', 'c'])
+        self.assertEqual(len(engine.weights), 4)
+        self.assertEqual(engine.minimized['after'], 4)
+        self.assertEqual(engine.infer({'a': 3, 'b': 5, 'c': 1}),
+                         CompiledEngine(make_spec(self.rules)).infer(
+                             {'a': 3, 'b': 5, 'c': 1}))
+        self.assertEqual(CompiledEngine(make_spec(self.rules)).minimized,
+                         None)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            engine.save(tmpdir)
+            self.assertEqual(CompiledEngine.load(tmpdir).minimized,
+                             engine.minimized)
+            self.assertRaises(ValueError, CompiledEngine.load, tmpdir,
+                              missing_values=True)
+
+    def test_minimized_outputs(self):
+        # random rule bases and inputs: minimized and given rules agree
+        rng = np.random.RandomState(0)
+        for seed in range(4):
+            rules = make_random_rules(rng, 40)
+            for aggregation in [OR, SUM, AVERAGE]:
+                for defuzzification in [CENTROID, MOM, EXACT_CENTROID]:
+                    data = make_spec(rules, aggregation, defuzzification)
+                    for missing_values in [False, True]:
+                        self.check_outputs(data, missing_values, rng)
+
+    def check_outputs(self, data, missing_values, rng):
+        """Compares the outputs of the given and minimized rules.
+        :param data: (dict) specification of system
+        :param missing_values: (boolean) compute with missing values
+        :param rng: (RandomState) random numbers
+        """
+        engine = CompiledEngine(data, missing_values)
+        minimized = CompiledEngine(data, missing_values, minimize=True)
+        self.assertTrue(len(minimized.weights) <= len(engine.weights))
+        inputs = {varname: rng.uniform(0, 10, 300)
+                  for varname in engine.inputs}
+        for varname in inputs:
+            # values at the level breakpoints
+            inputs[varname][:10] = [0, 2, 4, 5, 6, 8, 10, 0, 5, 10]
+            if missing_values:
+                inputs[varname][rng.randint(300, size=60)] = np.nan
+        expect = engine.infer_batch(inputs)['out']
+        result = minimized.infer_batch(inputs)['out']
+        if (data[AGGREGATION] == SUM and
+                data[DEFUZZIFICATION] == EXACT_CENTROID):
+            # zero-weight rules add breakpoints to the integration
+            np.testing.assert_allclose(result, expect, rtol=1e-12)
+        else:
+            np.testing.assert_array_equal(result, expect)
+        if missing_values or data[DEFUZZIFICATION] == EXACT_CENTROID:
+            return
+        for i in range(0, 300, 60):
+            expect = []
+            for spec in [data, minimize_rules(data)[0]]:
+                spec = copy.deepcopy(spec)
+                for variable in spec[VARIABLES]:
+                    if variable[NAME] in inputs:
+                        variable[VALUE] = inputs[variable[NAME]][i]
+                fie = FuzzyInferenceEngine(spec)
+                fie.run()
+                expect.append(fie.get_variable_value('out'))
+            self.assertEqual(expect[0], expect[1])
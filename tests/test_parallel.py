@@ -0,0 +1,47 @@
+import os
+import yaml
+import unittest
+import numpy as np
+from blfuzzy import CompiledEngine, WorkerPool
+from blfuzzy.constants import AGGREGATION, SUM
+
+HERE = os.path.dirname(__file__)
+FILENAME = 'data.yaml'
+PATHNAME = os.path.join(HERE, FILENAME)
+
+
+class TestCases(unittest.TestCase):
+
+    def setUp(self):
+        with open(PATHNAME, 'r') as self.fd:
+            self.data = yaml.load(self.fd)
+        rng = np.random.RandomState(0)
+        self.inputs = {'service': rng.uniform(0, 10, 1000),
+                       'food': rng.uniform(0, 10, 1000)}
+
+    def test_worker_pool(self):
+        self.data[AGGREGATION] = SUM
+        engine = CompiledEngine(self.data)
+        expect = engine.infer_batch(self.inputs)
+        with WorkerPool(engine, 2, chunksize=128) as pool:
+            for i in range(2):
+                actual = engine.infer_batch(self.inputs, parallel=pool)
+                assert(np.array_equal(actual['tip'], expect['tip']))
+            with self.assertRaises(ValueError):
+                CompiledEngine(self.data).infer_batch(self.inputs,
+                                                      parallel=pool)
+
+    def test_parallel_workers(self):
+        engine = CompiledEngine(self.data)
+        expect = engine.infer_batch(self.inputs)
+        actual = engine.infer_batch(self.inputs, parallel=2)
+        assert(np.array_equal(actual['tip'], expect['tip']))
+        with self.assertRaises(ValueError):
+            engine.infer_batch(self.inputs, parallel=0)
+
+    def tearDown(self):
+        self.fd.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+import os
+import yaml
+import unittest
+import numpy as np
+from blfuzzy import CompiledEngine, Pipeline
+from blfuzzy.constants import NAME, MIN, MAX, VALUE, LEVELS, LEVEL, WEIGHT
+from blfuzzy.constants import VARIABLES, RULES, AGGREGATION, DEFUZZIFICATION
+from blfuzzy.constants import OPERATOR, IMPLICATION, ANTECEDENT, CONSEQUENT
+from blfuzzy.constants import AND, OR, CENTROID
+
+HERE = os.path.dirname(__file__)
+FILENAME = 'data.yaml'
+PATHNAME = os.path.join(HERE, FILENAME)
+
+
+def make_stage(inputs, output, xmax=1.0):
+    """Rule base of two rules: all inputs low -> output low, all inputs
+    high -> output high.
+    :param inputs: (dict) input variable name (str) -> range max (float)
+    :param output: (str) output variable name
+    :param xmax: (float) output range max
+    :returns: (dict) specification of system
+    """
+    variables = [{NAME: varname, MIN: 0, MAX: vmax, VALUE: None,
+                  LEVELS: [{NAME: 'low'}, {NAME: 'high'}]}
+                 for varname, vmax in list(inputs.items()) + [(output, xmax)]]
+    rules = [{WEIGHT: 1,
+              ANTECEDENT: {OPERATOR: AND,
+                           VARIABLES: [{NAME: varname, LEVEL: level}
+                                       for varname in inputs]},
+              CONSEQUENT: {IMPLICATION: MIN,
+                           VARIABLES: [{NAME: output, LEVEL: level}]}}
+             for level in ['low', 'high']]
+    return {VARIABLES: variables, RULES: rules, AGGREGATION: OR,
+            DEFUZZIFICATION: CENTROID}
+
+
+class TestCases(unittest.TestCase):
+
+    def setUp(self):
+        with open(PATHNAME, 'r') as self.fd:
+            self.data = yaml.load(self.fd)
+        self.tipping = CompiledEngine(self.data)
+        self.mood = CompiledEngine(make_stage({'tip': 25}, 'mood'))
+
+    def test_pipeline_wiring(self):
+        pipeline = Pipeline({'mood': self.mood, 'tipping': self.tipping})
+        self.assertEqual(pipeline.order, ['tipping', 'mood'])
+        self.assertEqual(pipeline.links, {('mood', 'tip'): 'tip'})
+        self.assertEqual(pipeline.inputs, ['service', 'food'])
+        self.assertEqual(pipeline.outputs, ['tip', 'mood'])
+        amount = CompiledEngine(make_stage({'amount': 30, 'food': 10},
+                                           'mood'))
+        pipeline = Pipeline({'tipping': self.tipping, 'mood': amount},
+                            links={('mood', 'amount'): 'tip'})
+        self.assertEqual(pipeline.inputs, ['service', 'food'])
+        self.assertEqual(pipeline.links, {('mood', 'amount'): 'tip'})
+
+    def test_pipeline_infer_batch(self):
+        pipeline = Pipeline({'tipping': self.tipping, 'mood': self.mood})
+        rng = np.random.RandomState(0)
+        inputs = {'service': rng.uniform(0, 10, 200),
+                  'food': rng.uniform(0, 10, 200)}
+        outputs = pipeline.infer_batch(inputs)
+        tips = self.tipping.infer_batch(inputs)['tip']
+        assert(np.array_equal(outputs['tip'], tips))
+        assert(np.array_equal(outputs['mood'],
+                              self.mood.infer_batch({'tip': tips})['mood']))
+        for i in range(0, 200, 20):
+            result = pipeline.infer({'service': inputs['service'][i],
+                                     'food': inputs['food'][i]})
+            for varname, value in result.items():
+                self.assertAlmostEqual(value, outputs[varname][i])
+        self.assertRaises(ValueError, pipeline.infer_batch,
+                          {'tip': np.zeros(2)})
+
+    def test_pipeline_missing_values(self):
+        tipping = CompiledEngine(self.data, missing_values=True)
+        inputs = {'service': np.array([np.nan, 3.0]),
+                  'food': np.array([np.nan, 8.0])}
+        pipeline = Pipeline({'tipping': tipping, 'mood': self.mood})
+        self.assertRaises(ValueError, pipeline.infer_batch, inputs)
+        mood = CompiledEngine(make_stage({'tip': 25}, 'mood'),
+                              missing_values=True)
+        pipeline = Pipeline({'tipping': tipping, 'mood': mood})
+        outputs = pipeline.infer_batch(inputs)
+        assert(np.isnan(outputs['mood'][0]))
+        assert(not np.isnan(outputs['mood'][1]))
+        result = pipeline.infer({})
+        assert(np.isnan(result['tip']) and np.isnan(result['mood']))
+
+    def test_pipeline_errors(self):
+        narrow = CompiledEngine(make_stage({'tip': 10}, 'mood'))
+        self.assertRaises(ValueError, Pipeline,
+                          {'tipping': self.tipping, 'mood': narrow})
+        self.assertRaises(ValueError, Pipeline,
+                          {'tipping': self.tipping, 'other': self.tipping})
+        for links in [{('tip', 'tip'): 'tip'}, {('mood', 'food'): 'tip'},
+                      {('mood', 'tip'): 'mood2'}]:
+            self.assertRaises(ValueError, Pipeline,
+                              {'tipping': self.tipping, 'mood': self.mood},
+                              links)
+        forward = CompiledEngine(make_stage({'x': 1}, 'y'))
+        backward = CompiledEngine(make_stage({'y': 1}, 'x'))
+        self.assertRaises(ValueError, Pipeline,
+                          {'forward': forward, 'backward': backward})
@@ -0,0 +1,90 @@
+import os
+import copy
+import yaml
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from blfuzzy import CompiledEngine, EngineRegistry
+from blfuzzy.registry import spec_key
+from blfuzzy.constants import VARIABLES, NAME, VALUE, RULES, WEIGHT
+from blfuzzy.constants import AGGREGATION, SUM
+
+HERE = os.path.dirname(__file__)
+FILENAME = 'data.yaml'
+PATHNAME = os.path.join(HERE, FILENAME)
+
+
+class TestCases(unittest.TestCase):
+
+    def setUp(self):
+        with open(PATHNAME, 'r') as self.fd:
+            self.data = yaml.load(self.fd)
+
+    def test_spec_key(self):
+        key = spec_key(self.data)
+        data = copy.deepcopy(self.data)
+        for variable in data[VARIABLES]:
+            variable[VALUE] = None
+        data[RULES][0][WEIGHT] = 1.0
+        data[VARIABLES][0] = dict(reversed(list(data[VARIABLES][0].items())))
+        self.assertEqual(spec_key(data), key)
+        data[AGGREGATION] = SUM
+        self.assertNotEqual(spec_key(data), key)
+        data = copy.deepcopy(self.data)
+        data[RULES][0][WEIGHT] = 0.5
+        self.assertNotEqual(spec_key(data), key)
+        data = copy.deepcopy(self.data)
+        data[RULES] = data[RULES][1:]
+        self.assertNotEqual(spec_key(data), key)
+
+    def test_registry_hits(self):
+        registry = EngineRegistry(2 ** 20)
+        engine = registry.get(self.data)
+        data = copy.deepcopy(self.data)
+        for variable in data[VARIABLES]:
+            if variable[NAME] == 'food':
+                variable[VALUE] = 2
+        self.assertIs(registry.get(data), engine)
+        self.assertEqual(registry.info(), {
+                'hits': 1, 'misses': 1, 'evictions': 0, 'size': 1,
+                'nbytes': engine.nbytes, 'max_bytes': 2 ** 20})
+        inputs = {'service': 3.0, 'food': 8.0}
+        self.assertEqual(engine.infer(inputs),
+                         CompiledEngine(self.data).infer(inputs))
+        registry.clear()
+        self.assertEqual(len(registry), 0)
+        self.assertIsNot(registry.get(self.data), engine)
+        self.assertRaises(ValueError, EngineRegistry, 0)
+
+    def test_registry_eviction(self):
+        specs = []
+        for weight in [1.0, 0.9, 0.8]:
+            data = copy.deepcopy(self.data)
+            data[RULES][0][WEIGHT] = weight
+            specs.append(data)
+        nbytes = CompiledEngine(self.data).nbytes
+        self.assertTrue(nbytes > 0)
+        registry = EngineRegistry(2 * nbytes)
+        first = registry.get(specs[0])
+        registry.get(specs[1])
+        self.assertIs(registry.get(specs[0]), first)  # specs[1] is now LRU
+        registry.get(specs[2])
+        info = registry.info()
+        self.assertEqual((info['size'], info['evictions']), (2, 1))
+        self.assertEqual(info['nbytes'], 2 * nbytes)
+        self.assertIs(registry.get(specs[0]), first)
+        registry.get(specs[1])
+        self.assertEqual(registry.info()['misses'], 4)
+        registry = EngineRegistry(1)  # the newest engine is always kept
+        registry.get(specs[0])
+        registry.get(specs[1])
+        self.assertEqual(len(registry), 1)
+
+    def test_registry_threads(self):
+        registry = EngineRegistry(2 ** 20)
+        with ThreadPoolExecutor(4) as executor:
+            engines = list(executor.map(lambda i: registry.get(self.data),
+                                        range(16)))
+        self.assertTrue(all(engine is engines[0] for engine in engines))
+        info = registry.info()
+        self.assertEqual(info['hits'] + info['misses'], 16)
+        self.assertEqual(info['size'], 1)
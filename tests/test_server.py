@@ -0,0 +1,159 @@
+import os
+import json
+import yaml
+import asyncio
+import unittest
+import numpy as np
+from blfuzzy import CompiledEngine, InferenceServer
+
+HERE = os.path.dirname(__file__)
+FILENAME = 'data.yaml'
+PATHNAME = os.path.join(HERE, FILENAME)
+
+
+async def request(port, method, path, payload=None):
+    """HTTP client of one request, on its own connection.
+    :param port: (int) server port on localhost
+    :param method: (str) HTTP method
+    :param path: (str) request path
+    :param payload: (dict) JSON body, or None
+    :returns: (tuple) status (int), JSON payload (dict)
+    """
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    body = b'' if payload is None else json.dumps(payload).encode()
+    writer.write('{} {} HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n'
+                 'Content-Length: {}\r\n\r\n'.format(
+                     method, path, len(body)).encode() + body)
+    response = await reader.read()
+    writer.close()
+    head, _, body = response.partition(b'\r\n\r\n')
+    status = int(head.split()[1])
+    return status, json.loads(body.decode())
+
+
+class TestCases(unittest.TestCase):
+
+    def setUp(self):
+        with open(PATHNAME, 'r') as self.fd:
+            self.data = yaml.load(self.fd)
+        self.engine = CompiledEngine(self.data)
+        rng = np.random.RandomState(0)
+        self.rows = [{'food': food, 'service': service} for food, service
+                     in rng.uniform(0, 10, (50, 2)).tolist()]
+
+    def serve(self, fn, **kwargs):
+        """Runs a coroutine against a started server.
+        :param fn: (function) coroutine function of the server
+        :param kwargs: (dict) InferenceServer options
+        :returns: result of the coroutine
+        """
+        async def main():
+            server = InferenceServer({'tipping': self.engine}, **kwargs)
+            await server.start()
+            try:
+                return await fn(server)
+            finally:
+                await server.close()
+        return asyncio.run(main())
+
+    def test_server_micro_batches(self):
+        async def run(server):
+            responses = await asyncio.gather(*[
+                    request(server.port, 'POST', '/infer/tipping', row)
+                    for row in self.rows])
+            return responses, server.batchers['tipping'].info()
+        responses, info = self.serve(run, window=0.05)
+        for row, (status, result) in zip(self.rows, responses):
+            self.assertEqual(status, 200)
+            expect = self.engine.infer(row)['tip']
+            assert(np.isclose(result['tip'], expect, rtol=0, atol=1e-12))
+        self.assertEqual(info['requests'], len(self.rows))
+        self.assertEqual(info['errors'], 0)
+        assert(info['batches'] < len(self.rows))
+        assert(info['latency_p99_seconds'] > 0)
+
+    def test_server_max_rows(self):
+        async def run(server):
+            await asyncio.gather(*[
+                    request(server.port, 'POST', '/infer/tipping', row)
+                    for row in self.rows])
+            return server.batchers['tipping'].info()
+        info = self.serve(run, window=10, max_rows=10)
+        self.assertEqual(info['batches'], 5)
+        self.assertEqual(info['mean_batch_size'], 10)
+
+    def test_server_errors(self):
+        async def run(server):
+            responses = await asyncio.gather(
+                    request(server.port, 'POST', '/infer/tipping',
+                            {'food': 8, 'service': 30}),
+                    request(server.port, 'POST', '/infer/tipping',
+                            {'food': 8, 'taste': 3}),
+                    request(server.port, 'POST', '/infer/tipping',
+                            {'food': 8, 'service': 3}),
+                    request(server.port, 'POST', '/infer/parking',
+                            {'food': 8, 'service': 3}),
+                    request(server.port, 'GET', '/engines'))
+            return responses + [await request(server.port, 'GET', '/stats')]
+        responses = self.serve(run)
+        self.assertEqual(responses[0], (400, {'error': '30 out of range'}))
+        self.assertEqual(responses[1], (400, {'error': '"taste" not found'}))
+        self.assertEqual(responses[2][0], 200)
+        self.assertEqual(responses[3], (404, {'error': '"parking" not found'}))
+        self.assertEqual(responses[4], (200, {'tipping': {
+                'inputs': self.engine.inputs,
+                'outputs': self.engine.outputs}}))
+        self.assertEqual(responses[5][1]['tipping']['requests'], 1)
+
+    def test_server_batch_fallback(self):
+        async def run(server):
+            batcher = server.batchers['tipping']
+            loop = asyncio.get_running_loop()
+            good = loop.create_future()
+            bad = loop.create_future()
+            # a row that got past the checks and fails the batch
+            await batcher.run([({'food': 8, 'service': 3}, good, 0),
+                               ({'food': 8, 'service': 30}, bad, 0)])
+            return good, bad, batcher.info()
+        good, bad, info = self.serve(run)
+        self.assertEqual(good.result(),
+                         self.engine.infer({'food': 8, 'service': 3}))
+        self.assertRaises(ValueError, bad.result)
+        self.assertEqual((info['requests'], info['errors']), (2, 1))
+
+    def test_server_nan(self):
+        async def run(server):
+            batcher = server.batchers['tipping']
+            return await asyncio.gather(
+                    batcher.infer({'food': 8, 'service': float('nan')}),
+                    batcher.infer({'food': 8, 'service': 3}),
+                    return_exceptions=True)
+        for missing_values in [False, True]:
+            self.engine.missing_values = missing_values
+            results = self.serve(run, window=0.05)
+            self.assertEqual(str(results[0]), 'nan is not a number')
+            expect = self.engine.infer({'food': 8, 'service': 3})['tip']
+            assert(np.isclose(results[1]['tip'], expect, rtol=0,
+                              atol=1e-12))
+
+    def test_server_missing_values(self):
+        self.engine.missing_values = True
+
+        async def run(server):
+            return await asyncio.gather(
+                    request(server.port, 'POST', '/infer/tipping',
+                            {'service': 3}),
+                    request(server.port, 'POST', '/infer/tipping',
+                            {'food': 8, 'service': 3}),
+                    request(server.port, 'POST', '/infer/tipping', {}))
+        responses = self.serve(run, window=0.05)
+        self.assertEqual(responses[0][0], 200)
+        expect = self.engine.infer({'service': 3})['tip']
+        assert(np.isclose(responses[0][1]['tip'], expect, rtol=0,
+                          atol=1e-12))
+        self.assertEqual(responses[1][0], 200)
+        self.assertEqual(responses[2], (200, {'tip': None}))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+import os
+import copy
+import yaml
+import logging
+import unittest
+import numpy as np
+from blfuzzy import FuzzyInferenceEngine, CompiledEngine, Stats, WorkerPool
+from blfuzzy.constants import VARIABLES, NAME, VALUE
+
+HERE = os.path.dirname(__file__)
+FILENAME = 'data.yaml'
+PATHNAME = os.path.join(HERE, FILENAME)
+
+
+class TestCases(unittest.TestCase):
+
+    def setUp(self):
+        with open(PATHNAME, 'r') as self.fd:
+            self.data = yaml.load(self.fd)
+
+    def test_run_stats(self):
+        stats = Stats()
+        engine = FuzzyInferenceEngine(copy.deepcopy(self.data), stats=stats)
+        engine.run()
+        self.assertEqual(engine.get_variable_value('tip'), 13.348484848484848)
+        counts = stats.counts
+        self.assertEqual(counts['runs'], 1)
+        self.assertEqual(counts['rules_evaluated'] + counts['rules_skipped'],
+                         len(engine.rules))
+        self.assertEqual(counts['rules_skipped'], 0)
+        self.assertTrue(counts['interp_calls'] > 0)
+        self.assertTrue(counts['array_bytes'] > 0)
+        for phase, seconds in stats.seconds.items():
+            self.assertTrue(seconds > 0, phase)
+
+    def test_run_missing_values(self):
+        data = copy.deepcopy(self.data)
+        for variable in data[VARIABLES]:
+            if variable[NAME] == 'food':
+                variable[VALUE] = None
+        stats = Stats()
+        engine = FuzzyInferenceEngine(data, missing_values=True, stats=stats)
+        engine.run()
+        expect = FuzzyInferenceEngine(copy.deepcopy(data),
+                                      missing_values=True)
+        expect.run()
+        self.assertEqual(engine.get_variable_value('tip'),
+                         expect.get_variable_value('tip'))
+        self.assertTrue(stats.counts['rules_skipped'] > 0)
+
+    def test_compiled_stats(self):
+        stats = Stats()
+        engine = CompiledEngine(self.data, stats=stats)
+        inputs = {'service': 3.0, 'food': 8.0}
+        self.assertEqual(engine.infer(inputs), CompiledEngine(
+            self.data).infer(inputs))
+        self.assertEqual(stats.counts['runs'], 1)
+        self.assertEqual(stats.counts['rules_evaluated'] +
+                         stats.counts['rules_skipped'], len(engine.rules))
+        rng = np.random.RandomState(0)
+        inputs = {'service': rng.uniform(0, 10, 50),
+                  'food': rng.uniform(0, 10, 50)}
+        engine.infer_batch(inputs)
+        self.assertEqual(stats.counts['runs'], 2)
+        self.assertEqual(stats.counts['rows'], 51)
+        # 3 levels of 2 inputs per row, in infer() and infer_batch()
+        self.assertEqual(stats.counts['interp_calls'], 51 * 6)
+        stats.reset()
+        engine = CompiledEngine(self.data, missing_values=True, stats=stats)
+        inputs['food'][:10] = np.nan
+        engine.infer_batch(inputs)
+        engine.infer({'service': 3.0})
+        self.assertEqual(stats.counts['interp_calls'], 50 * 3 + 40 * 3 + 3)
+        stats.reset()
+        self.assertEqual(stats.as_dict()['rows'], 0)
+
+    def test_log(self):
+        stats = Stats()
+        stats.count(runs=2)
+        with self.assertLogs('blfuzzy', logging.INFO) as logs:
+            stats.log()
+        self.assertIn('runs=2', logs.output[0])
+
+    def test_pool_with_stats(self):
+        engine = CompiledEngine(self.data, stats=Stats())
+        inputs = {'service': np.linspace(0, 10, 20),
+                  'food': np.linspace(10, 0, 20)}
+        with WorkerPool(engine, 2, chunksize=5) as pool:
+            actual = pool.infer_batch(inputs)
+        assert(np.array_equal(actual['tip'],
+                              CompiledEngine(self.data).infer_batch(
+                                  inputs)['tip']))
+
+    def tearDown(self):
+        self.fd.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import os
+import csv
+import yaml
+import tempfile
+import unittest
+import numpy as np
+from blfuzzy import CompiledEngine, infer_stream, run_stream
+
+HERE = os.path.dirname(__file__)
+FILENAME = 'data.yaml'
+PATHNAME = os.path.join(HERE, FILENAME)
+
+
+class TestCases(unittest.TestCase):
+
+    def setUp(self):
+        with open(PATHNAME, 'r') as self.fd:
+            self.data = yaml.load(self.fd)
+        self.engine = CompiledEngine(self.data)
+        rng = np.random.RandomState(0)
+        self.inputs = {'service': rng.uniform(0, 10, 25),
+                       'food': rng.uniform(0, 10, 25)}
+        self.expect = self.engine.infer_batch(self.inputs)['tip']
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def test_stream_csv(self):
+        source = os.path.join(self.tmpdir.name, 'in.csv')
+        target = os.path.join(self.tmpdir.name, 'out.csv')
+        with open(source, 'w', newline='') as fd:
+            writer = csv.writer(fd)
+            writer.writerow(['node', 'food', 'service'])
+            for i in range(25):
+                writer.writerow(['n{}'.format(i),
+                                 float(self.inputs['food'][i]),
+                                 float(self.inputs['service'][i])])
+        chunks = list(infer_stream(self.engine, source, chunksize=10))
+        self.assertEqual([len(chunk['tip']) for chunk in chunks], [10, 10, 5])
+        self.assertEqual(list(chunks[0]), ['node', 'food', 'service', 'tip'])
+        rows = run_stream(self.engine, source, target, chunksize=10)
+        self.assertEqual(rows, 25)
+        with open(target, 'r', newline='') as fd:
+            result = list(csv.DictReader(fd))
+        self.assertEqual(result[3]['node'], 'n3')
+        actual = np.array([float(row['tip']) for row in result])
+        assert(np.array_equal(actual, self.expect))
+
+    def test_stream_rows(self):
+        rows = ({'service': self.inputs['service'][i],
+                 'food': self.inputs['food'][i]} for i in range(25))
+        chunks = list(infer_stream(self.engine, rows, chunksize=7))
+        self.assertEqual([len(chunk['tip']) for chunk in chunks],
+                         [7, 7, 7, 4])
+        actual = np.concatenate([chunk['tip'] for chunk in chunks])
+        assert(np.array_equal(actual, self.expect))
+
+    def test_stream_arrays(self):
+        chunks = list(infer_stream(self.engine, [self.inputs], chunksize=20))
+        self.assertEqual([len(chunk['tip']) for chunk in chunks], [20, 5])
+        actual = np.concatenate([chunk['tip'] for chunk in chunks])
+        assert(np.array_equal(actual, self.expect))
+
+    def tearDown(self):
+        self.fd.close()
+        self.tmpdir.cleanup()
+
+
+if __name__ == '__main__':
+    unittest.main()
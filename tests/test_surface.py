@@ -0,0 +1,66 @@
+import os
+import yaml
+import tempfile
+import unittest
+import pytest
+import numpy as np
+from blfuzzy import CompiledEngine, Surface
+
+HERE = os.path.dirname(__file__)
+FILENAME = 'data.yaml'
+PATHNAME = os.path.join(HERE, FILENAME)
+
+
+class TestCases(unittest.TestCase):
+
+    def setUp(self):
+        with open(PATHNAME, 'r') as self.fd:
+            self.data = yaml.load(self.fd)
+        self.engine = CompiledEngine(self.data)
+
+    def test_surface_grid_points(self):
+        surface = Surface.build(self.engine, resolution=[10, 5])
+        self.assertEqual(surface.tables['tip'].shape, (11, 6))
+        for service in [0, 3, 10]:
+            for food in [0, 4, 10]:
+                inputs = {'service': service, 'food': food}
+                expect = self.engine.infer(inputs)['tip']
+                actual = surface.infer(inputs)['tip']
+                assert(np.isclose(actual, expect))
+
+    def test_surface_error(self):
+        coarse = Surface.build(self.engine, resolution=10)
+        fine = Surface.build(self.engine, resolution=200)
+        assert(fine.error['tip'] < coarse.error['tip'])
+        rng = np.random.RandomState(1)
+        inputs = {'service': rng.uniform(0, 10, 1000),
+                  'food': rng.uniform(0, 10, 1000)}
+        expect = self.engine.infer_batch(inputs)['tip']
+        actual = fine.infer_batch(inputs)['tip']
+        assert(np.abs(actual - expect).max() <= fine.error['tip'])
+        for i in range(0, 1000, 111):
+            value = fine.infer({'service': inputs['service'][i],
+                                'food': inputs['food'][i]})['tip']
+            assert(np.isclose(value, actual[i]))
+        with pytest.raises(ValueError) as excinfo:
+            fine.infer({'service': 3, 'food': 11})
+        self.assertEqual(str(excinfo.value), '11.0 out of range')
+
+    def test_surface_save_load(self):
+        surface = Surface.build(self.engine, resolution=20)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            pathname = os.path.join(tmpdir, 'tip.npz')
+            surface.save(pathname)
+            loaded = Surface.load(pathname)
+        self.assertEqual(loaded.inputs, surface.inputs)
+        self.assertEqual(loaded.error, surface.error)
+        assert(np.array_equal(loaded.tables['tip'], surface.tables['tip']))
+        inputs = {'service': 3.3, 'food': 7.1}
+        self.assertEqual(loaded.infer(inputs), surface.infer(inputs))
+
+    def tearDown(self):
+        self.fd.close()
+
+
+if __name__ == '__main__':
+    unittest.main()